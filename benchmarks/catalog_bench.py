@@ -0,0 +1,78 @@
+"""
+Builds a catalog of 1000 folders of 1000 files, then times looking up files by name and checksum and reports the
+memory used, compared with holding the same files as FileInfo objects in a dict
+
+Run with "python benchmarks/catalog_bench.py [NUM_FOLDERS] [NUM_FILES]"
+"""
+from __future__ import print_function
+import os
+import sys
+import time
+import random
+import shutil
+import resource
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from flickr_rsync.file_info import FileInfo
+from flickr_rsync.folder_info import FolderInfo
+from flickr_rsync.catalog import Catalog, write_catalog
+
+LOOKUP_COUNT = 100000
+
+
+class MemoryStorage(object):
+
+    def __init__(self, folder_count, file_count):
+        self._folder_count = folder_count
+        self._file_count = file_count
+
+    def list_folders(self):
+        for i in range(self._folder_count):
+            yield FolderInfo(id=unicode(72157600000000000 + i), name='Folder {:04}'.format(i))
+
+    def list_files(self, folder):
+        offset = int(folder.name[-4:]) * self._file_count
+        for i in range(self._file_count):
+            yield FileInfo(id=unicode(30000000000 + offset + i), name='IMG_{:07}.jpg'.format(offset + i),
+                           checksum='{:032x}'.format(offset + i), size=i * 1024)
+
+
+def main():
+    folder_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    file_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    root = tempfile.mkdtemp()
+    path = os.path.join(root, 'bench.catalog')
+    try:
+        start = time.time()
+        write_catalog(path, MemoryStorage(folder_count, file_count))
+        print("wrote {} files ({} KB) in {:.3f} sec".format(
+            folder_count * file_count, os.path.getsize(path) // 1024, time.time() - start))
+
+        before_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        catalog = Catalog(path)
+        random.seed(1)
+        lookups = [random.randrange(folder_count * file_count) for _ in range(LOOKUP_COUNT)]
+
+        start = time.time()
+        found = sum(1 for i in lookups if catalog.find_file(
+            'folder {:04}'.format(i // file_count), 'img_{:07}.JPG'.format(i)) is not None)
+        print("found {} of {} files by name in {:.3f} sec".format(found, LOOKUP_COUNT, time.time() - start))
+
+        start = time.time()
+        found = sum(1 for i in lookups if next(catalog.find_checksum('{:032x}'.format(i)), None) is not None)
+        print("found {} of {} files by checksum in {:.3f} sec".format(found, LOOKUP_COUNT, time.time() - start))
+        catalog.close()
+        catalog_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before_kb
+
+        files = {}
+        for folder in MemoryStorage(folder_count, file_count).list_folders():
+            for file_info in MemoryStorage(folder_count, file_count).list_files(folder):
+                files[(folder.name.lower(), file_info.name.lower())] = file_info
+        dict_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before_kb - catalog_kb
+        print("memory: catalog {} KB, dict of FileInfo {} KB".format(catalog_kb, dict_kb))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Compares filtering 1M file names with re.search and the raw --include pattern against FileFilter
+
+Run with "python benchmarks/file_filter_bench.py [NUM_NAMES]"
+"""
+from __future__ import print_function
+import os
+import re
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import MagicMock
+from flickr_rsync.config import DEFAULTS
+from flickr_rsync.file_filter import FileFilter
+
+EXTENSIONS = ['JPG', 'jpeg', 'png', 'mov', 'txt', 'xmp', 'mp4', 'thm']
+
+
+def main():
+    name_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    names = ['IMG_{:07}.{}'.format(i, EXTENSIONS[i % len(EXTENSIONS)])
+             for i in range(name_count)]
+    pattern = DEFAULTS['include']
+    config = MagicMock(include=pattern, exclude='', include_dir='', exclude_dir='')
+
+    start = time.time()
+    regex_count = sum(1 for name in names
+                      if re.search(pattern, name, flags=re.IGNORECASE))
+    regex_elapsed = time.time() - start
+
+    file_filter = FileFilter(config)
+    start = time.time()
+    filter_count = sum(1 for name in names if file_filter.include_file(name))
+    filter_elapsed = time.time() - start
+
+    print("re.search: {} of {} names matched in {:.3f} sec".format(
+        regex_count, name_count, regex_elapsed))
+    print("FileFilter: {} of {} names matched in {:.3f} sec".format(
+        filter_count, name_count, filter_elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Measures the memory held by 1M listed files, comparing dict backed FileInfo objects with the __slots__ FileInfo, and
+FlickrStorage keeping every flickr_api Photo object with keeping only whether each photo is a video. Each variant runs
+in its own process so peak memory can be measured
+
+Run with "python benchmarks/file_info_bench.py [NUM_FILES]"
+"""
+from __future__ import print_function
+import os
+import sys
+import resource
+import subprocess
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+import flickr_api
+from flickr_rsync.file_info import FileInfo
+
+
+class DictFileInfo(object):
+    # FileInfo as it was before __slots__
+
+    def __init__(self, **kwargs):
+        self.id = kwargs.get('id')
+        self.name = kwargs.get('name')
+        self.full_path = kwargs.get('full_path')
+        self.checksum = kwargs.get('checksum')
+        self.size = kwargs.get('size')
+        self.mtime = kwargs.get('mtime')
+
+
+def _create_photo(i):
+    # Fields as returned by a photoset listing
+    return flickr_api.Photo(
+        id=unicode(30000000000 + i), title=u'IMG_{:07}'.format(i), originalformat=u'jpg', media=u'photo',
+        tags=u'checksum:md5={:032x} flickrrsync:extn=jpg'.format(i), isprimary=u'0', ispublic=0, isfriend=0,
+        isfamily=0)
+
+
+def dict_file_info(count):
+    return [DictFileInfo(id=unicode(30000000000 + i), name='IMG_{:07}.jpg'.format(i), checksum='{:032x}'.format(i))
+            for i in range(count)]
+
+
+def slots_file_info(count):
+    return [FileInfo(id=unicode(30000000000 + i), name='IMG_{:07}.jpg'.format(i), checksum='{:032x}'.format(i))
+            for i in range(count)]
+
+
+def flickr_photos(count):
+    photos = {}
+    for i in range(count):
+        photo = _create_photo(i)
+        photos[photo.id] = photo
+    return photos
+
+
+def flickr_is_video(count):
+    is_video = {}
+    for i in range(count):
+        photo = _create_photo(i)
+        is_video[photo.id] = photo.media == 'video'
+    return is_video
+
+
+VARIANTS = [
+    ('dict FileInfo', dict_file_info),
+    ('slots FileInfo', slots_file_info),
+    ('Photo objects', flickr_photos),
+    ('is_video', flickr_is_video),
+]
+
+
+def run_variant(name, count):
+    func = dict(VARIANTS)[name]
+    before_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    held = func(count)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("{:<16} {:>8} items  {:>8} KB".format(name, len(held), peak_kb - before_kb))
+
+
+def main():
+    count = sys.argv[1] if len(sys.argv) > 1 else '1000000'
+    for name, _ in VARIANTS:
+        subprocess.check_call([sys.executable, __file__, '--variant', name, count])
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--variant':
+        run_variant(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
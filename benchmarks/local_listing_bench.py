@@ -0,0 +1,86 @@
+"""
+Compares listing a local folder of 100k files the way LocalStorage.list_files did before scandir, with os.listdir and
+an isfile stat per entry, against the scandir based LocalStorage.list_files, which only stats files whose size or
+modified time is used
+
+Run with "python benchmarks/local_listing_bench.py [NUM_FILES]"
+"""
+from __future__ import print_function
+import os
+import re
+import sys
+import time
+import shutil
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import MagicMock
+from flickr_rsync.local_storage import LocalStorage
+from flickr_rsync.file_filter import FileFilter
+from flickr_rsync.file_info import FileInfo
+from flickr_rsync.folder_info import FolderInfo
+
+
+def listdir_listing(folder_abs, include, exclude):
+    # LocalStorage.list_files as it was before scandir
+    return [
+        FileInfo(
+            id=i,
+            name=name.encode('utf-8'),
+            full_path=path.encode('utf-8'),
+            checksum=None) for i,
+        (name,
+         path) in enumerate(
+            (x,
+             os.path.join(
+                 folder_abs,
+                 x)) for x in os.listdir(folder_abs)) if _should_include(
+            name,
+            include,
+            exclude) and os.path.isfile(path)]
+
+
+def _should_include(name, include_pattern, exclude_pattern):
+    return ((not include_pattern or re.search(include_pattern, name, flags=re.IGNORECASE)) and
+            (not exclude_pattern or not re.search(exclude_pattern, name, flags=re.IGNORECASE)))
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    root = tempfile.mkdtemp()
+    try:
+        folder_abs = os.path.join(root, u'folder')
+        os.mkdir(folder_abs)
+        for i in range(file_count):
+            open(os.path.join(folder_abs, 'IMG_{:06}.jpg'.format(i)), 'w').close()
+
+        config = MagicMock(
+            include='', exclude='', include_dir='', exclude_dir='',
+            checksum=False, recursive=False)
+        storage = LocalStorage(config, root, FileFilter(config))
+        folder = FolderInfo(id=0, name='folder')
+
+        start = time.time()
+        listdir_count = len(listdir_listing(folder_abs, config.include, config.exclude))
+        listdir_elapsed = time.time() - start
+
+        start = time.time()
+        files = storage.list_files(folder)
+        scandir_elapsed = time.time() - start
+
+        # As --update, --order or --plan would
+        start = time.time()
+        for file_info in files:
+            file_info.size
+        stat_elapsed = time.time() - start
+
+        print("listdir + isfile: {} files in {:.3f} sec".format(
+            listdir_count, listdir_elapsed))
+        print("scandir: {} files in {:.3f} sec".format(
+            len(files), scandir_elapsed))
+        print("reading size and mtime of scandir listing: {:.3f} sec".format(stat_elapsed))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Times saving a snapshot of 1000 folders of 1000 files, loading it, and listing every file back from it
+
+Run with "python benchmarks/snapshot_bench.py [NUM_FOLDERS] [NUM_FILES]"
+"""
+from __future__ import print_function
+import os
+import sys
+import time
+import shutil
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import MagicMock
+from flickr_rsync.file_filter import FileFilter
+from flickr_rsync.file_info import FileInfo
+from flickr_rsync.folder_info import FolderInfo
+from flickr_rsync.root_folder_info import RootFolderInfo
+from flickr_rsync.snapshot_storage import SnapshotStorage, SnapshotRecorder
+
+
+class MemoryStorage(object):
+
+    def __init__(self, folder_count, file_count):
+        self._folder_count = folder_count
+        self._file_count = file_count
+
+    def list_folders(self):
+        for i in range(self._folder_count):
+            yield FolderInfo(id=unicode(72157600000000000 + i), name=u'Folder {:04}'.format(i))
+
+    def list_files(self, folder):
+        if folder.is_root:
+            return
+        for i in range(self._file_count):
+            yield FileInfo(id=unicode(30000000000 + i), name=u'IMG_{:06}.jpg'.format(i),
+                           checksum='{:032x}'.format(i), size=i * 1024)
+
+
+def main():
+    folder_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    file_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    root = tempfile.mkdtemp()
+    path = os.path.join(root, 'bench.snapshot')
+    config = MagicMock(include='', exclude='', include_dir='', exclude_dir='')
+    try:
+        recorder = SnapshotRecorder(MemoryStorage(folder_count, file_count), path)
+        start = time.time()
+        for folder in [RootFolderInfo()] + list(recorder.list_folders()):
+            for _ in recorder.list_files(folder):
+                pass
+        recorder.save()
+        save_elapsed = time.time() - start
+
+        storage = SnapshotStorage(config, path, FileFilter(config))
+        start = time.time()
+        folders = list(storage.list_folders())
+        load_elapsed = time.time() - start
+        start = time.time()
+        count = sum(1 for folder in folders for _ in storage.list_files(folder))
+        list_elapsed = time.time() - start
+
+        print("saved {} files ({} KB) in {:.3f} sec, including generating them".format(
+            folder_count * file_count, os.path.getsize(path) // 1024, save_elapsed))
+        print("loaded in {:.3f} sec".format(load_elapsed))
+        print("listed {} files in {:.3f} sec".format(count, list_elapsed))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Compares the generator based walkers and Sync against their RxPY counterparts, listing or syncing an in memory storage
+of 200 folders of 1000 files. Each variant runs in its own process so peak memory can be measured
+
+Run with "python benchmarks/walker_bench.py [NUM_FOLDERS] [NUM_FILES_PER_FOLDER]"
+"""
+from __future__ import print_function
+import os
+import sys
+import time
+import resource
+import subprocess
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import MagicMock
+from flickr_rsync.storage import Storage
+from flickr_rsync.file_info import FileInfo
+from flickr_rsync.folder_info import FolderInfo
+
+VARIANTS = {
+    'TreeWalker': ('flickr_rsync.tree_walker', 'TreeWalker'),
+    'RxTreeWalker': ('flickr_rsync.rx_tree_walker', 'RxTreeWalker'),
+    'CsvWalker': ('flickr_rsync.csv_walker', 'CsvWalker'),
+    'RxCsvWalker': ('flickr_rsync.rx_csv_walker', 'RxCsvWalker'),
+    'Sync': ('flickr_rsync.sync', 'Sync'),
+    'RxSync': ('flickr_rsync.rx_sync', 'RxSync'),
+}
+
+
+class MemoryStorage(Storage):
+
+    def __init__(self, folder_count, file_count):
+        self.path = ''
+        self._folder_count = folder_count
+        self._file_count = file_count
+
+    def list_folders(self):
+        return (FolderInfo(id=i, name='Folder {:04}'.format(i))
+                for i in range(self._folder_count))
+
+    def list_files(self, folder):
+        if folder.is_root:
+            return []
+        return (FileInfo(id=i, name='IMG_{:06}.jpg'.format(i), checksum='d41d8cd98f00b204e9800998ecf8427e')
+                for i in range(self._file_count))
+
+    def copy_file(self, file_info, folder_name, dest_storage):
+        pass
+
+
+def run_variant(name, folder_count, file_count):
+    module_name, class_name = VARIANTS[name]
+    module = __import__(module_name, fromlist=[class_name])
+    config = MagicMock(root_files=False, list_folders=False, list_sort=False, prefetch=0, dry_run=False,
+                       transfers=1)
+    src = MemoryStorage(folder_count, file_count)
+
+    # Walkers write straight to the stdout file descriptor, so redirect that rather than sys.stdout
+    sys.stdout.flush()
+    stdout_fd = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    if name.endswith('Sync'):
+        instance = getattr(module, class_name)(config, src, MemoryStorage(0, 0))
+        action = instance.run
+    else:
+        instance = getattr(module, class_name)(config, src)
+        action = instance.walk
+
+    try:
+        start = time.time()
+        action()
+        elapsed = time.time() - start
+    finally:
+        sys.stdout.flush()
+        os.dup2(stdout_fd, 1)
+        os.close(devnull)
+        os.close(stdout_fd)
+    items = folder_count * file_count
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("{:<14} {:>10.0f} items/sec  {:>8} KB peak".format(
+        name, items / elapsed, peak_kb))
+
+
+def main():
+    folder_count = sys.argv[1] if len(sys.argv) > 1 else '200'
+    file_count = sys.argv[2] if len(sys.argv) > 2 else '1000'
+    for name in sorted(VARIANTS):
+        subprocess.check_call([sys.executable, __file__, '--variant', name, folder_count, file_count])
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--variant':
+        run_variant(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main()
@@ -3,27 +3,74 @@ import os
 import sys
 import urllib2
 import logging
+import requests
+from flickr_api.flickrerrors import FlickrAPIError
 
-from storage import Storage
+from storage import Storage, RemoteStorage
 from config import Config
-from sync import Sync
-from resiliently import Resiliently
-from flickr_storage import FlickrStorage
+from sync import Sync, TooManyFailuresError, FilteredDestError
+from diff import Diff
+from catalog import Catalog, write_catalog
+from resiliently import Resiliently, is_token_rejected
+from flickr_storage import FlickrStorage, TOKEN_FILENAME
 from local_storage import LocalStorage
 from fake_storage import FakeStorage
+from snapshot_storage import SnapshotStorage, SnapshotRecorder
+from journal import Journal
+from http_pool import HttpPool, pool_size
+from plan import PlanWriter, PlanReader, save_bandwidth
 from tree_walker import TreeWalker
 from csv_walker import CsvWalker
+from jsonl_walker import JsonLinesWalker
+from file_filter import FileFilter
 
 logger = logging.getLogger(__name__)
 
 
-def _get_storage(config, path):
+def _get_storage(config, path, file_filter, journal=None):
     if path.lower() == Config.PATH_FLICKR:
         resiliently = Resiliently(config)
-        return FlickrStorage(config, resiliently)
+        http_pool = HttpPool(pool_size(config))
+        return FlickrStorage(config, resiliently, file_filter, journal, http_pool)
     elif path.lower() == config.PATH_FAKE:
         return FakeStorage(config)
-    return LocalStorage(config, path)
+    elif path.lower().startswith(Config.PATH_SNAPSHOT_PREFIX):
+        return SnapshotStorage(
+            config, path[len(Config.PATH_SNAPSHOT_PREFIX):], file_filter)
+    return LocalStorage(config, path, file_filter)
+
+
+def _execute_plan(config, file_filter):
+    # The plan's src and dest are used, not those in the config
+    plan = PlanReader(config.execute_plan)
+    for path in (plan.src, plan.dest):
+        if path.lower().startswith(Config.PATH_SNAPSHOT_PREFIX):
+            logger.error("Snapshots are read only, {} can't be copied from or to".format(path))
+            sys.exit(1)
+    journal = Journal(config.journal, plan.src, plan.dest) \
+        if config.journal and not config.dry_run else None
+    src_storage = _get_storage(config, plan.src, file_filter)
+    dest_storage = _get_storage(config, plan.dest, file_filter, journal)
+    sync = Sync(config, src_storage, dest_storage, journal=journal)
+    sync.run_plan(plan)
+    _save_bandwidth(config, sync, src_storage, dest_storage)
+    _exit_on_failures(sync)
+
+
+def _save_bandwidth(config, sync, src_storage, dest_storage):
+    bytes_per_sec = sync.bandwidth()
+    if bytes_per_sec:
+        save_bandwidth(
+            config,
+            isinstance(src_storage, RemoteStorage),
+            isinstance(dest_storage, RemoteStorage),
+            bytes_per_sec)
+
+
+def _exit_on_failures(sync):
+    # So scripts and cron jobs can tell files failed to copy, even though the rest of the sync carried on
+    if sync.failure_count():
+        sys.exit(1)
 
 
 def _get_walker(config, storage, list_format):
@@ -31,6 +78,8 @@ def _get_walker(config, storage, list_format):
         return TreeWalker(config, storage)
     elif list_format == Config.LIST_FORMAT_CSV:
         return CsvWalker(config, storage)
+    elif list_format == Config.LIST_FORMAT_JSONL:
+        return JsonLinesWalker(config, storage)
     else:
         raise ValueError(
             'Unrecognised value for list-format: {}'.format(list_format))
@@ -48,17 +97,62 @@ def main():
         config = Config()
         config.read()
 
-        src_storage = _get_storage(config, config.src)
-        if config.list_only or config.list_folders:
+        file_filter = FileFilter(config)
+        if config.execute_plan:
+            _execute_plan(config, file_filter)
+            return
+        src_storage = _get_storage(config, config.src, file_filter)
+        if config.save_catalog:
+            file_count = write_catalog(
+                config.save_catalog,
+                src_storage,
+                root_files=config.root_files,
+                buffer_size=config.list_sort_buffer)
+            logger.info("saved {} file(s) to catalog {}".format(
+                file_count, config.save_catalog))
+        elif config.list_only or config.list_folders:
+            if config.save_snapshot:
+                src_storage = SnapshotRecorder(src_storage, config.save_snapshot)
             walker = _get_walker(config, src_storage, config.list_format)
             walker.walk()
+            if config.save_snapshot:
+                src_storage.save()
+        elif config.diff:
+            dest_storage = _get_storage(config, config.dest, file_filter)
+            diff = Diff(config, src_storage, dest_storage)
+            diff.run()
         else:
-            dest_storage = _get_storage(config, config.dest)
-            sync = Sync(config, src_storage, dest_storage)
+            journal = Journal(config.journal, config.src, config.dest) \
+                if config.journal and not config.dry_run and not config.plan else None
+            dest_storage = _get_storage(config, config.dest, file_filter, journal)
+            for storage, path in ((src_storage, config.src), (dest_storage, config.dest)):
+                # A plan from a snapshot couldn't be executed, as its files can't be read or written
+                if isinstance(storage, SnapshotStorage) and (config.plan or not config.dry_run):
+                    logger.error(
+                        "Snapshots are read only, use --dry-run without --plan to sync {}".format(path))
+                    sys.exit(1)
+            dest_index = Catalog(config.dest_catalog) if config.dest_catalog else None
+            plan = PlanWriter(
+                config.plan,
+                config.src,
+                config.dest,
+                isinstance(src_storage, RemoteStorage),
+                isinstance(dest_storage, RemoteStorage)) if config.plan else None
+            sync = Sync(config, src_storage, dest_storage, dest_index, journal, plan)
             sync.run()
+            _save_bandwidth(config, sync, src_storage, dest_storage)
+            _exit_on_failures(sync)
 
-    except urllib2.URLError as e:
+    except (urllib2.URLError, requests.ConnectionError) as e:
         logger.error("Error connecting to server. {!r}".format(e))
         sys.exit(1)
+    except (TooManyFailuresError, FilteredDestError) as e:
+        logger.error(e.message)
+        sys.exit(1)
+    except FlickrAPIError as e:
+        if not is_token_rejected(e):
+            raise
+        logger.error("Flickr rejected the token, delete {} to authorise again".format(TOKEN_FILENAME))
+        sys.exit(1)
     except KeyboardInterrupt:
         sys.exit()
@@ -0,0 +1,98 @@
+from __future__ import print_function
+import time
+import heapq
+import logging
+import itertools
+import threading
+from collections import OrderedDict
+from throttle import throttle
+
+logger = logging.getLogger(__name__)
+
+UPLOAD = 'upload'
+DOWNLOAD = 'download'
+UPDATE = 'update'
+LIST = 'list'
+# The share of calls each class gets while others are waiting, listing gets the least so it can't starve copies
+DEFAULT_WEIGHTS = OrderedDict([(UPLOAD, 4), (DOWNLOAD, 4), (UPDATE, 4), (LIST, 1)])
+
+
+class ApiScheduler(object):
+    """
+    Schedules API calls from any number of threads, starting one call every delay_sec seconds. Calls wait in a queue per
+    class and are started by start-time fair queuing, so while several classes are waiting each gets a share of the
+    calls in proportion to its weight, and calls of the same class start in the order they were made
+    """
+
+    def __init__(self, delay_sec=0, weights=None):
+        """
+        Args:
+            delay_sec: The minimum number of seconds between starting calls, or a function returning it
+            weights: A dict of the weight of each class of call, defaults to DEFAULT_WEIGHTS
+        """
+        self._weights = weights or DEFAULT_WEIGHTS
+        self._condition = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish = {}
+        self._dispatching = False
+        # A dict of class to [calls, total delay, max delay]
+        self._stats = OrderedDict()
+        self._throttle = throttle(delay_sec=delay_sec)(self._dispatched)
+
+    def call(self, api_class, func, *args, **kwargs):
+        """
+        Waits for the call's turn, then calls func with args and kwargs
+
+        Args:
+            api_class: The class of the call, one of DEFAULT_WEIGHTS or weights
+
+        Returns:
+            The result of func
+        """
+        self._wait_turn(api_class)
+        return func(*args, **kwargs)
+
+    def stats(self):
+        """
+        Returns:
+            A list of (api_class, calls, average delay, max delay) tuples of the calls made, delays are the seconds
+            calls waited to start
+        """
+        with self._condition:
+            return [(api_class, calls, total_delay / calls, max_delay)
+                    for api_class, (calls, total_delay, max_delay) in self._stats.items()]
+
+    def _wait_turn(self, api_class):
+        submitted = time.time()
+        with self._condition:
+            start = max(self._virtual_time, self._last_finish.get(api_class, 0.0))
+            self._last_finish[api_class] = start + 1.0 / self._weights.get(api_class, 1)
+            entry = (start, next(self._sequence))
+            heapq.heappush(self._queue, entry)
+            while self._dispatching or self._queue[0] is not entry:
+                self._condition.wait()
+            heapq.heappop(self._queue)
+            self._virtual_time = start
+            self._dispatching = True
+        try:
+            # Sleeps until delay_sec after the last call started
+            self._throttle(api_class)
+        finally:
+            with self._condition:
+                self._dispatching = False
+                self._record(api_class, time.time() - submitted)
+                self._condition.notify_all()
+
+    def _dispatched(self, api_class):
+        """
+        Called as each call is started, in the order they're started
+        """
+        pass
+
+    def _record(self, api_class, delay):
+        stats = self._stats.setdefault(api_class, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += delay
+        stats[2] = max(stats[2], delay)
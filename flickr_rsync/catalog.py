@@ -0,0 +1,316 @@
+from __future__ import print_function
+import os
+import mmap
+import shutil
+import struct
+import binascii
+import logging
+import operator
+import tempfile
+from external_sort import external_sort
+from file_info import FileInfo
+from folder_info import FolderInfo
+from root_folder_info import RootFolderInfo
+from name_index import normalize_name
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'FRCAT002'
+# magic, folder count, file count, checksum index count, then the offset of each section
+HEADER = struct.Struct('<8sIII9Q')
+# name offset, name length, first file, file count, folder id
+FOLDER = struct.Struct('<QIIIq')
+FILE_FOLDER = struct.Struct('<I')
+NAME_OFFSET = struct.Struct('<Q')
+# A file's name offset and the next file's, which is where its name ends
+NAME_RANGE = struct.Struct('<2Q')
+CHECKSUM = struct.Struct('<16s')
+SIZE = struct.Struct('<q')
+ID = struct.Struct('<q')
+CHECKSUM_INDEX = struct.Struct('<I')
+CHECKSUM_ENTRY = struct.Struct('<16sI')
+NO_CHECKSUM = b'\0' * 16
+NO_VALUE = -1
+COPY_BUFSIZE = 1024 * 1024
+
+
+class Catalog(object):
+    """
+    A read only, memory mapped catalog of a storage's folders and files written by write_catalog. Files are stored as
+    fixed width columns sorted by folder and normalized name, with a checksum index, so files can be found by name or
+    checksum with a binary search without loading the catalog into python objects
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise IOError('{} is not a catalog file'.format(path))
+        if self._map.size() < HEADER.size or self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise IOError('{} is not a catalog file'.format(path))
+        (_, self.folder_count, self.file_count, self._checksum_count,
+         self._folders, self._folder_names, self._file_folders, self._name_offsets, self._names,
+         self._checksums, self._sizes, self._ids, self._checksum_index) = HEADER.unpack_from(self._map, 0)
+
+    def close(self):
+        if getattr(self, '_map', None):
+            self._map.close()
+        self._file.close()
+
+    def find_folder(self, folder_name):
+        """
+        Args:
+            folder_name: The name of the folder to find, or '' for the root folder
+
+        Returns:
+            The index of the folder, or None if it isn't in the catalog
+        """
+        key = normalize_name(folder_name)
+        low, high = 0, self.folder_count
+        while low < high:
+            mid = (low + high) // 2
+            if normalize_name(self._get_folder_name(mid)) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.folder_count and normalize_name(self._get_folder_name(low)) == key:
+            return low
+        return None
+
+    def find_file(self, folder_name, file_name):
+        """
+        Args:
+            folder_name: The name of the folder the file is in, or '' for the root folder
+            file_name: The name of the file to find
+
+        Returns:
+            The index of the file, or None if it isn't in the catalog
+        """
+        folder_index = self.find_folder(folder_name)
+        if folder_index is None:
+            return None
+        _, _, first, count, _ = self._get_folder(folder_index)
+        key = normalize_name(file_name)
+        low, high = first, first + count
+        while low < high:
+            mid = (low + high) // 2
+            if normalize_name(self._get_file_name(mid)) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < first + count and normalize_name(self._get_file_name(low)) == key:
+            return low
+        return None
+
+    def find_checksum(self, checksum):
+        """
+        Args:
+            checksum: The hex md5 checksum to find
+
+        Returns:
+            A generator of the indexes of files with the checksum
+        """
+        key = _to_checksum(checksum)
+        if key == NO_CHECKSUM:
+            return
+        low, high = 0, self._checksum_count
+        while low < high:
+            mid = (low + high) // 2
+            if self._get_checksum(self._get_checksum_entry(mid)) < key:
+                low = mid + 1
+            else:
+                high = mid
+        while low < self._checksum_count:
+            index = self._get_checksum_entry(low)
+            if self._get_checksum(index) != key:
+                break
+            yield index
+            low += 1
+
+    def get_folder(self, index):
+        """
+        Returns:
+            A FolderInfo for the folder at index
+        """
+        name = self._get_folder_name(index)
+        if not name:
+            return RootFolderInfo()
+        folder_id = self._get_folder(index)[4]
+        return FolderInfo(id=None if folder_id == NO_VALUE else folder_id, name=name)
+
+    def get_file(self, index):
+        """
+        Returns:
+            A FileInfo for the file at index
+        """
+        checksum = self._get_checksum(index)
+        size = SIZE.unpack_from(self._map, self._sizes + index * SIZE.size)[0]
+        file_id = ID.unpack_from(self._map, self._ids + index * ID.size)[0]
+        return FileInfo(
+            id=None if file_id == NO_VALUE else file_id,
+            name=self._get_file_name(index),
+            checksum=None if checksum == NO_CHECKSUM else binascii.hexlify(checksum),
+            size=None if size == NO_VALUE else size)
+
+    def get_file_folder(self, index):
+        """
+        Returns:
+            The index of the folder containing the file at index
+        """
+        return FILE_FOLDER.unpack_from(self._map, self._file_folders + index * FILE_FOLDER.size)[0]
+
+    def _get_folder(self, index):
+        return FOLDER.unpack_from(self._map, self._folders + index * FOLDER.size)
+
+    def _get_folder_name(self, index):
+        offset, length, _, _, _ = self._get_folder(index)
+        return self._map[self._folder_names + offset:self._folder_names + offset + length]
+
+    def _get_file_name(self, index):
+        start, end = NAME_RANGE.unpack_from(self._map, self._name_offsets + index * NAME_OFFSET.size)
+        return self._map[self._names + start:self._names + end]
+
+    def _get_checksum(self, index):
+        return self._map[self._checksums + index * CHECKSUM.size:self._checksums + (index + 1) * CHECKSUM.size]
+
+    def _get_checksum_entry(self, position):
+        return CHECKSUM_INDEX.unpack_from(self._map, self._checksum_index + position * CHECKSUM_INDEX.size)[0]
+
+
+def write_catalog(path, storage, root_files=False, buffer_size=None):
+    """
+    Lists every folder and file in a storage and writes them to a catalog. Files are sorted with an external sort, so
+    memory use is bounded by buffer_size however large the storage is
+
+    Args:
+        path: The catalog file to write, it is replaced once complete
+        storage: The storage to list
+        root_files: True to include root files
+        buffer_size: The number of files to sort in memory, see external_sort
+
+    Returns:
+        The number of files written
+    """
+    sort_args = {'buffer_size': buffer_size} if buffer_size else {}
+    folders = list(storage.list_folders())
+    if root_files:
+        folders.insert(0, RootFolderInfo())
+
+    # Folders are interned, each name is stored once however many files it has and case insensitive duplicates are
+    # merged into the first
+    folders_by_key = {}
+    for folder in folders:
+        folders_by_key.setdefault(normalize_name(folder.name), folder)
+    folder_keys = sorted(folders_by_key)
+    folder_indexes = dict((key, i) for i, key in enumerate(folder_keys))
+
+    def list_files():
+        for folder in folders:
+            folder_index = folder_indexes[normalize_name(folder.name)]
+            for fileinfo in storage.list_files(folder):
+                name = _to_bytes(fileinfo.name)
+                yield (folder_index, normalize_name(name), name,
+                       _to_checksum(fileinfo.checksum), _to_int(fileinfo.size), _to_int(fileinfo.id))
+
+    columns = [tempfile.TemporaryFile() for _ in range(6)]
+    file_folders, name_offsets, names, checksums, sizes, ids = columns
+    checksum_entries = tempfile.TemporaryFile()
+    try:
+        first_files = [0] * len(folder_keys)
+        file_counts = [0] * len(folder_keys)
+        file_count = 0
+        names_length = 0
+        checksum_count = 0
+        for folder_index, _, name, checksum, size, file_id in external_sort(
+                list_files(), key=operator.itemgetter(0, 1), **sort_args):
+            if file_counts[folder_index] == 0:
+                first_files[folder_index] = file_count
+            file_counts[folder_index] += 1
+            file_folders.write(FILE_FOLDER.pack(folder_index))
+            name_offsets.write(NAME_OFFSET.pack(names_length))
+            names.write(name)
+            names_length += len(name)
+            checksums.write(CHECKSUM.pack(checksum))
+            sizes.write(SIZE.pack(size))
+            ids.write(ID.pack(file_id))
+            if checksum != NO_CHECKSUM:
+                checksum_entries.write(CHECKSUM_ENTRY.pack(checksum, file_count))
+                checksum_count += 1
+            file_count += 1
+        name_offsets.write(NAME_OFFSET.pack(names_length))
+
+        folder_table = []
+        folder_names = []
+        folder_names_length = 0
+        for i, key in enumerate(folder_keys):
+            folder = folders_by_key[key]
+            name = b'' if folder.is_root else _to_bytes(folder.name)
+            folder_table.append(FOLDER.pack(
+                folder_names_length, len(name), first_files[i], file_counts[i], _to_int(folder.id)))
+            folder_names.append(name)
+            folder_names_length += len(name)
+
+        checksum_entries.seek(0)
+        checksum_index = tempfile.TemporaryFile()
+        columns.append(checksum_index)
+        for _, index in external_sort(
+                _read_checksum_entries(checksum_entries), key=operator.itemgetter(0), **sort_args):
+            checksum_index.write(CHECKSUM_INDEX.pack(index))
+
+        sections = [b''.join(folder_table), b''.join(folder_names)] + columns
+        partial_path = path + '.partial'
+        with open(partial_path, 'wb') as f:
+            f.write(b'\0' * HEADER.size)
+            offsets = []
+            for section in sections:
+                offsets.append(f.tell())
+                if isinstance(section, bytes):
+                    f.write(section)
+                else:
+                    section.seek(0)
+                    shutil.copyfileobj(section, f, COPY_BUFSIZE)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, len(folder_keys), file_count, checksum_count, *offsets))
+        if os.name == 'nt' and os.path.exists(path):
+            os.remove(path)
+        os.rename(partial_path, path)
+    finally:
+        for column in columns + [checksum_entries]:
+            column.close()
+
+    logger.debug('wrote {} folders and {} files to catalog {}'.format(
+        len(folder_keys), file_count, path))
+    return file_count
+
+
+def _read_checksum_entries(f):
+    while True:
+        entry = f.read(CHECKSUM_ENTRY.size)
+        if len(entry) < CHECKSUM_ENTRY.size:
+            return
+        yield CHECKSUM_ENTRY.unpack(entry)
+
+
+def _to_bytes(value):
+    return value.encode('utf-8') if isinstance(value, unicode) else value
+
+
+def _to_checksum(checksum):
+    if not checksum:
+        return NO_CHECKSUM
+    try:
+        value = binascii.unhexlify(checksum)
+    except (TypeError, binascii.Error):
+        return NO_CHECKSUM
+    return value if len(value) == CHECKSUM.size else NO_CHECKSUM
+
+
+def _to_int(value):
+    # Flickr ids are numeric strings, anything else isn't stored
+    try:
+        return int(value) if value is not None else NO_VALUE
+    except (TypeError, ValueError):
+        return NO_VALUE
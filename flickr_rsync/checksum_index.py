@@ -0,0 +1,62 @@
+from __future__ import print_function
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ChecksumIndex(object):
+    """
+    Finds the files in a storage by checksum, listed up front, used by Sync to detect files that have been moved
+    """
+
+    def __init__(self, storage, folders):
+        """
+        Args:
+            storage: The storage to index
+            folders: The folders of the storage to index, as returned by list_folders
+        """
+        self._files = {}
+        for folder in folders:
+            for file_info in storage.list_files(folder):
+                checksum = storage.get_checksum(file_info)
+                if checksum:
+                    # The first of any duplicate files is kept
+                    self._files.setdefault(checksum, (folder, file_info))
+        logger.debug('indexed {} checksums'.format(len(self._files)))
+
+    def find(self, checksum):
+        """
+        Returns:
+            A (folder, file_info) tuple of a file with the checksum, or None
+        """
+        return self._files.get(checksum) if checksum else None
+
+    def discard(self, checksum):
+        """
+        Stops finding a file that has been moved
+        """
+        self._files.pop(checksum, None)
+
+
+class CatalogChecksumIndex(object):
+    """
+    Finds the files in a Catalog by checksum, so moves can be detected from a previous run's catalog without listing
+    dest
+    """
+
+    def __init__(self, catalog):
+        self._catalog = catalog
+        # The catalog is read only, so moved files are remembered to avoid moving them twice
+        self._discarded = set()
+
+    def find(self, checksum):
+        if not checksum or checksum in self._discarded:
+            return None
+        index = next(self._catalog.find_checksum(checksum), None)
+        if index is None:
+            return None
+        return (self._catalog.get_folder(self._catalog.get_file_folder(index)),
+                self._catalog.get_file(index))
+
+    def discard(self, checksum):
+        self._discarded.add(checksum)
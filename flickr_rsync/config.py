@@ -3,6 +3,7 @@ import os
 import sys
 import ConfigParser
 import argparse
+import datetime
 import logging
 from distutils.util import strtobool
 from _version import __version__
@@ -22,31 +23,76 @@ DEFAULTS = {
     'list_only': False,
     'list_format': 'tree',
     'list_sort': False,
+    'list_sort_buffer': 100000,
+    'prefetch': 0,
+    'save_snapshot': '',
+    'save_catalog': '',
+    'dest_catalog': '',
     'list_folders': False,
+    'diff': False,
     'checksum': False,
     'include': '\.(jpg|jpeg|png|gif|tiff|tif|bmp|psd|svg|raw|wmv|avi|mov|mpg|mp4|3gp|ogg|ogv|m2ts)$',
     'include_dir': '',
     'exclude': '',
     'exclude_dir': '',
     'root_files': False,
+    'recursive': False,
+    'folder_separator': '/',
     'dry_run': False,
+    'sorted_merge': False,
+    'update': False,
+    'detect_moves': False,
+    'journal': '',
+    'max_failures': 0,
+    'plan': '',
+    'execute_plan': '',
+    'order': 'listing',
     'throttling': 0.5,
     'retry': 5,
+    'transfers': 1,
+    'large_file_size': 0,
+    'large_transfers': 1,
+    'list_threads': 4,
     'api_key': '',
     'api_secret': '',
     'tags': __packagename__,
     'is_public': 0,
     'is_friend': 0,
     'is_family': 0,
+    'media': 'all',
+    'min_date': '',
+    'max_date': '',
+    'filter_tags': '',
     'verbose': False}
 
 
+def _date(value):
+    # argparse also runs empty string defaults through here
+    if not value:
+        return value
+    try:
+        datetime.datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'invalid date {}, expected YYYY-MM-DD'.format(value))
+    return value
+
+
 class Config(object):
 
     LIST_FORMAT_TREE = 'tree'
     LIST_FORMAT_CSV = 'csv'
+    LIST_FORMAT_JSONL = 'jsonl'
+    MEDIA_ALL = 'all'
+    MEDIA_PHOTOS = 'photos'
+    MEDIA_VIDEOS = 'videos'
+    ORDER_LISTING = 'listing'
+    ORDER_NEWEST = 'newest'
+    ORDER_SMALLEST = 'smallest'
+    ORDER_PHOTOS = 'photos'
     PATH_FLICKR = 'flickr'
     PATH_FAKE = 'fake'
+    PATH_SNAPSHOT_PREFIX = 'snapshot:'
 
     def __getattr__(self, name):
         # Thanks:
@@ -76,16 +122,46 @@ class Config(object):
             '--list-format',
             choices=[
                 self.LIST_FORMAT_TREE,
-                self.LIST_FORMAT_CSV],
-            help='output format for --list-only, TREE for a tree based output or CSV')
+                self.LIST_FORMAT_CSV,
+                self.LIST_FORMAT_JSONL],
+            help='output format for --list-only, TREE for a tree based output, CSV or JSONL for one JSON object per line')
         parser.add_argument(
             '--list-sort',
             action='store_true',
             help='sort alphabetically when --list-only, note that this forces buffering of remote sources so will be slower')
+        parser.add_argument(
+            '--list-sort-buffer',
+            type=int,
+            metavar='NUM',
+            help='the number of items held in memory by --list-sort, larger listings are sorted using temporary files')
         parser.add_argument(
             '--list-folders',
             action='store_true',
             help='lists only folders (no files, implies --list-only)')
+        parser.add_argument(
+            '--diff',
+            action='store_true',
+            help='list the files only in src, only in dest or with different checksums instead of copying them, as CSV or JSONL with --list-format')
+        parser.add_argument(
+            '--prefetch',
+            type=int,
+            metavar='NUM',
+            help='when listing, list the files of up to NUM folders ahead concurrently')
+        parser.add_argument(
+            '--save-snapshot',
+            type=str,
+            metavar='FILE',
+            help='when listing, also save the listing to FILE. Use snapshot:FILE as src or dest to read it back')
+        parser.add_argument(
+            '--save-catalog',
+            type=str,
+            metavar='FILE',
+            help='save a catalog of the files in src to FILE instead of copying them, for use with --dest-catalog')
+        parser.add_argument(
+            '--dest-catalog',
+            type=str,
+            metavar='FILE',
+            help='check which files exist in dest using the catalog FILE instead of listing dest')
         parser.add_argument(
             '-c',
             '--checksum',
@@ -108,15 +184,89 @@ class Config(object):
             type=str,
             metavar='REGEX',
             help='exclude any directories matching REGEX, note this takes precedent over --include-dir')
+        parser.add_argument(
+            '--media',
+            choices=[
+                self.MEDIA_ALL,
+                self.MEDIA_PHOTOS,
+                self.MEDIA_VIDEOS],
+            help='include only photos or videos when listing flickr, or syncing from it')
+        parser.add_argument(
+            '--min-date',
+            type=_date,
+            metavar='YYYY-MM-DD',
+            help='include only flickr photos taken on or after this date, when listing flickr or syncing from it')
+        parser.add_argument(
+            '--max-date',
+            type=_date,
+            metavar='YYYY-MM-DD',
+            help='include only flickr photos taken on or before this date, when listing flickr or syncing from it')
+        parser.add_argument(
+            '--filter-tags',
+            type=str,
+            metavar='"TAG1,TAG2"',
+            help='include only flickr photos with any of these comma separated tags or machine tags, when listing flickr '
+                 'or syncing from it')
         parser.add_argument(
             '--root-files',
             action='store_true',
             help='includes roots files (not in a directory or a photoset) in the list or copy')
+        parser.add_argument(
+            '-r',
+            '--recursive',
+            action='store_true',
+            help='include nested local folders, named by joining their relative path with --folder-separator')
+        parser.add_argument(
+            '--folder-separator',
+            type=str,
+            metavar='STR',
+            help='the separator used to join nested folder names into a single folder (photoset) name')
         parser.add_argument(
             '-n',
             '--dry-run',
             action='store_true',
             help='in sync mode, don\'t actually copy anything, just simulate the process and output')
+        parser.add_argument(
+            '-u',
+            '--update',
+            action='store_true',
+            help='in sync mode, replace files in dest that have changed, compared by size and modification time then checksum. Flickr photos are replaced in place')
+        parser.add_argument(
+            '--detect-moves',
+            action='store_true',
+            help='in sync mode, find files missing from a dest folder elsewhere in dest by checksum and move them instead of copying them, renaming whole folders where possible')
+        parser.add_argument(
+            '--journal',
+            type=str,
+            metavar='FILE',
+            help='in sync mode, record progress in FILE so an interrupted sync can be resumed by running it again, FILE is removed once the sync completes')
+        parser.add_argument(
+            '--max-failures',
+            type=int,
+            metavar='NUM',
+            help='in sync mode, abort once more than NUM files have failed to copy, 0 to never abort. Failed files are retried once at the end of the sync')
+        parser.add_argument(
+            '--plan',
+            type=str,
+            metavar='FILE',
+            help='in sync mode, write the copies, moves and renames the sync would make to FILE instead of making them, with an estimate of the API calls and time they\'ll take')
+        parser.add_argument(
+            '--execute-plan',
+            type=str,
+            metavar='FILE',
+            help='run the sync written to FILE by --plan, without listing src or dest again')
+        parser.add_argument(
+            '--order',
+            choices=[
+                self.ORDER_LISTING,
+                self.ORDER_NEWEST,
+                self.ORDER_SMALLEST,
+                self.ORDER_PHOTOS],
+            help='in sync mode, the order to copy files in: as listed, newest folders first, smallest files first or photos before videos. Files are copied once every folder has been compared')
+        parser.add_argument(
+            '--sorted-merge',
+            action='store_true',
+            help='compare each folder by sorting src and dest file names on disk instead of in memory, for very large folders')
         parser.add_argument(
             '--throttling',
             type=float,
@@ -127,6 +277,26 @@ class Config(object):
             type=int,
             metavar='NUM',
             help='the number of times to retry a network call (using exponential backoff) before failing')
+        parser.add_argument(
+            '--transfers',
+            type=int,
+            metavar='NUM',
+            help='the number of files to copy concurrently')
+        parser.add_argument(
+            '--large-file-size',
+            type=int,
+            metavar='MB',
+            help='copy files of at least MB megabytes, and videos of unknown size, in a separate lane so they don\'t hold up smaller files, 0 to copy all files in one lane')
+        parser.add_argument(
+            '--large-transfers',
+            type=int,
+            metavar='NUM',
+            help='the number of large files to copy concurrently with --large-file-size, alongside --transfers smaller files')
+        parser.add_argument(
+            '--list-threads',
+            type=int,
+            metavar='NUM',
+            help='the number of threads used to read nested local folders with --recursive')
         parser.add_argument('--api-key', type=str,
                             help='flickr API key')
         parser.add_argument('--api-secret', type=str,
@@ -200,13 +370,27 @@ class Config(object):
     def _read_options_section(self, config, options):
         if not config.has_section(OPTIONS_SECTION):
             return
-        items = self._read_section(config, NETWORK_SECTION, {
+        items = self._read_section(config, OPTIONS_SECTION, {
             'list_only': bool,
             'list_format': lambda item: item.lower(),
             'list_sort': bool,
+            'list_sort_buffer': int,
             'list_folders': bool,
+            'diff': bool,
+            'prefetch': int,
+            'save_snapshot': str,
+            'save_catalog': str,
+            'dest_catalog': str,
             'checksum': bool,
             'dry_run': bool,
+            'sorted_merge': bool,
+            'update': bool,
+            'detect_moves': bool,
+            'journal': str,
+            'max_failures': int,
+            'plan': str,
+            'execute_plan': str,
+            'order': lambda item: item.lower(),
             'verbose': bool
         })
         options.update(items)
@@ -216,7 +400,11 @@ class Config(object):
             return
         items = self._read_section(config, NETWORK_SECTION, {
             'throttling': float,
-            'retry': int
+            'retry': int,
+            'transfers': int,
+            'large_file_size': int,
+            'large_transfers': int,
+            'list_threads': int
         })
         options.update(items)
 
@@ -224,7 +412,8 @@ class Config(object):
         if not config.has_section(FILES_SECTION):
             return
         items = self._read_section(config, FILES_SECTION, {
-            'root_files': bool
+            'root_files': bool,
+            'recursive': bool
         })
         options.update(items)
 
@@ -234,7 +423,8 @@ class Config(object):
         items = self._read_section(config, FLICKR_SECTION, {
             'is_public': int,
             'is_friend': int,
-            'is_family': int
+            'is_family': int,
+            'media': lambda item: item.lower()
         })
         options.update(items)
 
@@ -1,10 +1,12 @@
 from __future__ import print_function
-import multiprocessing
+import itertools
 import time
 import logging
-from rx import Observable
 from walker import Walker
 from root_folder_info import RootFolderInfo
+from external_sort import external_sort
+from prefetch import prefetch
+from sinks import CsvSink
 
 logger = logging.getLogger(__name__)
 
@@ -14,50 +16,68 @@ class CsvWalker(Walker):
     def __init__(self, config, storage):
         self._config = config
         self._storage = storage
+        self._out = self._create_sink()
 
     def walk(self):
         start = time.time()
+        try:
+            self._walk()
+        finally:
+            self._out.close()
+        self._print_summary(time.time() - start)
 
-        # Create source stream
-        folders = Observable.from_(self._storage.list_folders())
+    def _walk(self):
+        folders = self._storage.list_folders()
         if self._config.root_files:
-            folders = folders.start_with(RootFolderInfo())
+            folders = itertools.chain([RootFolderInfo()], folders)
         if self._config.list_folders:
-            print("Folder")
+            self._print_folder_header()
             if self._config.list_sort:
-                folders = folders.to_sorted_list(
-                    key_selector=lambda folder: folder.name) .flat_map(
-                    lambda x: x)
-            folders.subscribe(
-                on_next=lambda folder: print(
-                    folder.name) if folder else '',
-                on_completed=lambda: self._print_summary(
-                    time.time() - start))
+                folders = external_sort(
+                    folders,
+                    key=lambda folder: folder.name,
+                    buffer_size=self._config.list_sort_buffer)
+            for folder in folders:
+                self._print_folder(folder)
         else:
-            print("Folder, Filename, Checksum")
+            self._print_file_header()
             # Expand folder stream into file stream
-            files = folders.concat_map(lambda folder: Observable.from_(
-                (fileinfo, folder) for fileinfo in self._storage.list_files(folder)))
+            if self._config.prefetch > 0:
+                folder_files = prefetch(
+                    folders,
+                    lambda folder: list(self._storage.list_files(folder)),
+                    self._config.prefetch)
+            else:
+                folder_files = ((folder, self._storage.list_files(folder))
+                                for folder in folders)
+            files = ((fileinfo, folder)
+                     for folder, fileinfos in folder_files
+                     for fileinfo in fileinfos)
             # Print each file
             if self._config.list_sort:
-                files = files.to_sorted_list(
-                    key_selector=lambda fileinfo_folder: "{} {}".format(
+                files = external_sort(
+                    files,
+                    key=lambda fileinfo_folder: (
                         fileinfo_folder[1].name,
-                        fileinfo_folder[0].name)) .flat_map(
-                    lambda x: x)
-            files.subscribe(
-                on_next=lambda fileinfo_folder1: self._print_file(
-                    fileinfo_folder1[1],
-                    fileinfo_folder1[0]),
-                on_completed=lambda: self._print_summary(
-                    time.time() - start))
+                        fileinfo_folder[0].name),
+                    buffer_size=self._config.list_sort_buffer)
+            for fileinfo, folder in files:
+                self._print_file(folder, fileinfo)
+
+    def _create_sink(self):
+        return CsvSink()
+
+    def _print_folder_header(self):
+        self._out.write_row(["Folder"])
+
+    def _print_folder(self, folder):
+        self._out.write_row([folder.name])
+
+    def _print_file_header(self):
+        self._out.write_row(["Folder", "Filename", "Checksum"])
 
     def _print_file(self, folder, fileinfo):
-        print(
-            "{}, {}, {}".format(
-                folder.name if folder else '',
-                fileinfo.name,
-                fileinfo.checksum))
+        self._out.write_row([folder.name, fileinfo.name, fileinfo.checksum])
 
     def _print_summary(self, elapsed):
         logger.info("\ndone in {} sec".format(round(elapsed, 2)))
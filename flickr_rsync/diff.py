@@ -0,0 +1,117 @@
+from __future__ import print_function
+import itertools
+import operator
+import time
+import logging
+from config import Config
+from root_folder_info import RootFolderInfo
+from external_sort import external_sort
+from merge_join import merge_join
+from name_index import normalize_name
+from prefetch import prefetch
+from sinks import CsvSink, JsonLinesSink
+
+logger = logging.getLogger(__name__)
+
+STATUS_SRC_ONLY = 'src-only'
+STATUS_DEST_ONLY = 'dest-only'
+STATUS_CHANGED = 'changed'
+
+
+class Diff(object):
+    """
+    Compares every file in src and dest, printing those only in src, only in dest or with different checksums or
+    sizes. Both listings are sorted by folder and file name with an external sort then merge joined, so memory use is
+    bounded however many files there are
+    """
+
+    def __init__(self, config, src, dest):
+        self._config = config
+        self._src = src
+        self._dest = dest
+        self._jsonl = config.list_format == Config.LIST_FORMAT_JSONL
+        self._out = JsonLinesSink() if self._jsonl else CsvSink()
+
+    def run(self):
+        start = time.time()
+        counts = dict.fromkeys(
+            [STATUS_SRC_ONLY, STATUS_DEST_ONLY, STATUS_CHANGED], 0)
+        try:
+            self._print_header()
+            for src_item, dest_item in merge_join(
+                    self._sorted_files(self._src),
+                    self._sorted_files(self._dest),
+                    key=operator.itemgetter(0)):
+                status = self._get_status(src_item, dest_item)
+                if status:
+                    counts[status] += 1
+                    self._print_diff(status, src_item, dest_item)
+        finally:
+            self._out.close()
+
+        self._print_summary(time.time() - start, counts)
+
+    def _sorted_files(self, storage):
+        folders = storage.list_folders()
+        if self._config.root_files:
+            folders = itertools.chain([RootFolderInfo()], folders)
+        if self._config.prefetch > 0:
+            folder_files = prefetch(
+                folders,
+                lambda folder: list(storage.list_files(folder)),
+                self._config.prefetch)
+        else:
+            folder_files = ((folder, storage.list_files(folder))
+                            for folder in folders)
+        items = (((normalize_name(folder.name), normalize_name(fileinfo.name)), folder.name, fileinfo)
+                 for folder, fileinfos in folder_files
+                 for fileinfo in fileinfos)
+        return external_sort(
+            items,
+            key=operator.itemgetter(0),
+            buffer_size=self._config.list_sort_buffer)
+
+    def _get_status(self, src_item, dest_item):
+        if dest_item is None:
+            return STATUS_SRC_ONLY
+        if src_item is None:
+            return STATUS_DEST_ONLY
+        src_file = src_item[2]
+        dest_file = dest_item[2]
+        if (_differs(src_file.checksum, dest_file.checksum) or
+                _differs(src_file.size, dest_file.size)):
+            return STATUS_CHANGED
+        return None
+
+    def _print_header(self):
+        if not self._jsonl:
+            self._out.write_row(
+                ["Status", "Folder", "Filename", "Src Checksum", "Dest Checksum"])
+
+    def _print_diff(self, status, src_item, dest_item):
+        _, folder_name, fileinfo = src_item or dest_item
+        src_checksum = src_item[2].checksum if src_item else None
+        dest_checksum = dest_item[2].checksum if dest_item else None
+        if self._jsonl:
+            self._out.write_record([
+                ('status', status),
+                ('folder', folder_name),
+                ('name', fileinfo.name),
+                ('src_checksum', src_checksum),
+                ('dest_checksum', dest_checksum)])
+        else:
+            self._out.write_row(
+                [status, folder_name, fileinfo.name, src_checksum, dest_checksum])
+
+    def _print_summary(self, elapsed, counts):
+        logger.info(
+            "\n{} file(s) only in src, {} only in dest, {} changed in {} sec".format(
+                counts[STATUS_SRC_ONLY],
+                counts[STATUS_DEST_ONLY],
+                counts[STATUS_CHANGED],
+                round(elapsed, 2)))
+
+
+def _differs(src_value, dest_value):
+    # Only compare values both storages know, e.g. local checksums are only read with --checksum
+    return src_value is not None and dest_value is not None and src_value != dest_value
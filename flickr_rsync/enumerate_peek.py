@@ -12,7 +12,10 @@ def enumerate_peek(items):
         A tuple (item, has_next) where has_next indicates there are more items
     """
     iterator = iter(items)
-    current = next(iterator)
+    try:
+        current = next(iterator)
+    except StopIteration:
+        return
     while True:
         try:
             next_item = next(iterator)
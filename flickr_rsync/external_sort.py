@@ -0,0 +1,79 @@
+from __future__ import print_function
+import heapq
+import logging
+import tempfile
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_SIZE = 100000
+
+
+def external_sort(items, key, buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    Sorts an iterator or sequence of any size in bounded memory. Items are sorted in runs of buffer_size which are
+    spilled to temporary files and lazily merged, so at most buffer_size items are held in memory at once
+
+    Args:
+        items: An iterator or sequence of picklable items
+        key: A function returning the sort key of an item
+        buffer_size: The maximum number of items to hold in memory
+
+    Returns:
+        A generator of the items in sorted order, the sort is stable
+    """
+    runs = []
+    buffer = []
+    try:
+        for item in items:
+            buffer.append(item)
+            if len(buffer) >= buffer_size:
+                buffer.sort(key=key)
+                runs.append(_spill(buffer))
+                buffer = []
+        buffer.sort(key=key)
+
+        if not runs:
+            for item in buffer:
+                yield item
+            return
+
+        logger.debug('sorting {} runs of {} items on disk'.format(
+            len(runs) + 1, buffer_size))
+        sources = [_read_run(run) for run in runs] + [iter(buffer)]
+        decorated = [_decorate(source, key, run_index)
+                     for run_index, source in enumerate(sources)]
+        for _, _, _, item in heapq.merge(*decorated):
+            yield item
+    finally:
+        for run in runs:
+            run.close()
+
+
+def _decorate(items, key, run_index):
+    # Include the run and position so ties keep their original order and items are never compared
+    for i, item in enumerate(items):
+        yield (key(item), run_index, i, item)
+
+
+def _spill(items):
+    run = tempfile.TemporaryFile()
+    pickler = pickle.Pickler(run, pickle.HIGHEST_PROTOCOL)
+    for item in items:
+        pickler.dump(item)
+        # Don't let the pickler memo hold a reference to every item written
+        pickler.clear_memo()
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    unpickler = pickle.Unpickler(run)
+    while True:
+        try:
+            yield unpickler.load()
+        except EOFError:
+            return
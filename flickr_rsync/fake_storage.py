@@ -35,7 +35,7 @@ class FakeStorage(Storage):
                     i, file_count))
             yield self._intense_calculation(FileInfo(id=i, name=name))
 
-    def copy_file(self, fileinfo, folder_name, dest_storage):
+    def copy_file(self, fileinfo, folder_name, dest_storage, dest_file=None):
         self._intense_calculation(None)
 
     def _get_char(self, num, max_num):
@@ -0,0 +1,135 @@
+from __future__ import print_function
+import os
+import sys
+import errno
+import shutil
+import ctypes
+import ctypes.util
+import logging
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Linux ioctl to share the source file's extents with the destination (btrfs, xfs, ...), _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+COPY_BUFSIZE = 1024 * 1024
+# Errors raised when a copy mechanism isn't supported for this pair of files, rather than failing part way
+_UNSUPPORTED_ERRNOS = set(getattr(errno, name) for name in (
+    'ENOSYS', 'EXDEV', 'EINVAL', 'ENOTSUP', 'EOPNOTSUPP', 'ENOTTY', 'ENOTSOCK', 'EBADF') if hasattr(errno, name))
+
+
+def _load_libc():
+    # Python 2 has no os.copy_file_range or os.sendfile, so the syscalls are called through the C library
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    except OSError:
+        return None
+    offset_p = ctypes.POINTER(ctypes.c_int64)
+    if hasattr(libc, 'copy_file_range'):
+        libc.copy_file_range.argtypes = [
+            ctypes.c_int, offset_p, ctypes.c_int, offset_p, ctypes.c_size_t, ctypes.c_uint]
+        libc.copy_file_range.restype = ctypes.c_ssize_t
+    if hasattr(libc, 'sendfile64'):
+        libc.sendfile64.argtypes = [ctypes.c_int, ctypes.c_int, offset_p, ctypes.c_size_t]
+        libc.sendfile64.restype = ctypes.c_ssize_t
+    return libc
+
+
+_libc = _load_libc()
+
+
+def fast_copy(src, dest):
+    """
+    Copies a file's contents and modification time, using the fastest mechanism the platform supports. In order of
+    preference a reflink (copy-on-write clone), copy_file_range, sendfile then a plain buffered copy
+
+    Args:
+        src: The file system path to copy from
+        dest: The file system path to copy to, it will be overwritten if it exists
+    """
+    with open(src, 'rb') as fsrc:
+        with open(dest, 'wb') as fdest:
+            size = os.fstat(fsrc.fileno()).st_size
+            if not (_reflink(fsrc, fdest) or
+                    _copy_file_range(fsrc, fdest, size) or
+                    _sendfile(fsrc, fdest, size)):
+                shutil.copyfileobj(fsrc, fdest, COPY_BUFSIZE)
+    stat = os.stat(src)
+    os.utime(dest, (stat.st_atime, stat.st_mtime))
+
+
+def _reflink(fsrc, fdest):
+    if fcntl is None or not sys.platform.startswith('linux'):
+        return False
+    try:
+        fcntl.ioctl(fdest.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except (IOError, OSError) as ex:
+        if ex.errno in _UNSUPPORTED_ERRNOS:
+            return False
+        raise
+
+
+def _copy_file_range(fsrc, fdest, size):
+    # Added in glibc 2.27
+    if _libc is None or not hasattr(_libc, 'copy_file_range'):
+        return False
+
+    def copy_chunk(offset, count):
+        offset_in = ctypes.c_int64(offset)
+        offset_out = ctypes.c_int64(offset)
+        return _check_call(_libc.copy_file_range(
+            fsrc.fileno(), ctypes.byref(offset_in), fdest.fileno(), ctypes.byref(offset_out), count, 0))
+
+    return _kernel_copy(copy_chunk, size)
+
+
+def _sendfile(fsrc, fdest, size):
+    if _libc is None or not hasattr(_libc, 'sendfile64'):
+        return False
+
+    def copy_chunk(offset, count):
+        # sendfile writes at the destination's file position, which is only moved by the copy itself
+        offset_in = ctypes.c_int64(offset)
+        return _check_call(_libc.sendfile64(
+            fdest.fileno(), fsrc.fileno(), ctypes.byref(offset_in), count))
+
+    return _kernel_copy(copy_chunk, size)
+
+
+def _check_call(result):
+    """
+    Returns:
+        The result of a C library call returning ssize_t
+
+    Raises:
+        OSError: If the call failed
+    """
+    if result == -1:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+    return result
+
+
+def _kernel_copy(copy_chunk, size):
+    offset = 0
+    while offset < size:
+        try:
+            copied = copy_chunk(offset, size - offset)
+        except OSError as ex:
+            # Only fall back if nothing has been written yet, otherwise the destination is half copied
+            if offset == 0 and ex.errno in _UNSUPPORTED_ERRNOS:
+                return False
+            raise
+        if copied == 0:
+            # Some file systems report success without copying anything
+            if offset == 0:
+                return False
+            break
+        offset += copied
+    return True
@@ -0,0 +1,69 @@
+from __future__ import print_function
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Matches patterns that only test a file extension, e.g. \.(jpg|jpeg|png)$ or \.jpg$
+EXTENSION_PATTERN = re.compile(r'^\\\.(?:\((?:\?:)?([\w|-]+)\)|([\w-]+))\$$')
+
+
+class FileFilter(object):
+    """
+    Compiled --include / --exclude filters, built once from config and shared by all storages. Patterns that only
+    match file extensions are turned into a suffix lookup, anything else is compiled as a case insensitive regex
+    """
+
+    def __init__(self, config):
+        self._include = _compile(config.include)
+        self._exclude = _compile(config.exclude)
+        self._include_dir = _compile(config.include_dir)
+        self._exclude_dir = _compile(config.exclude_dir)
+
+    def include_file(self, name):
+        """
+        Tests a file name against --include and --exclude
+
+        Args:
+            name: The file name to test
+
+        Returns:
+            True if the file should be included
+        """
+        return _should_include(name, self._include, self._exclude)
+
+    def include_folder(self, name):
+        """
+        Tests a folder name against --include-dir and --exclude-dir
+
+        Args:
+            name: The folder name to test
+
+        Returns:
+            True if the folder should be included
+        """
+        return _should_include(name, self._include_dir, self._exclude_dir)
+
+
+def _should_include(name, include, exclude):
+    return ((include is None or include(name)) and
+            (exclude is None or not exclude(name)))
+
+
+def _compile(pattern):
+    if not pattern:
+        return None
+    match = EXTENSION_PATTERN.match(pattern)
+    if match:
+        extensions = (match.group(1) or match.group(2)).split('|')
+        if all(extensions):
+            logger.debug('using extension filter for {}'.format(pattern))
+            return _extension_matcher(set(x.lower() for x in extensions))
+    return re.compile(pattern, flags=re.IGNORECASE).search
+
+
+def _extension_matcher(extensions):
+    def match(name):
+        dot = name.rfind('.')
+        return dot >= 0 and name[dot + 1:].lower() in extensions
+    return match
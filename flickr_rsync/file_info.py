@@ -1,10 +1,14 @@
 class FileInfo(object):
+    # Slots rather than a __dict__ per instance, listings can hold millions of these
+    __slots__ = ('id', 'name', 'full_path', 'checksum', 'size', 'mtime')
 
     def __init__(self, **kwargs):
         self.id = kwargs.get('id')
         self.name = kwargs.get('name')
         self.full_path = kwargs.get('full_path')
         self.checksum = kwargs.get('checksum')
+        self.size = kwargs.get('size')
+        self.mtime = kwargs.get('mtime')
 
     def __repr__(self):
         return "FileInfo: {{id={}, name={}}}".format(self.id, self.name)
@@ -1,19 +1,30 @@
 from __future__ import print_function
 import os
 import sys
-import re
+import json
+import hashlib
 import webbrowser
 import datetime
 import logging
+import threading
+import functools
+from tempfile import NamedTemporaryFile
+from collections import namedtuple
 from storage import RemoteStorage
 import flickr_api
 from flickr_api.api import flickr
+from flickr_api.method_call import call_api
+from flickr_api.flickrerrors import FlickrAPIError
 from file_info import FileInfo
 from folder_info import FolderInfo
-from local_storage import mkdirp
+from name_index import normalize_name
+from local_storage import mkdirp, atomic_write
+from api_scheduler import UPLOAD, DOWNLOAD, UPDATE
 from config import __packagename__
 
 TOKEN_FILENAME = __packagename__ + '.token'
+# The identity of the token's user, saved alongside the token so it isn't looked up by logging in on every run
+USER_EXTENSION = '.user'
 """
 About Tags
 ----------
@@ -35,18 +46,60 @@ a value, i.e. 123456 [which one is this]
 CHECKSUM_PREFIX = 'checksum:md5'
 EXTENSION_PREFIX = 'flickrrsync:extn'
 OAUTH_PERMISSIONS = 'write'
+SEARCH_PAGE_SIZE = 500
+# The number of photos in each page of a photoset listing
+PHOTOSET_PAGE_SIZE = 500
+# The error code of flickr.photosets.addPhoto for a photo that's already in the photoset
+PHOTO_IN_SET_CODE = 3
+# media is requested so downloads don't need to look up each photo's info again
+LIST_EXTRAS = 'original_format,tags,media'
+# Photoset counts to check when filtering by media, photosets with none of the media are skipped without listing
+MEDIA_COUNTS = {'photos': 'photos', 'videos': 'videos'}
+# The fields of a search result read by _get_file_info, as the search returns plain dicts rather than Photos
+SearchPhoto = namedtuple('SearchPhoto', ['id', 'title', 'tags', 'originalformat', 'media'])
 logger = logging.getLogger(__name__)
 
 
 class FlickrStorage(RemoteStorage):
+    # Changed photos are replaced in place, keeping their comments, favourites and photosets
+    can_update = True
+    # Moves only change photoset membership and titles, no photos are transferred
+    can_move = True
 
-    def __init__(self, config, resiliently):
+    def __init__(self, config, resiliently, file_filter, journal=None, http_pool=None):
+        """
+        Args:
+            journal: An optional Journal to record uploads in, so photos uploaded but not added to their photoset by an
+                interrupted sync can be added by resume
+            http_pool: An optional HttpPool to send all API calls, uploads and downloads through
+        """
         self._config = config
         self._resiliently = resiliently
+        self._resiliently.on_token_rejected = self._token_rejected
+        self._file_filter = file_filter
+        self._journal = journal
+        self._http_pool = http_pool
+        if http_pool:
+            http_pool.install()
         self._is_authenticated = False
         self._user = None
+        self._user_path = None
+        self._token_digest = None
+        # Whether _user was loaded from the user file rather than by logging in, so the token is yet to be checked
+        self._user_cached = False
+        self._logged_in_again = False
+        self._login_lock = threading.Lock()
         self._photosets = {}
-        self._photos = {}
+        self._photosets_listed = False
+        # Only what's needed to download a listed photo is kept, rather than every Photo object
+        self._is_video = {}
+        # Guards photoset creation when uploading from multiple threads
+        self._photosets_lock = threading.Lock()
+        # Set by _search and _get_search_photosets
+        self._search_photos = None
+        self._search_photosets = None
+        self._search_photosets_checked = False
+        self._search_lock = threading.Lock()
 
     def list_folders(self):
         """
@@ -57,19 +110,15 @@ class FlickrStorage(RemoteStorage):
         """
         self._authenticate()
 
-        walker = self._resiliently.call(
-            flickr_api.objects.Walker,
-            self._user.getPhotosets)
+        walker = self._walk(self._user.getPhotosets)
         for photoset in walker:
             self._photosets[photoset.id] = photoset
             folder = FolderInfo(
                 id=photoset.id,
                 name=photoset.title.encode('utf-8'))
-            if self._should_include(
-                    folder.name,
-                    self._config.include_dir,
-                    self._config.exclude_dir):
+            if self._file_filter.include_folder(folder.name):
                 yield folder
+        self._photosets_listed = True
 
     def list_files(self, folder):
         """
@@ -87,24 +136,10 @@ class FlickrStorage(RemoteStorage):
         """
         self._authenticate()
 
-        if not folder.is_root:
-            walker = self._resiliently.call(
-                flickr_api.objects.Walker,
-                self._photosets[folder.id].getPhotos,
-                extras='original_format,tags')
-        else:
-            walker = self._resiliently.call(
-                flickr_api.objects.Walker,
-                self._user.getNotInSetPhotos,
-                extras='original_format,tags')
-
-        for photo in walker:
-            self._photos[photo.id] = photo
+        for photo in self._list_photos(folder):
             file_info = self._get_file_info(photo)
-            if self._should_include(
-                    file_info.name,
-                    self._config.include,
-                    self._config.exclude):
+            if self._file_filter.include_file(file_info.name):
+                self._is_video[photo.id] = photo.media == 'video'
                 yield file_info
 
     def download(self, file_info, dest_path):
@@ -114,15 +149,22 @@ class FlickrStorage(RemoteStorage):
         Args:
             file_info: The file info object (as returned by list_files) of the file to download
             dest_path: The file system path to save the file to
-
-        Raises:
-            KeyError: If the file_info.id is unrecognised
         """
+        self._authenticate()
+
+        is_video = self._is_video.get(file_info.id)
+        if is_video is None:
+            # Not listed, e.g. when running a plan, so look up whether it's a video
+            info = self._resiliently.call(flickr_api.Photo(id=file_info.id).getInfo)
+            is_video = info.get('media') == 'video'
         mkdirp(dest_path)
-        photo = self._photos[file_info.id]
-        is_video = photo.media == 'video'
+        photo = flickr_api.Photo(
+            id=file_info.id, media='video' if is_video else 'photo')
         size = 'Video Original' if is_video else 'Original'
-        self._resiliently.call(photo.save, dest_path, size_label=size)
+        if self._http_pool:
+            self._resiliently.call_as(DOWNLOAD, self._save, photo, dest_path, size)
+        else:
+            self._resiliently.call_as(DOWNLOAD, photo.save, dest_path, size_label=size)
 
     def upload(self, src_path, folder_name, file_name, checksum):
         """
@@ -136,13 +178,16 @@ class FlickrStorage(RemoteStorage):
         Raises:
             KeyError: If the file_info.id is unrecognised
         """
+        self._authenticate()
+
         extension = os.path.splitext(file_name)[1][1:]
         tags = '{} "{}={}"'.format(
             self._config.tags, EXTENSION_PREFIX, extension)
         if checksum:
             tags = '{} {}={}'.format(tags, CHECKSUM_PREFIX, checksum)
 
-        photo = self._resiliently.call(
+        photo = self._resiliently.call_as(
+            UPLOAD,
             flickr_api.upload,
             photo_file=src_path,
             title=os.path.splitext(file_name)[0],
@@ -153,27 +198,179 @@ class FlickrStorage(RemoteStorage):
             async=0)
 
         if folder_name:
-            photoset = self._get_folder_by_name(folder_name)
-            if not photoset:
-                photoset = self._resiliently.call(
-                    flickr_api.Photoset.create, title=folder_name, primary_photo=photo)
-                self._photosets[photoset.id] = photoset
-            else:
-                self._resiliently.call(photoset.addPhoto, photo=photo)
+            if self._journal:
+                self._journal.uploaded(folder_name, file_name, photo.id)
+            self._add_to_photoset(photo, folder_name)
+            if self._journal:
+                self._journal.added(photo.id)
+
+    def resume(self):
+        """
+        Adds photos uploaded by an interrupted sync to the photosets they weren't added to
+        """
+        if not self._journal:
+            return
+        self._authenticate()
+        for photo_id, folder_name in self._journal.pending_uploads():
+            logger.info("adding uploaded photo {} to {}".format(photo_id, folder_name))
+            try:
+                self._add_to_photoset(flickr_api.Photo(id=photo_id), folder_name)
+            except FlickrAPIError as e:
+                # The sync was interrupted after the photo was added, but before that was journaled
+                if e.code != PHOTO_IN_SET_CODE:
+                    raise
+            self._journal.added(photo_id)
+
+    def replace(self, src_path, file_info, checksum):
+        """
+        Replaces the image of an existing photo in Flickr from local file system, keeping its title, photosets,
+        comments and favourites
+
+        Args:
+            src_path: The file system path to upload the photo from
+            file_info: The file info object (as returned by list_files) of the photo to replace
+            checksum: The checksum of the new image, replaces the photo's checksum tag
+        """
+        self._authenticate()
+
+        self._resiliently.call_as(
+            UPLOAD,
+            flickr_api.replace,
+            photo_file=src_path,
+            photo_id=file_info.id,
+            async=0)
+
+        if checksum and checksum != file_info.checksum:
+            photo = flickr_api.Photo(id=file_info.id)
+            for tag in self._resiliently.call(photo.getTags):
+                if tag.text.split('=')[0] == CHECKSUM_PREFIX:
+                    self._resiliently.call_as(UPDATE, tag.remove)
+            self._resiliently.call_as(
+                UPDATE, photo.addTags, '{}={}'.format(CHECKSUM_PREFIX, checksum))
+
+    def rename_folder(self, folder, name):
+        """
+        Renames a photoset
+
+        Args:
+            folder: The FolderInfo object of the photoset to rename
+            name: The new title of the photoset
+
+        Returns:
+            A FolderInfo for the renamed photoset
+        """
+        self._authenticate()
+
+        photoset = self._get_photoset(folder)
+        self._resiliently.call_as(UPDATE, photoset.editMeta, title=name)
+        with self._photosets_lock:
+            # Photoset attributes are read only, so the cached photoset is replaced to find it by its new title
+            self._photosets[photoset.id] = flickr_api.Photoset(id=photoset.id, title=name.decode('utf-8'))
+        return FolderInfo(id=photoset.id, name=name)
+
+    def move_file(self, file_info, folder, dest_folder_name, dest_name):
+        """
+        Moves a photo from one photoset to another by adding it to the new photoset and removing it from the old one,
+        and updates its title if it has been renamed
 
-    def copy_file(self, file_info, folder_name, dest_storage):
+        Args:
+            file_info: The file info object of the photo to move
+            folder: The FolderInfo object of the photoset to move the photo from, or the root folder if the photo isn't
+                in a photoset
+            dest_folder_name: The title of the photoset to move the photo to, it's created if it doesn't exist
+            dest_name: The new name of the photo
+        """
+        self._authenticate()
+
+        photo = flickr_api.Photo(id=file_info.id)
+        if normalize_name(dest_name) != normalize_name(file_info.name):
+            self._resiliently.call_as(
+                UPDATE, photo.setMeta, title=os.path.splitext(dest_name)[0])
+        if normalize_name(dest_folder_name) == normalize_name(folder.name):
+            return
+        if dest_folder_name:
+            self._add_to_photoset(photo, dest_folder_name)
+        if not folder.is_root:
+            self._resiliently.call_as(
+                UPDATE, self._get_photoset(folder).removePhoto, photo=photo)
+
+    def copy_file(self, file_info, folder_name, dest_storage, dest_file=None):
         if isinstance(dest_storage, RemoteStorage):
             temp_file = NamedTemporaryFile()
             self.download(file_info, temp_file.name)
-            dest_storage.upload(
-                temp_file.name,
-                folder_name,
-                file_info.name,
-                file_info.checksum)
+            if dest_file:
+                dest_storage.replace(
+                    temp_file.name, dest_file, file_info.checksum)
+            else:
+                dest_storage.upload(
+                    temp_file.name,
+                    folder_name,
+                    file_info.name,
+                    file_info.checksum)
             temp_file.close()
         else:
-            dest = os.path.join(dest_storage.path, folder_name, file_info.name)
-            self.download(file_info, dest)
+            dest = os.path.join(
+                dest_storage.get_folder_path(folder_name),
+                dest_file.name if dest_file else file_info.name)
+            with atomic_write(dest) as temp_path:
+                self.download(file_info, temp_path)
+
+    def stats(self):
+        stats = self._resiliently.stats()
+        if self._http_pool and self._config.verbose:
+            stats = stats + self._http_pool.stats()
+        return stats
+
+    def _save(self, photo, dest_path, size):
+        # Photo.save opens a new connection for each download and reads the whole file into memory
+        self._http_pool.download(photo.getPhotoFile(size_label=size), dest_path)
+
+    def _add_to_photoset(self, photo, folder_name):
+        self._list_photosets()
+        with self._photosets_lock:
+            photoset = self._get_folder_by_name(folder_name)
+            if not photoset:
+                photoset = self._resiliently.call_as(
+                    UPDATE, flickr_api.Photoset.create, title=folder_name, primary_photo=photo)
+                self._photosets[photoset.id] = photoset
+                return
+        self._resiliently.call_as(UPDATE, photoset.addPhoto, photo=photo)
+
+    def is_filtered(self):
+        return bool(self._get_filter_args() or self._get_search_args())
+
+    def _list_photos(self, folder):
+        # Filters are pushed to Flickr where the API supports them, photosets can only be filtered by media so
+        # dates and tags are applied with a single search of the whole account
+        filter_args = self._get_filter_args()
+        if not folder.is_root and not self._has_media(self._photosets[folder.id]):
+            return []
+        search_ids = None
+        if self._get_search_args() and (not folder.is_root or self._config.filter_tags):
+            photosets = self._get_search_photosets()
+            if photosets is not None:
+                return photosets.get(None if folder.is_root else folder.id, [])
+            search_ids = set(photo.id for photo in self._search())
+        if folder.is_root:
+            filter_args.update(self._get_date_args())
+            walker = self._walk(self._user.getNotInSetPhotos, extras=LIST_EXTRAS, **filter_args)
+        else:
+            walker = self._walk(self._photosets[folder.id].getPhotos, extras=LIST_EXTRAS, **filter_args)
+        return (photo for photo in walker if search_ids is None or photo.id in search_ids)
+
+    def _walk(self, method, **kwargs):
+        # Walker fetches a page per call to method, so each page is scheduled and retried as its own list call
+        return flickr_api.objects.Walker(functools.partial(self._resiliently.call, method), **kwargs)
+
+    def _get_photoset(self, folder):
+        self._list_photosets()
+        return self._photosets[unicode(folder.id)]
+
+    def _list_photosets(self):
+        # Folders may come from a catalog rather than list_folders
+        if not self._photosets_listed:
+            for _ in self.list_folders():
+                pass
 
     def _get_folder_by_name(self, name):
         return next((x for x in self._photosets.values()
@@ -202,14 +399,124 @@ class FlickrStorage(RemoteStorage):
             name += "." + extension
         return FileInfo(id=photo.id, name=name, checksum=checksum)
 
-    def _should_include(self, name, include_pattern, exclude_pattern):
-        return ((not include_pattern or re.search(include_pattern, name, flags=re.IGNORECASE)) and
-                (not exclude_pattern or not re.search(exclude_pattern, name, flags=re.IGNORECASE)))
+    def _get_filter_args(self):
+        if self._config.media in MEDIA_COUNTS:
+            return {'media': self._config.media}
+        return {}
+
+    def _get_date_args(self):
+        args = {}
+        if self._config.min_date:
+            args['min_taken_date'] = self._config.min_date
+        if self._config.max_date:
+            # Include photos taken any time on the last day
+            args['max_taken_date'] = self._config.max_date + ' 23:59:59'
+        return args
+
+    def _get_search_args(self):
+        args = self._get_date_args()
+        tags = [tag.strip() for tag in self._config.filter_tags.split(',') if tag.strip()] \
+            if self._config.filter_tags else []
+        machine_tags = [tag for tag in tags if ':' in tag]
+        tags = [tag for tag in tags if ':' not in tag]
+        if tags:
+            args['tags'] = ','.join(tags)
+        if machine_tags:
+            args['machine_tags'] = ','.join(machine_tags)
+        return args
+
+    def _has_media(self, photoset):
+        count_name = MEDIA_COUNTS.get(self._config.media)
+        if count_name is None or photoset.get(count_name) is None:
+            return True
+        return int(photoset.get(count_name)) > 0
+
+    def _search(self):
+        """
+        Searches for all photos matching the filters, searched once and shared by all photoset listings
+
+        Returns:
+            A list of matching SearchPhotos
+        """
+        with self._search_lock:
+            if self._search_photos is None:
+                args = dict(self._get_search_args(), **self._get_filter_args())
+                self._search_photos = []
+                page = pages = 1
+                while page <= pages:
+                    # Call the API directly, the flickr_api wrapper always requests every size url as extras
+                    result = self._resiliently.call(
+                        call_api,
+                        auth_handler=flickr_api.auth.AUTH_HANDLER,
+                        method='flickr.photos.search',
+                        user_id='me',
+                        extras=LIST_EXTRAS,
+                        per_page=SEARCH_PAGE_SIZE,
+                        page=page,
+                        **args)
+                    pages = int(result['photos']['pages'])
+                    self._search_photos.extend(
+                        SearchPhoto(
+                            id=photo['id'],
+                            title=photo.get('title'),
+                            tags=photo.get('tags'),
+                            originalformat=photo.get('originalformat'),
+                            media=photo.get('media'))
+                        for photo in result['photos']['photo'])
+                    page += 1
+                logger.debug('{} photos match search {}'.format(
+                    len(self._search_photos), args))
+            return self._search_photos
+
+    def _get_search_photosets(self):
+        """
+        Looks up the photosets of each photo matching the search, when that takes fewer calls than listing the
+        photosets and filtering them by the search, i.e. when few photos match
+
+        Returns:
+            A dict of photoset id (None for photos not in a photoset) to a list of its matching SearchPhotos, or None
+            if the photosets should be listed instead
+        """
+        photos = self._search()
+        with self._search_lock:
+            if not self._search_photosets_checked:
+                self._search_photosets_checked = True
+                if len(photos) < self._count_photoset_pages():
+                    self._search_photosets = self._get_photosets_of(photos)
+            return self._search_photosets
+
+    def _count_photoset_pages(self):
+        # The calls needed to list every photoset that would be listed, an empty photoset still takes one
+        self._list_photosets()
+        pages = 0
+        for photoset in list(self._photosets.values()):
+            if self._file_filter.include_folder(photoset.title.encode('utf-8')) and self._has_media(photoset):
+                count = sum(int(photoset.get(name) or 0) for name in MEDIA_COUNTS.values())
+                pages += max(1, (count + PHOTOSET_PAGE_SIZE - 1) // PHOTOSET_PAGE_SIZE)
+        return pages
+
+    def _get_photosets_of(self, photos):
+        photosets = {}
+        for photo in photos:
+            contexts = self._resiliently.call(
+                call_api,
+                auth_handler=flickr_api.auth.AUTH_HANDLER,
+                method='flickr.photos.getAllContexts',
+                photo_id=photo.id)
+            for photoset_id in [photoset['id'] for photoset in contexts.get('set', [])] or [None]:
+                photosets.setdefault(photoset_id, []).append(photo)
+        logger.debug('looked up the photosets of {} photos matching search'.format(len(photos)))
+        return photosets
 
     def _authenticate(self):
         if self._is_authenticated:
             return
+        # Copies may be the first calls, when dest is checked with a catalog or a plan is executed
+        with self._login_lock:
+            if not self._is_authenticated:
+                self._authenticate_once()
 
+    def _authenticate_once(self):
         flickr_api.set_keys(
             api_key=self._config.api_key,
             api_secret=self._config.api_secret)
@@ -229,10 +536,20 @@ class FlickrStorage(RemoteStorage):
             auth_handler.set_verifier(verifier_code)
             auth_handler.save(token_path)
 
+        flickr_api.set_auth_handler(auth_handler)
+        self._user_path = os.path.splitext(token_path)[0] + USER_EXTENSION
+        self._token_digest = hashlib.sha1(auth_handler.access_token.key).hexdigest()
+        # The token is checked by the first API call instead of logging in, see _token_rejected
+        self._user = self._load_user()
+        self._user_cached = self._user is not None
+        if not self._user_cached:
+            self._login()
+        self._is_authenticated = True
+
+    def _login(self):
         try:
-            flickr_api.set_auth_handler(auth_handler)
             self._user = flickr_api.test.login()
-            self._is_authenticated = True
+            self._user_cached = False
 
         except flickr_api.flickrerrors.FlickrError as e:
             print(e.message)
@@ -240,3 +557,46 @@ class FlickrStorage(RemoteStorage):
                 print(
                     "Go to http://www.flickr.com/services/apps/create/apply and apply for an API key")
             sys.exit(1)
+
+        self._save_user()
+
+    def _load_user(self):
+        """
+        Returns:
+            The Person saved by the last login with the same token, or None if there isn't one
+        """
+        try:
+            with open(self._user_path, 'rb') as f:
+                saved = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if saved.get('token') != self._token_digest:
+            return None
+        logger.debug("using saved user {}".format(saved['username'].encode('utf-8')))
+        return flickr_api.Person(id=saved['id'], username=saved['username'])
+
+    def _save_user(self):
+        # Only a digest of the token is saved, to tell whether the token has been replaced
+        saved = {'token': self._token_digest, 'id': self._user.id, 'username': self._user.username}
+        try:
+            with atomic_write(self._user_path) as temp_path:
+                with open(temp_path, 'wb') as f:
+                    json.dump(saved, f)
+        except (IOError, OSError) as e:
+            logger.debug("couldn't save user to {}: {}".format(self._user_path, e))
+
+    def _token_rejected(self):
+        """
+        Called by Resiliently when Flickr rejects the token of any call. If the user was loaded from the user file, logs
+        in again to check the token, exiting if it's rejected
+
+        Returns:
+            True if the call should be retried
+        """
+        with self._login_lock:
+            # Calls made concurrently can all be rejected, login is only called for the first of them
+            if self._user_cached:
+                logger.info("Flickr rejected the saved token, logging in again")
+                self._login()
+                self._logged_in_again = True
+            return self._logged_in_again
@@ -1,4 +1,5 @@
 class FolderInfo(object):
+    __slots__ = ('id', 'name', 'full_path', 'is_root')
 
     def __init__(self, **kwargs):
         self.id = kwargs.get('id')
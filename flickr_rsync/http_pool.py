@@ -0,0 +1,140 @@
+from __future__ import print_function
+import time
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+import flickr_api.method_call
+import flickr_api.upload
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_BUFSIZE = 1024 * 1024
+# Seconds to wait to connect, and for each read of a download
+DOWNLOAD_TIMEOUT = 60
+
+
+class HttpPool(object):
+    """
+    A requests Session shared by every thread making Flickr API calls, uploads and downloads, so connections are kept
+    alive and reused instead of paying for a TCP and TLS handshake on each call. Responses are gzip compressed where
+    Flickr supports it, as requests asks for them to be by default
+    """
+
+    def __init__(self, size):
+        """
+        Args:
+            size: The number of connections to keep open to each host, see pool_size
+        """
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.request_time = 0.0
+        self.connections = 0
+        self.connect_time = 0.0
+        self._session = requests.Session()
+        adapter = _TimedAdapter(self, pool_connections=2, pool_maxsize=size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+    def install(self):
+        """
+        Sends flickr_api's API calls and uploads through the pool, instead of a new connection for each one
+        """
+        flickr_api.method_call.requests = self
+        flickr_api.upload.requests = self
+
+    def post(self, url, data=None, **kwargs):
+        return self._request('POST', url, data=data, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self._request('GET', url, **kwargs)
+
+    def download(self, url, dest_path):
+        """
+        Downloads url to dest_path, streaming it to disk rather than holding it in memory
+
+        Raises:
+            requests.HTTPError: If the download failed
+        """
+        response = self.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT)
+        try:
+            response.raise_for_status()
+            with open(dest_path, 'wb') as f:
+                for chunk in response.iter_content(DOWNLOAD_BUFSIZE):
+                    f.write(chunk)
+        finally:
+            response.close()
+
+    def close(self):
+        self._session.close()
+
+    def stats(self):
+        """
+        Returns:
+            Lines describing the requests made and the connections opened for them, for the sync summary
+        """
+        if not self.requests:
+            return []
+        return ["{} HTTP request(s) on {} connection(s), {:.3f} sec to connect and {:.3f} sec per request on "
+                "average".format(
+                    self.requests,
+                    self.connections,
+                    self.connect_time / self.connections if self.connections else 0,
+                    self.request_time / self.requests)]
+
+    def _request(self, method, url, **kwargs):
+        start = time.time()
+        try:
+            return self._session.request(method, url, **kwargs)
+        finally:
+            with self._lock:
+                self.requests += 1
+                self.request_time += time.time() - start
+
+    def _connected(self, seconds):
+        with self._lock:
+            self.connections += 1
+            self.connect_time += seconds
+
+
+def pool_size(config):
+    """
+    Returns:
+        The number of connections the sync's threads can use at once: one for each copy worker, and for each listing
+        thread
+    """
+    workers = config.transfers
+    if config.large_file_size > 0:
+        workers += config.large_transfers
+    return workers + max(config.prefetch, 1)
+
+
+class _TimedAdapter(HTTPAdapter):
+    """
+    Times each new connection, including the TLS handshake, see HttpPool.stats
+    """
+
+    def __init__(self, http_pool, **kwargs):
+        # Set before HTTPAdapter.__init__, which calls init_poolmanager
+        self._http_pool = http_pool
+        super(_TimedAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(_TimedAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _timed_pool(HTTPConnectionPool, self._http_pool),
+            'https': _timed_pool(HTTPSConnectionPool, self._http_pool)
+        }
+
+
+def _timed_pool(pool_class, http_pool):
+    connection_class = pool_class.ConnectionCls
+
+    class TimedConnection(connection_class):
+        def connect(self):
+            start = time.time()
+            connection_class.connect(self)
+            http_pool._connected(time.time() - start)
+
+    return type(pool_class.__name__, (pool_class,), {'ConnectionCls': TimedConnection})
@@ -0,0 +1,139 @@
+from __future__ import print_function
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from name_index import normalize_name
+
+logger = logging.getLogger(__name__)
+
+START = 'start'
+PLANNED = 'planned'
+COPIED = 'copied'
+UPLOADED = 'uploaded'
+ADDED = 'added'
+FOLDER_DONE = 'folder-done'
+
+
+class Journal(object):
+    """
+    A write-ahead journal of a sync's progress, so an interrupted sync can be resumed. Each step is appended as a JSON
+    line and flushed before the next one starts: files are planned before they are copied, and photos are recorded
+    once uploaded and again once added to their photoset, so half done uploads can be finished on restart. The journal
+    is removed once a sync completes
+    """
+
+    def __init__(self, path, src, dest):
+        """
+        Args:
+            path: The journal file, an existing journal for the same src and dest is resumed
+            src: The src path of the sync
+            dest: The dest path of the sync
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._done_folders = set()
+        self._copied = set()
+        self._planned = set()
+        self._uploads = OrderedDict()
+        self.resumed = os.path.exists(path) and self._load(src, dest)
+        if self.resumed:
+            logger.info("resuming sync from journal {}, {} folder(s) complete, {} interrupted copies".format(
+                path, len(self._done_folders), len(self._planned - self._copied)))
+            self._file = open(path, 'r+b')
+            # Drop any partly written last entry before appending
+            self._file.truncate(self._size)
+            self._file.seek(self._size)
+        else:
+            self._file = open(path, 'wb')
+            self._write(op=START, src=src, dest=dest)
+
+    def is_folder_done(self, folder_name):
+        return normalize_name(folder_name) in self._done_folders
+
+    def is_copied(self, folder_name, file_name):
+        return _file_key(folder_name, file_name) in self._copied
+
+    def planned(self, folder_name, file_name):
+        self._write(op=PLANNED, folder=folder_name, name=file_name)
+
+    def copied(self, folder_name, file_name):
+        self._write(op=COPIED, folder=folder_name, name=file_name)
+
+    def uploaded(self, folder_name, file_name, file_id):
+        """
+        Records a file uploaded but not yet added to its folder, see pending_uploads
+        """
+        self._write(op=UPLOADED, folder=folder_name, name=file_name, id=file_id)
+        with self._lock:
+            self._uploads[file_id] = folder_name
+
+    def added(self, file_id):
+        self._write(op=ADDED, id=file_id)
+        with self._lock:
+            self._uploads.pop(file_id, None)
+
+    def pending_uploads(self):
+        """
+        Returns:
+            A list of (file_id, folder_name) tuples of uploaded files that weren't added to their folder
+        """
+        with self._lock:
+            return list(self._uploads.items())
+
+    def folder_done(self, folder_name):
+        self._write(op=FOLDER_DONE, folder=folder_name)
+
+    def complete(self):
+        """
+        Removes the journal once a sync has finished
+        """
+        self._file.close()
+        os.remove(self.path)
+
+    def close(self):
+        self._file.close()
+
+    def _write(self, **entry):
+        line = json.dumps(entry) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def _load(self, src, dest):
+        self._size = 0
+        entries = []
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError()
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # The last line is partial if the sync was killed while writing it
+                    break
+                self._size += len(line)
+        # Compare paths as they'll have been read back from json
+        src, dest = json.loads(json.dumps([src, dest]))
+        if not entries or entries[0].get('op') != START or \
+                (entries[0].get('src'), entries[0].get('dest')) != (src, dest):
+            logger.warning("ignoring journal {} of a different sync".format(self.path))
+            return False
+        for entry in entries[1:]:
+            op = entry['op']
+            if op == FOLDER_DONE:
+                self._done_folders.add(normalize_name(entry['folder']))
+            elif op == PLANNED:
+                self._planned.add(_file_key(entry['folder'], entry['name']))
+            elif op == COPIED:
+                self._copied.add(_file_key(entry['folder'], entry['name']))
+            elif op == UPLOADED:
+                self._uploads[entry['id']] = entry['folder'].encode('utf-8')
+            elif op == ADDED:
+                self._uploads.pop(entry['id'], None)
+        return True
+
+
+def _file_key(folder_name, file_name):
+    return normalize_name(folder_name), normalize_name(file_name)
@@ -0,0 +1,31 @@
+from __future__ import print_function
+from csv_walker import CsvWalker
+from sinks import JsonLinesSink
+
+
+class JsonLinesWalker(CsvWalker):
+    """
+    Lists folders or files as one JSON object per line, for piping into other tools
+    """
+
+    def _create_sink(self):
+        return JsonLinesSink()
+
+    def _print_folder_header(self):
+        pass
+
+    def _print_folder(self, folder):
+        self._out.write_record([
+            ('folder', folder.name),
+            ('id', folder.id)])
+
+    def _print_file_header(self):
+        pass
+
+    def _print_file(self, folder, fileinfo):
+        self._out.write_record([
+            ('folder', folder.name),
+            ('name', fileinfo.name),
+            ('id', fileinfo.id),
+            ('checksum', fileinfo.checksum),
+            ('size', fileinfo.size)])
@@ -1,16 +1,23 @@
 from __future__ import print_function
 import os
-import re
-import glob
-import itertools
+import uuid
+import errno
 import hashlib
-import shutil
 import logging
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from storage import Storage, RemoteStorage
 from file_info import FileInfo
 from folder_info import FolderInfo
+from fast_copy import fast_copy
+try:
+    from os import scandir
+except ImportError:
+    from scandir import scandir
 
 logger = logging.getLogger(__name__)
+# Folders known to exist, saves a stat call for every file copied into the same folder
+_existing_dirs = set()
 
 
 def mkdirp(path):
@@ -20,19 +27,93 @@ def mkdirp(path):
     Args:
         path: A file system path to create, may include a filename (ignored)
     """
-    if not os.path.exists(os.path.dirname(path)):
+    dirname = os.path.dirname(path)
+    if dirname in _existing_dirs:
+        return
+    if not os.path.exists(dirname):
         try:
-            os.makedirs(os.path.dirname(path))
+            os.makedirs(dirname)
         except OSError as ex:  # Guard against race condition
             if ex.errno != errno.EEXIST:
                 raise
+    _existing_dirs.add(dirname)
+
+
+@contextmanager
+def atomic_write(path):
+    """
+    Yields a temporary path in the same folder to write a file to, which is then renamed over path so a file is never
+    left partly written, even when replacing an existing one
+
+    Args:
+        path: The file system path to write
+    """
+    mkdirp(path)
+    dirname, filename = os.path.split(path)
+    # Keep the extension before .partial, flickr_api adds one to paths without an extension
+    temp_path = os.path.join(dirname, '.{}.{}.partial'.format(filename, uuid.uuid4().hex[:8]))
+    try:
+        yield temp_path
+        if os.name == 'nt' and os.path.exists(path):
+            os.remove(path)
+        os.rename(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class LocalFileInfo(FileInfo):
+    """
+    A listed local file whose size and modified time are read when first used rather than when listed, as on POSIX
+    that's a stat call per file, slow on network file systems, and most syncs never use them
+    """
+    __slots__ = ('_size', '_mtime', '_is_stat_read')
+
+    def __init__(self, **kwargs):
+        super(LocalFileInfo, self).__init__(**kwargs)
+        self._is_stat_read = 'size' in kwargs
+
+    @property
+    def size(self):
+        self._read_stat()
+        return self._size
+
+    @size.setter
+    def size(self, value):
+        self._size = value
+        self._is_stat_read = True
+
+    @property
+    def mtime(self):
+        self._read_stat()
+        return self._mtime
+
+    @mtime.setter
+    def mtime(self, value):
+        self._mtime = value
+        self._is_stat_read = True
+
+    def _read_stat(self):
+        if self._is_stat_read:
+            return
+        try:
+            stat = os.stat(self.full_path)
+            self._size, self._mtime = stat.st_size, stat.st_mtime
+        except OSError as e:
+            # Removed since it was listed, the copy will fail with the same error
+            logger.debug("couldn't read size of {}: {}".format(self.full_path, e))
+        self._is_stat_read = True
 
 
 class LocalStorage(Storage):
+    can_update = True
+    can_move = True
 
-    def __init__(self, config, path):
+    def __init__(self, config, path, file_filter):
         self.path = path
         self._config = config
+        self._file_filter = file_filter
 
     def md5_checksum(self, file_path):
         with open(file_path, 'rb') as fh:
@@ -46,54 +127,130 @@ class LocalStorage(Storage):
 
     def list_folders(self):
         logger.debug("copying files from {}".format(self.path))
+        if self._config.recursive:
+            folders = self._walk_folders()
+        else:
+            folders = ((entry.name, entry.path)
+                       for entry in scandir(self.path) if entry.is_dir())
         return [
             FolderInfo(
                 id=i,
                 name=name.encode('utf-8'),
-                full_path=path.encode('utf-8')) for i,
-            (name,
-             path) in enumerate(
-                (x,
-                 os.path.join(
-                     self.path,
-                     x)) for x in os.listdir(
-                    self.path)) if self._should_include(
-                        name,
-                        self._config.include_dir,
-                self._config.exclude_dir) and os.path.isdir(path)]
+                full_path=path.encode('utf-8'))
+            for i, (name, path) in enumerate(
+                (name, path) for name, path in folders
+                if self._file_filter.include_folder(name))]
 
     def list_files(self, folder):
-        folder_abs = os.path.join(self.path, folder.name)
+        folder_abs = self.get_folder_path(folder.name)
         return [
-            FileInfo(
-                id=i,
-                name=name.encode('utf-8'),
-                full_path=path.encode('utf-8'),
-                checksum=self.md5_checksum(path) if self._config.checksum else None) for i,
-            (name,
-             path) in enumerate(
-                (x,
-                 os.path.join(
-                     folder_abs,
-                     x)) for x in os.listdir(folder_abs)) if self._should_include(
-                name,
-                self._config.include,
-                self._config.exclude) and os.path.isfile(path)]
-
-    def copy_file(self, file_info, folder_name, dest_storage):
+            self._get_file_info(i, entry)
+            for i, entry in enumerate(
+                entry for entry in scandir(folder_abs)
+                if entry.is_file() and self._file_filter.include_file(entry.name))]
+
+    def copy_file(self, file_info, folder_name, dest_storage, dest_file=None):
         src = file_info.full_path
-        if isinstance(dest_storage, RemoteStorage):
+        if isinstance(dest_storage, RemoteStorage) and dest_file:
+            dest_storage.replace(src, dest_file, self.get_checksum(file_info))
+        elif isinstance(dest_storage, RemoteStorage):
             dest_storage.upload(
                 src,
                 folder_name,
                 file_info.name,
                 file_info.checksum)
         else:
-            relative_path = os.path.join(folder_name, file_info.name)
-            dest = os.path.join(dest_storage.path, relative_path)
-            mkdirp(dest)
-            shutil.copyfile(src, dest)
-
-    def _should_include(self, name, include_pattern, exclude_pattern):
-        return ((not include_pattern or re.search(include_pattern, name, flags=re.IGNORECASE)) and
-                (not exclude_pattern or not re.search(exclude_pattern, name, flags=re.IGNORECASE)))
+            dest = os.path.join(
+                dest_storage.get_folder_path(folder_name),
+                dest_file.name if dest_file else file_info.name)
+            with atomic_write(dest) as temp_path:
+                fast_copy(src, temp_path)
+
+    def get_checksum(self, file_info):
+        if file_info.checksum is None and file_info.full_path:
+            file_info.checksum = self.md5_checksum(file_info.full_path)
+        return file_info.checksum
+
+    def set_mtime(self, file_info, mtime):
+        if not file_info.full_path:
+            return
+        try:
+            os.utime(file_info.full_path, (os.stat(file_info.full_path).st_atime, mtime))
+        except OSError as e:
+            logger.debug("couldn't set modified time of {}: {}".format(file_info.full_path, e))
+
+    def rename_folder(self, folder, name):
+        src = self.get_folder_path(folder.name)
+        dest = self.get_folder_path(name)
+        if os.path.exists(dest):
+            raise OSError(errno.EEXIST, 'Folder already exists', dest)
+        mkdirp(dest)
+        os.rename(src, dest)
+        return FolderInfo(id=folder.id, name=name, full_path=dest)
+
+    def move_file(self, file_info, folder, dest_folder_name, dest_name):
+        src = os.path.join(self.get_folder_path(folder.name), file_info.name)
+        dest = os.path.join(self.get_folder_path(dest_folder_name), dest_name)
+        if os.path.exists(dest):
+            raise OSError(errno.EEXIST, 'File already exists', dest)
+        mkdirp(dest)
+        os.rename(src, dest)
+
+    def get_folder_path(self, folder_name):
+        """
+        Gets the file system path of a folder, expanding nested folder names when --recursive is enabled
+
+        Args:
+            folder_name: The folder name as returned in FolderInfo.name, or '' for the root folder
+
+        Returns:
+            The absolute file system path of the folder
+        """
+        if self._config.recursive and folder_name:
+            folder_name = os.path.join(
+                *folder_name.split(self._config.folder_separator))
+        return os.path.join(self.path, folder_name)
+
+    def _walk_folders(self):
+        """
+        Lists all nested folders, reading each level of the tree in parallel as on network file systems latency, not
+        CPU, dominates. Folders are returned depth first, sorted by name, so the order is stable between runs
+
+        Returns:
+            A generator of (name, path) tuples, where name is the relative path joined with --folder-separator
+        """
+        children = {}
+        with ThreadPoolExecutor(max_workers=self._config.list_threads) as executor:
+            level = [self.path]
+            while level:
+                # map returns results in the order of level regardless of which thread finishes first
+                subfolders = list(executor.map(self._list_subfolders, level))
+                children.update(zip(level, subfolders))
+                level = [path for folder in subfolders for name, path, is_link in folder
+                         if not is_link]
+
+        def visit(path, parents):
+            for name, subpath, is_link in children.get(path, []):
+                names = parents + [name]
+                yield (self._config.folder_separator.join(names), subpath)
+                for folder in visit(subpath, names):
+                    yield folder
+
+        return visit(self.path, [])
+
+    def _list_subfolders(self, path):
+        # Symlinked folders are listed but not descended into, guarding against cycles
+        return sorted((entry.name, entry.path, entry.is_symlink())
+                      for entry in scandir(path) if entry.is_dir())
+
+    def _get_file_info(self, i, entry):
+        file_info = LocalFileInfo(
+            id=i,
+            name=entry.name.encode('utf-8'),
+            full_path=entry.path.encode('utf-8'),
+            checksum=self.md5_checksum(entry.path) if self._config.checksum else None)
+        if os.name == 'nt':
+            # The directory read returns the stat result on Windows, so size and mtime are free
+            stat = entry.stat()
+            file_info.size, file_info.mtime = stat.st_size, stat.st_mtime
+        return file_info
@@ -0,0 +1,44 @@
+from __future__ import print_function
+
+_END = object()
+
+
+def merge_join(left, right, key):
+    """
+    Full outer joins two iterators that are already sorted by key, in a single pass holding one item of each in memory
+
+    Args:
+        left: An iterator or sequence sorted by key
+        right: An iterator or sequence sorted by key
+        key: A function returning the join key of an item
+
+    Returns:
+        A generator of (left_item, right_item) tuples in key order, with None in place of the item missing from either
+        side. Items with duplicate keys are paired up in order
+    """
+    left = iter(left)
+    right = iter(right)
+    left_item = next(left, _END)
+    right_item = next(right, _END)
+    if left_item is not _END:
+        left_key = key(left_item)
+    if right_item is not _END:
+        right_key = key(right_item)
+    while left_item is not _END or right_item is not _END:
+        if right_item is _END or (left_item is not _END and left_key < right_key):
+            yield left_item, None
+            advance_left, advance_right = True, False
+        elif left_item is _END or right_key < left_key:
+            yield None, right_item
+            advance_left, advance_right = False, True
+        else:
+            yield left_item, right_item
+            advance_left, advance_right = True, True
+        if advance_left:
+            left_item = next(left, _END)
+            if left_item is not _END:
+                left_key = key(left_item)
+        if advance_right:
+            right_item = next(right, _END)
+            if right_item is not _END:
+                right_key = key(right_item)
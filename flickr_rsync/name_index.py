@@ -0,0 +1,63 @@
+from __future__ import print_function
+import unicodedata
+
+
+def normalize_name(name):
+    """
+    Returns the key file and folder names are matched by, so names differing only by case, unicode normalization
+    (e.g. NFD names from macOS) or flickr renaming .jpeg to .jpg are treated as the same
+
+    Args:
+        name: A unicode or utf-8 encoded name
+
+    Returns:
+        The normalized name, utf-8 encoded so keys sort the same way however the name was passed
+    """
+    if not isinstance(name, unicode):
+        try:
+            name = name.decode('utf-8')
+        except UnicodeDecodeError:
+            # Not utf-8, so unicode normalization doesn't apply
+            return _alias_extension(name.lower())
+    name = unicodedata.normalize('NFC', name).lower().encode('utf-8')
+    return _alias_extension(name)
+
+
+def _alias_extension(name):
+    if name.endswith(b'.jpeg'):
+        return name[:-5] + b'.jpg'
+    return name
+
+
+class NameIndex(object):
+    """
+    Names, or items with a name, indexed by normalize_name with constant time lookups
+    """
+
+    def __init__(self, items=(), name=None):
+        """
+        Args:
+            items: The names or items to index
+            name: A function returning the name of an item, defaults to the item itself
+        """
+        self._name = name or (lambda item: item)
+        self._items = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        # The first of any items with the same normalized name is kept
+        self._items.setdefault(normalize_name(self._name(item)), item)
+
+    def get(self, name):
+        """
+        Returns:
+            The item matching name, or None
+        """
+        return self._items.get(normalize_name(name))
+
+    def __contains__(self, name):
+        return normalize_name(name) in self._items
+
+    def __len__(self):
+        return len(self._items)
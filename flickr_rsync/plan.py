@@ -0,0 +1,283 @@
+from __future__ import print_function
+import json
+import logging
+from collections import OrderedDict
+from file_info import FileInfo
+from folder_info import FolderInfo
+from root_folder_info import RootFolderInfo
+from name_index import normalize_name
+from config import __packagename__
+
+logger = logging.getLogger(__name__)
+
+VERSION = 1
+BANDWIDTH_FILENAME = __packagename__ + '.bandwidth'
+# Flickr allows 3600 API calls an hour per API key
+FLICKR_CALLS_PER_HOUR = 3600
+NEW_FOLDER = 'new-folder'
+COPY = 'copy'
+MOVE = 'move'
+RENAME = 'rename'
+SUMMARY = 'summary'
+UPLOAD = 'upload'
+DOWNLOAD = 'download'
+LOCAL = 'local'
+FILE_FIELDS = FileInfo.__slots__
+
+
+class PlanWriter(object):
+    """
+    Writes the operations a sync would run to a plan file as JSON lines, instead of running them, and estimates the
+    API calls and time they'll take. The plan can be run later by PlanReader and Sync.run_plan without listing src or
+    dest again
+    """
+
+    def __init__(self, path, src, dest, src_remote, dest_remote):
+        """
+        Args:
+            path: The plan file to write
+            src: The src path of the sync
+            dest: The dest path of the sync
+            src_remote: True if src is Flickr, each download is an API call
+            dest_remote: True if dest is Flickr, each upload, photoset change and move are API calls
+        """
+        self.path = path
+        self._src_remote = src_remote
+        self._dest_remote = dest_remote
+        self._new_folders = set()
+        self._started_folders = set()
+        self.copies = 0
+        self.updates = 0
+        self.moves = 0
+        self.renames = 0
+        self.folders_created = 0
+        self.photoset_adds = 0
+        self.api_calls = 0
+        self.bytes = 0
+        self.unknown_sizes = 0
+        self._file = open(path, 'wb')
+        self._write(OrderedDict([('plan', VERSION), ('src', src), ('dest', dest)]))
+
+    def new_folder(self, folder_name):
+        """
+        Records a folder that doesn't exist in dest, so the first file copied or moved to it creates it
+        """
+        self._new_folders.add(normalize_name(folder_name))
+        self._write(OrderedDict([('op', NEW_FOLDER), ('folder', folder_name)]))
+
+    def copy(self, folder_name, file_info, dest_file=None):
+        """
+        Records a file to copy, or to replace dest_file with
+        """
+        if dest_file:
+            self.updates += 1
+        else:
+            self.copies += 1
+        if file_info.size is None:
+            self.unknown_sizes += 1
+        else:
+            self.bytes += file_info.size
+        if self._src_remote:
+            # Looking up the original's url
+            self.api_calls += 1
+        if self._dest_remote:
+            if dest_file:
+                # Replacing and swapping the checksum tag
+                self.api_calls += 4
+            else:
+                self.api_calls += 1 + self._add_to_folder(folder_name)
+        self._write(OrderedDict([
+            ('op', COPY), ('folder', folder_name), ('file', _file_to_dict(file_info)),
+            ('dest_file', _file_to_dict(dest_file) if dest_file else None)]))
+
+    def move(self, file_info, folder, dest_folder_name, dest_name):
+        self.moves += 1
+        if self._dest_remote:
+            if normalize_name(dest_name) != normalize_name(file_info.name):
+                self.api_calls += 1
+            if normalize_name(dest_folder_name) != normalize_name(folder.name):
+                self.api_calls += self._add_to_folder(dest_folder_name) + (0 if folder.is_root else 1)
+        self._write(OrderedDict([
+            ('op', MOVE), ('file', _file_to_dict(file_info)), ('from_folder', _folder_to_dict(folder)),
+            ('folder', dest_folder_name), ('name', dest_name)]))
+
+    def rename(self, folder, name):
+        self.renames += 1
+        if self._dest_remote:
+            self.api_calls += 1
+        self._write(OrderedDict([('op', RENAME), ('from_folder', _folder_to_dict(folder)), ('folder', name)]))
+
+    def close(self, config):
+        """
+        Writes the plan's totals and estimates, and logs them
+
+        Args:
+            config: The Config, for --throttling and the bandwidth measured by previous syncs
+        """
+        bytes_per_sec = load_bandwidth(config).get(self._direction())
+        estimate = estimate_seconds(
+            self.api_calls, config.throttling, self.bytes, bytes_per_sec)
+        self._write(OrderedDict([
+            ('op', SUMMARY), ('copies', self.copies), ('updates', self.updates), ('moves', self.moves),
+            ('renames', self.renames), ('folders_created', self.folders_created),
+            ('photoset_adds', self.photoset_adds), ('api_calls', self.api_calls), ('bytes', self.bytes),
+            ('unknown_sizes', self.unknown_sizes), ('bytes_per_sec', bytes_per_sec),
+            ('estimated_seconds', estimate)]))
+        self._file.close()
+
+        logger.info("\nplanned {} copies, {} updates, {} moves and {} folder renames to {}".format(
+            self.copies, self.updates, self.moves, self.renames, self.path))
+        logger.info("{} folders to create, {} photoset adds, {} API calls, {}{}".format(
+            self.folders_created, self.photoset_adds, self.api_calls, _format_bytes(self.bytes),
+            " and {} files of unknown size".format(self.unknown_sizes) if self.unknown_sizes else ''))
+        if self.api_calls:
+            logger.info("needs {:.1f} hours of Flickr's API quota of {} calls an hour".format(
+                float(self.api_calls) / FLICKR_CALLS_PER_HOUR, FLICKR_CALLS_PER_HOUR))
+        if bytes_per_sec is None and self.bytes:
+            logger.info("estimated time {}, excluding transfers as no {} bandwidth has been measured yet".format(
+                _format_seconds(estimate), self._direction()))
+        else:
+            logger.info("estimated time {}".format(_format_seconds(estimate)))
+
+    def _add_to_folder(self, folder_name):
+        """
+        Returns:
+            The number of API calls to add a file to a photoset, creating it if it's new
+        """
+        if not folder_name:
+            return 0
+        key = normalize_name(folder_name)
+        if key in self._new_folders and key not in self._started_folders:
+            self._started_folders.add(key)
+            self.folders_created += 1
+        else:
+            self.photoset_adds += 1
+        return 1
+
+    def _direction(self):
+        return UPLOAD if self._dest_remote else DOWNLOAD if self._src_remote else LOCAL
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry) + '\n')
+
+
+class PlanReader(object):
+    """
+    Reads a plan file written by PlanWriter
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                header = None
+        if not isinstance(header, dict) or header.get('plan') != VERSION:
+            raise IOError('{} is not a plan file'.format(path))
+        self.src = _to_bytes(header['src'])
+        self.dest = _to_bytes(header['dest'])
+
+    def __iter__(self):
+        """
+        Returns:
+            A generator of operation tuples, one of (NEW_FOLDER, folder_name), (COPY, folder_name, file_info,
+            dest_file), (MOVE, file_info, folder, dest_folder_name, dest_name) or (RENAME, folder, name)
+        """
+        with open(self.path, 'rb') as f:
+            f.readline()
+            for line in f:
+                entry = json.loads(line)
+                op = entry['op']
+                if op == NEW_FOLDER:
+                    yield op, _to_bytes(entry['folder'])
+                elif op == COPY:
+                    yield (op, _to_bytes(entry['folder']), _dict_to_file(entry['file']),
+                           _dict_to_file(entry['dest_file']) if entry['dest_file'] else None)
+                elif op == MOVE:
+                    yield (op, _dict_to_file(entry['file']), _dict_to_folder(entry['from_folder']),
+                           _to_bytes(entry['folder']), _to_bytes(entry['name']))
+                elif op == RENAME:
+                    yield op, _dict_to_folder(entry['from_folder']), _to_bytes(entry['folder'])
+
+
+def estimate_seconds(api_calls, throttling, total_bytes, bytes_per_sec):
+    """
+    Estimates how long a sync will take. API calls are made one at a time, at most every --throttling seconds and
+    within Flickr's hourly quota, while transfers run alongside them, so whichever takes longer sets the time
+
+    Args:
+        api_calls: The number of API calls
+        throttling: The --throttling delay between calls
+        total_bytes: The number of bytes to transfer
+        bytes_per_sec: The measured bandwidth, or None if unknown
+
+    Returns:
+        The estimated seconds
+    """
+    call_seconds = api_calls * max(throttling or 0, 3600.0 / FLICKR_CALLS_PER_HOUR)
+    transfer_seconds = float(total_bytes) / bytes_per_sec if bytes_per_sec else 0
+    return max(call_seconds, transfer_seconds)
+
+
+def load_bandwidth(config):
+    """
+    Returns:
+        A dict of the bandwidth in bytes per second last measured uploading, downloading and copying locally
+    """
+    path = config.locate_datafile(BANDWIDTH_FILENAME)
+    if not path:
+        return {}
+    try:
+        with open(path, 'rb') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def save_bandwidth(config, src_remote, dest_remote, bytes_per_sec):
+    """
+    Saves the bandwidth measured by a sync, to estimate plans with
+    """
+    bandwidth = load_bandwidth(config)
+    bandwidth[UPLOAD if dest_remote else DOWNLOAD if src_remote else LOCAL] = bytes_per_sec
+    path = config.locate_datafile(BANDWIDTH_FILENAME) or config.default_datafile(BANDWIDTH_FILENAME)
+    with open(path, 'wb') as f:
+        json.dump(bandwidth, f)
+
+
+def _file_to_dict(file_info):
+    return OrderedDict((field, getattr(file_info, field)) for field in FILE_FIELDS)
+
+
+def _dict_to_file(values):
+    return FileInfo(**dict((str(field), _to_bytes(value)) for field, value in values.items()))
+
+
+def _folder_to_dict(folder):
+    return OrderedDict([('id', folder.id), ('name', folder.name), ('is_root', folder.is_root)])
+
+
+def _dict_to_folder(values):
+    if values['is_root']:
+        return RootFolderInfo()
+    return FolderInfo(id=_to_bytes(values['id']), name=_to_bytes(values['name']))
+
+
+def _to_bytes(value):
+    # Names are utf-8 encoded everywhere else
+    return value.encode('utf-8') if isinstance(value, unicode) else value
+
+
+def _format_bytes(count):
+    for unit in ['bytes', 'KB', 'MB', 'GB']:
+        if count < 1024:
+            return "{:.0f} {}".format(count, unit) if unit == 'bytes' else "{:.1f} {}".format(count, unit)
+        count /= 1024.0
+    return "{:.1f} TB".format(count)
+
+
+def _format_seconds(seconds):
+    hours, seconds = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return "{}h {:02}m {:02}s".format(hours, minutes, seconds)
@@ -0,0 +1,28 @@
+from __future__ import print_function
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def prefetch(items, func, window):
+    """
+    Calls func for each item on a thread pool, running up to window calls ahead of the consumer but returning results
+    in the original order. At most window + 1 results are held in memory at once
+
+    Args:
+        items: An iterator or sequence of items
+        func: A function to call with each item, it must be thread safe
+        window: The number of calls to run ahead
+
+    Returns:
+        A tuple (item, result) for each item, in order
+    """
+    with ThreadPoolExecutor(max_workers=window) as executor:
+        pending = deque()
+        for item in items:
+            pending.append((item, executor.submit(func, item)))
+            if len(pending) > window:
+                item, future = pending.popleft()
+                yield item, future.result()
+        while pending:
+            item, future = pending.popleft()
+            yield item, future.result()
@@ -1,23 +1,49 @@
 from __future__ import print_function
 import logging
 import backoff
-from throttle import throttle
+from flickr_api.flickrerrors import FlickrAPIError
+from api_scheduler import ApiScheduler, LIST
 from config import __packagename__
 
+# The error code of Flickr API calls made with a token that has been revoked or has expired
+INVALID_TOKEN_CODE = 98
+
 
 class Resiliently(object):
     def __init__(self, config):
         self._config = config
+        self._scheduler = ApiScheduler(delay_sec=config.throttling)
+        # Called when Flickr rejects the auth token, returning True if the call should be retried, see call_as
+        self.on_token_rejected = None
         if config.verbose:
             logging.getLogger('backoff').addHandler(logging.StreamHandler())
 
     def call(self, func, *args, **kwargs):
-        return self._throttle(self._retry, func, *args, **kwargs)
+        return self.call_as(LIST, func, *args, **kwargs)
+
+    def call_as(self, api_class, func, *args, **kwargs):
+        """
+        Calls func with retries, scheduled by ApiScheduler so each class of call gets its share of the throttled calls
+
+        Args:
+            api_class: The class of the call, one of the api_scheduler classes
+        """
+        try:
+            return self._scheduler.call(api_class, self._retry, func, *args, **kwargs)
+        except FlickrAPIError as e:
+            if not is_token_rejected(e) or not (self.on_token_rejected and self.on_token_rejected()):
+                raise
+        # Retried once, so a token still rejected after logging in again fails
+        return self._scheduler.call(api_class, self._retry, func, *args, **kwargs)
 
-    def _throttle(self, func, *args, **kwargs):
-        return throttle(
-            delay_sec=self._config.throttling)(func)(
-            *args, **kwargs)
+    def stats(self):
+        """
+        Returns:
+            A line for each class of API call made, for the sync summary
+        """
+        return ["{} {} API call(s), waited {:.2f} sec on average and {:.2f} sec at most".format(
+            calls, api_class, average_delay, max_delay)
+            for api_class, calls, average_delay, max_delay in self._scheduler.stats()]
 
     def _retry(self, func, *args, **kwargs):
         # We +1 this because backoff retries UP to and not including max_retries
@@ -25,6 +51,15 @@ class Resiliently(object):
         return backoff.on_exception(
             backoff.expo,
             Exception,
-            max_tries=max_tries)(func)(
+            max_tries=max_tries,
+            giveup=is_token_rejected)(func)(
             *args,
             **kwargs)
+
+
+def is_token_rejected(e):
+    """
+    Returns:
+        True if the error is Flickr rejecting the auth token, which retrying won't fix
+    """
+    return isinstance(e, FlickrAPIError) and e.code == INVALID_TOKEN_CODE
@@ -2,6 +2,7 @@ from folder_info import FolderInfo
 
 
 class RootFolderInfo(FolderInfo):
+    __slots__ = ()
 
     def __init__(self):
         super(RootFolderInfo, self).__init__(id=None, name='', full_path=None)
@@ -0,0 +1,65 @@
+from __future__ import print_function
+import itertools
+import time
+import logging
+from rx import Observable
+from walker import Walker
+from root_folder_info import RootFolderInfo
+from external_sort import external_sort
+from sinks import CsvSink
+
+logger = logging.getLogger(__name__)
+
+
+class RxCsvWalker(Walker):
+
+    def __init__(self, config, storage):
+        self._config = config
+        self._storage = storage
+        self._out = CsvSink()
+
+    def walk(self):
+        start = time.time()
+
+        # Create source stream
+        folders = self._storage.list_folders()
+        if self._config.root_files:
+            folders = itertools.chain([RootFolderInfo()], folders)
+        if self._config.list_folders:
+            self._out.write_row(["Folder"])
+            if self._config.list_sort:
+                folders = external_sort(
+                    folders,
+                    key=lambda folder: folder.name,
+                    buffer_size=self._config.list_sort_buffer)
+            Observable.from_(folders).subscribe(
+                on_next=lambda folder: self._out.write_row([folder.name]),
+                on_completed=lambda: self._print_summary(
+                    time.time() - start))
+        else:
+            self._out.write_row(["Folder", "Filename", "Checksum"])
+            # Expand folder stream into file stream
+            files = ((fileinfo, folder)
+                     for folder in folders
+                     for fileinfo in self._storage.list_files(folder))
+            # Print each file
+            if self._config.list_sort:
+                files = external_sort(
+                    files,
+                    key=lambda fileinfo_folder: (
+                        fileinfo_folder[1].name,
+                        fileinfo_folder[0].name),
+                    buffer_size=self._config.list_sort_buffer)
+            Observable.from_(files).subscribe(
+                on_next=lambda fileinfo_folder1: self._print_file(
+                    fileinfo_folder1[1],
+                    fileinfo_folder1[0]),
+                on_completed=lambda: self._print_summary(
+                    time.time() - start))
+
+    def _print_file(self, folder, fileinfo):
+        self._out.write_row([folder.name, fileinfo.name, fileinfo.checksum])
+
+    def _print_summary(self, elapsed):
+        self._out.close()
+        logger.info("\ndone in {} sec".format(round(elapsed, 2)))
@@ -0,0 +1,66 @@
+from __future__ import print_function
+import io
+import sys
+import csv
+import json
+from collections import OrderedDict
+
+BUFFER_SIZE = 1024 * 1024
+
+
+def _open_stdout():
+    # Anything already printed must come out before our buffered writes
+    sys.stdout.flush()
+    return io.open(sys.stdout.fileno(), 'wb', buffering=BUFFER_SIZE, closefd=False)
+
+
+def _to_bytes(value):
+    return value.encode('utf-8') if isinstance(value, unicode) else value
+
+
+class TextSink(object):
+    """
+    Writes lines of text to a large buffered binary stream, rather than a print call per line
+    """
+
+    def __init__(self, stream=None):
+        """
+        Args:
+            stream: A binary file like object to write to, defaults to stdout
+        """
+        self._stream = stream if stream is not None else _open_stdout()
+
+    def write_line(self, line):
+        self._stream.write(_to_bytes(line) + b'\n')
+
+    def close(self):
+        """
+        Flushes any buffered output, the underlying stream is left open
+        """
+        self._stream.flush()
+
+
+class CsvSink(TextSink):
+    """
+    Writes rows of comma separated values, quoting values containing commas, quotes or new lines
+    """
+
+    def __init__(self, stream=None):
+        super(CsvSink, self).__init__(stream)
+        self._writer = csv.writer(self._stream, lineterminator='\n')
+
+    def write_row(self, row):
+        self._writer.writerow([_to_bytes(value) for value in row])
+
+
+class JsonLinesSink(TextSink):
+    """
+    Writes one JSON object per line, see http://jsonlines.org
+    """
+
+    def write_record(self, items):
+        """
+        Args:
+            items: A sequence of (key, value) tuples, written in order
+        """
+        self.write_line(json.dumps(OrderedDict(items)))
@@ -0,0 +1,122 @@
+from __future__ import print_function
+import os
+import marshal
+import logging
+import threading
+from storage import Storage
+from file_info import FileInfo
+from folder_info import FolderInfo
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_HEADER = b'flickr-rsync snapshot 1\n'
+# Pinned so snapshots stay readable across python 2 releases
+MARSHAL_VERSION = 2
+FOLDER_RECORD = 0
+FILES_RECORD = 1
+
+
+class SnapshotStorage(Storage):
+    """
+    A read only storage listing the folders and files saved to a snapshot file by --save-snapshot, so listings and dry
+    runs can be repeated without reading the original storage again
+    """
+
+    def __init__(self, config, path, file_filter):
+        self.path = path
+        self._config = config
+        self._file_filter = file_filter
+        self._folders = None
+        self._files = None
+
+    def list_folders(self):
+        self._load()
+        for folder_id, name in self._folders:
+            if self._file_filter.include_folder(name):
+                yield FolderInfo(id=folder_id, name=name)
+
+    def list_files(self, folder):
+        self._load()
+        key = None if folder.is_root else folder.name
+        # Files are kept encoded until their folder is listed, so loading is fast however large the snapshot
+        files = marshal.loads(self._files[key]) if key in self._files else []
+        for file_id, name, checksum, size, mtime in files:
+            if self._file_filter.include_file(name):
+                yield FileInfo(id=file_id, name=name, checksum=checksum, size=size, mtime=mtime)
+
+    def copy_file(self, file_info, folder_name, dest_storage, dest_file=None):
+        raise IOError('{} is a snapshot, which is read only'.format(self.path))
+
+    def _load(self):
+        if self._folders is not None:
+            return
+        folders = []
+        files = {}
+        with open(self.path, 'rb') as f:
+            if f.readline() != SNAPSHOT_HEADER:
+                raise IOError('{} is not a snapshot file'.format(self.path))
+            while True:
+                try:
+                    record = marshal.load(f)
+                except EOFError:
+                    break
+                if record[0] == FOLDER_RECORD:
+                    folders.append(record[1:])
+                else:
+                    files[record[1]] = record[2]
+        logger.debug('loaded {} folders from snapshot {}'.format(
+            len(folders), self.path))
+        self._folders = folders
+        self._files = files
+
+
+class SnapshotRecorder(Storage):
+    """
+    Wraps a storage, saving each folder and file listed through it to a snapshot file
+    """
+
+    def __init__(self, storage, path):
+        """
+        Args:
+            storage: The storage to list
+            path: The snapshot file to write, it is only replaced once save is called
+        """
+        self._storage = storage
+        self._path = path
+        self._partial_path = path + '.partial'
+        self._lock = threading.Lock()
+        self._file = open(self._partial_path, 'wb')
+        self._file.write(SNAPSHOT_HEADER)
+
+    def list_folders(self):
+        for folder in self._storage.list_folders():
+            self._write((FOLDER_RECORD, folder.id, folder.name))
+            yield folder
+
+    def list_files(self, folder):
+        files = []
+        for fileinfo in self._storage.list_files(folder):
+            files.append((fileinfo.id, fileinfo.name,
+                          fileinfo.checksum, fileinfo.size, fileinfo.mtime))
+            yield fileinfo
+        # Only record folders that were listed completely
+        self._write((FILES_RECORD, None if folder.is_root else folder.name,
+                     marshal.dumps(files, MARSHAL_VERSION)))
+
+    def copy_file(self, file_info, folder_name, dest_storage, dest_file=None):
+        self._storage.copy_file(file_info, folder_name, dest_storage, dest_file)
+
+    def save(self):
+        """
+        Closes the snapshot and moves it into place, replacing any previous snapshot
+        """
+        self._file.close()
+        if os.name == 'nt' and os.path.exists(self._path):
+            os.remove(self._path)
+        os.rename(self._partial_path, self._path)
+        logger.debug('saved snapshot {}'.format(self._path))
+
+    def _write(self, record):
+        # Files of prefetched folders are listed on other threads
+        with self._lock:
+            marshal.dump(record, self._file, MARSHAL_VERSION)
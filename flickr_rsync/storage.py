@@ -2,6 +2,10 @@ from abc import abstractmethod
 
 
 class Storage(object):
+    # True if existing files can be replaced by copy_file with dest_file, see Sync --update
+    can_update = False
+    # True if folders can be renamed and files moved between folders, see Sync --detect-moves
+    can_move = False
 
     @abstractmethod
     def list_folders(self):
@@ -12,7 +16,61 @@ class Storage(object):
         pass
 
     @abstractmethod
-    def copy_file(self, file_info, folder_name, dest_storage):
+    def copy_file(self, file_info, folder_name, dest_storage, dest_file=None):
+        pass
+
+    def get_checksum(self, file_info):
+        """
+        Gets the md5 checksum of a listed file, for storages that only calculate checksums on demand
+
+        Returns:
+            The hex md5 checksum, or None if it isn't known
+        """
+        return file_info.checksum
+
+    def resume(self):
+        """
+        Finishes any copies to this storage left half done by an interrupted sync, see Journal
+        """
+        pass
+
+    def stats(self):
+        """
+        Returns:
+            A list of lines describing the storage's activity for the sync summary, e.g. its API calls
+        """
+        return []
+
+    def set_mtime(self, file_info, mtime):
+        """
+        Sets the modification time of a listed file, for storages whose listings include it
+        """
+        pass
+
+    def is_filtered(self):
+        """
+        Returns:
+            True if listings are filtered by options that only apply to this storage, so it can't be the dest of a
+            sync without copying the files filtered out again
+        """
+        return False
+
+    @abstractmethod
+    def rename_folder(self, folder, name):
+        """
+        Renames a folder, for storages that can_move
+
+        Returns:
+            A FolderInfo for the renamed folder
+        """
+        pass
+
+    @abstractmethod
+    def move_file(self, file_info, folder, dest_folder_name, dest_name):
+        """
+        Moves a file in folder to the folder named dest_folder_name, renaming it to dest_name, for storages that
+        can_move
+        """
         pass
 
 
@@ -25,3 +83,7 @@ class RemoteStorage(Storage):
     @abstractmethod
     def upload(self, src, folder_name, file_name, checksum):
         pass
+
+    @abstractmethod
+    def replace(self, src, file_info, checksum):
+        pass
@@ -2,83 +2,619 @@ from __future__ import print_function
 import os
 import operator
 import time
+import urllib2
 import logging
+import threading
+import requests
 from root_folder_info import RootFolderInfo
+from name_index import NameIndex, normalize_name
+from external_sort import external_sort
+from checksum_index import ChecksumIndex, CatalogChecksumIndex
+from folder_info import FolderInfo
+from plan import COPY, MOVE, RENAME
+from transfer_order import TransferQueue, ORDERS, is_video
+from transfer_lane import TransferLane
+from resiliently import is_token_rejected
 
 logger = logging.getLogger(__name__)
 
+# Errors copying one file that every other copy would hit too, so they stop the sync rather than fail each file
+CONNECTION_ERRORS = (urllib2.URLError, requests.ConnectionError)
+
+
+class TooManyFailuresError(Exception):
+    """
+    Raised when more files fail to copy than --max-failures allows
+    """
+    pass
+
+
+class FilteredDestError(Exception):
+    """
+    Raised when dest is filtered by options that src can't apply, see Storage.is_filtered
+    """
+    pass
+
 
 class Sync(object):
 
-    def __init__(self, config, src, dest):
+    def __init__(self, config, src, dest, dest_index=None, journal=None, plan=None):
+        """
+        Args:
+            config: The Config
+            src: The storage to copy from
+            dest: The storage to copy to
+            dest_index: An optional Catalog of dest, used to check which files exist instead of listing dest
+            journal: An optional Journal to record progress in, and resume an interrupted sync from
+            plan: An optional PlanWriter to write the operations to instead of running them
+        """
         self._config = config
         self._src = src
         self._dest = dest
+        self._dest_index = dest_index
+        self._journal = journal
+        self._plan = plan
         self._copy_count = 0
+        self._update_count = 0
         self._skip_count = 0
+        self._move_count = 0
+        self._rename_count = 0
+        # Set when copying concurrently, see _start_lanes
+        self._lane = None
+        self._large_lane = None
+        # Set when ordering transfers, see _copy_queued
+        self._queue = None
+        self._queued_folders = []
+        # (folder, file, path, dest_file, error) of copies that failed, see _record_failure
+        self._failures = []
+        self._failures_lock = threading.Lock()
+        # Copies started but not yet finished by folder name, and the folders to journal as done once they have
+        # finished, see _journal_folder_done
+        self._folder_copies = {}
+        self._folders_done = set()
+        # Measured by _copy, see bandwidth
+        self._bytes_copied = 0
+        self._copy_start = None
+        self._copy_end = None
+        # Set when detecting moves, see _index_moves
+        self._checksum_index = None
+        self._src_folder_keys = None
+        self._src_file_names = {}
+        self._renamed_folders = {}
 
     def run(self):
+        if self._dest.is_filtered():
+            raise FilteredDestError(
+                "--media, --min-date, --max-date and --filter-tags only apply to listing flickr, they can't be used "
+                "when flickr is the dest of a sync")
         if self._config.dry_run:
             logger.info("dry run enabled, no files will be copied")
         logger.info("building folder list...")
+        self._run(self._sync_folders)
+
+    def run_plan(self, plan):
+        """
+        Runs the operations of a plan written by a previous sync with --plan, without listing src or dest
+
+        Args:
+            plan: A PlanReader
+        """
+        if self._config.dry_run:
+            logger.info("dry run enabled, no files will be copied")
+        logger.info("running plan {} from {} to {}...".format(plan.path, plan.src, plan.dest))
+        self._run(lambda: self._run_plan(plan))
+
+    def bandwidth(self):
+        """
+        Returns:
+            The bytes per second copied by the sync, or None if nothing of a known size was copied
+        """
+        if not self._bytes_copied or self._copy_end <= self._copy_start:
+            return None
+        return self._bytes_copied / (self._copy_end - self._copy_start)
+
+    def _run(self, sync):
         start = time.time()
+        if self._journal and self._journal.resumed:
+            self._dest.resume()
+        self._start_lanes()
+        if self._config.order in ORDERS:
+            self._queue = TransferQueue(self._config.order, self._config.list_sort_buffer)
+        try:
+            sync()
+            self._copy_queued()
+            # Raise any errors from copies still in flight
+            self._wait_pending()
+        finally:
+            for lane in (self._lane, self._large_lane):
+                if lane:
+                    lane.shutdown()
+            self._lane = self._large_lane = None
+            if self._queue:
+                self._queue.close()
+                self._queue = None
+        self._retry_failures()
+        if self._journal:
+            if self._failures:
+                # Keep the journal so the failed files are retried when the sync is resumed
+                self._journal.close()
+            else:
+                self._journal.complete()
+
+        failed_copies = sum(1 for failure in self._failures if failure[3] is None)
+        self._print_summary(
+            time.time() - start,
+            self._copy_count - failed_copies,
+            self._update_count - (len(self._failures) - failed_copies),
+            self._skip_count,
+            self._move_count,
+            self._rename_count)
+        for storage in (self._src, self._dest):
+            for line in storage.stats():
+                logger.info(line)
+        self._print_failures()
+        if self._plan:
+            self._plan.close(self._config)
 
+    def _start_lanes(self):
+        """
+        Starts the workers copying files concurrently with --transfers, and large files in a lane of their own with
+        --large-file-size, so they can't hold up the rest. Without either files are copied one at a time
+        """
+        if self._config.large_file_size > 0:
+            self._large_lane = TransferLane('large', self._config.large_transfers)
+        if self._config.transfers > 1 or self._large_lane:
+            # Keep a bounded number of copies queued so errors surface early
+            self._lane = TransferLane('small', self._config.transfers, self._config.transfers * 2)
+
+    def _is_dry_run(self):
+        # Writing a plan simulates the sync the same way as --dry-run
+        return self._config.dry_run or self._plan is not None
+
+    def failure_count(self):
+        """
+        Returns:
+            The number of files that failed to copy, even when retried
+        """
+        return len(self._failures)
+
+    def _sync_folders(self):
         src_folders = self._src.list_folders()
-        dest_folders = {
-            folder.name.lower(): folder for folder in self._dest.list_folders()}
+        if self._dest_index is not None:
+            dest_folders = None
+        else:
+            dest_folders = {
+                normalize_name(folder.name): folder for folder in self._dest.list_folders()}
+        if self._config.detect_moves and self._dest.can_move:
+            src_folders = list(src_folders)
+            self._index_moves(src_folders, dest_folders)
         for src_folder in src_folders:
-            dest_folder = dest_folders.get(src_folder.name.lower())
+            if self._journal and self._journal.is_folder_done(src_folder.name):
+                logger.debug("{}...skipped, completed by previous run".format(src_folder.name + os.sep))
+                continue
+            if self._dest_index is not None:
+                dest_folder = src_folder if self._dest_index.find_folder(
+                    src_folder.name) is not None else None
+            else:
+                dest_folder = dest_folders.get(normalize_name(src_folder.name))
             print(src_folder.name + os.sep)
+            src_files = None
+            if not dest_folder and self._checksum_index is not None:
+                src_files = list(self._src.list_files(src_folder))
+                dest_folder = self._rename_folder(src_folder, src_files)
             if dest_folder:
-                self._merge_folders(src_folder, dest_folder)
+                self._merge_folders(src_folder, dest_folder, src_files)
             else:
-                self._copy_folder(src_folder)
+                if self._plan:
+                    self._plan.new_folder(src_folder.name)
+                self._copy_folder(src_folder, src_files)
+            self._folder_done(src_folder)
         # Merge root files if requested
         if self._config.root_files:
-            self._merge_folders(RootFolderInfo(), RootFolderInfo())
+            root_folder = RootFolderInfo()
+            if not (self._journal and self._journal.is_folder_done(root_folder.name)):
+                self._merge_folders(root_folder, root_folder)
+                self._folder_done(root_folder)
 
-        self._print_summary(
-            time.time() - start,
-            self._copy_count,
-            self._skip_count)
+    def _run_plan(self, plan):
+        renamed_folders = {}
+        for op in plan:
+            if op[0] == COPY:
+                _, folder_name, file_info, dest_file = op
+                folder = FolderInfo(name=folder_name) if folder_name else RootFolderInfo()
+                path = os.path.join(folder_name, file_info.name)
+                if self._journal and self._journal.is_copied(folder_name, file_info.name):
+                    self._skip_count += 1
+                    logger.debug("{}...skipped, copied by previous run".format(path))
+                    continue
+                if dest_file:
+                    self._update_count += 1
+                else:
+                    self._copy_count += 1
+                self._copy_file(folder, file_info, path, dest_file)
+            elif op[0] == MOVE:
+                _, file_info, folder, dest_folder_name, dest_name = op
+                folder = renamed_folders.get(normalize_name(folder.name), folder)
+                path = os.path.join(dest_folder_name, dest_name)
+                # Moved files are journaled as copied to their new folder
+                if self._journal and self._journal.is_copied(dest_folder_name, dest_name):
+                    continue
+                self._move_count += 1
+                print("{} -> {}".format(os.path.join(folder.name, file_info.name), path))
+                if not self._is_dry_run():
+                    self._dest.move_file(file_info, folder, dest_folder_name, dest_name)
+                    if self._journal:
+                        self._journal.copied(dest_folder_name, dest_name)
+            elif op[0] == RENAME:
+                _, folder, name = op
+                # Renamed folders are journaled as complete under their new name
+                if self._journal and self._journal.is_folder_done(name):
+                    continue
+                self._rename_count += 1
+                print("{} -> {}".format(folder.name + os.sep, name + os.sep))
+                if not self._is_dry_run():
+                    renamed_folders[normalize_name(folder.name)] = self._dest.rename_folder(folder, name)
+                    if self._journal:
+                        self._journal.folder_done(name)
+
+    def _folder_done(self, folder):
+        if self._queue is not None:
+            # The folder's copies haven't started yet, see _copy_queued
+            self._queue.folder_done()
+            self._queued_folders.append(folder)
+        elif self._journal:
+            self._journal_folder_done(folder)
+
+    def _journal_folder_done(self, folder):
+        """
+        Journals a folder as done once all of its copies have finished, without waiting for them so the workers keep
+        copying other folders, see _copy_finished
+        """
+        with self._failures_lock:
+            if self._folder_copies.get(folder.name):
+                self._folders_done.add(folder.name)
+                return
+            self._journal_if_copied(folder.name)
 
-    def _copy_folder(self, folder):
-        src_files = self._src.list_files(folder)
+    def _copy_finished(self, folder):
+        with self._failures_lock:
+            self._folder_copies[folder.name] -= 1
+            if not self._folder_copies[folder.name] and folder.name in self._folders_done:
+                self._folders_done.remove(folder.name)
+                self._journal_if_copied(folder.name)
+
+    def _journal_if_copied(self, folder_name):
+        # A folder is only complete once none of its copies failed
+        if not any(failure[0].name == folder_name for failure in self._failures):
+            self._journal.folder_done(folder_name)
+
+    def _copy_queued(self):
+        """
+        Starts the copies held back by --order once every folder has been compared, in priority order
+        """
+        if self._queue is None:
+            return
+        logger.info("copying {} file(s) {} first...".format(self._queue.count, self._config.order))
+        for folder, file, path, dest_file in self._queue:
+            self._start_copy(folder, file, path, dest_file)
+        if self._journal:
+            for folder in self._queued_folders:
+                self._journal_folder_done(folder)
+
+    def _index_moves(self, src_folders, dest_folders):
+        """
+        Indexes dest by checksum to find files that have been moved, from the dest catalog if there is one, otherwise
+        by listing every dest folder
+        """
+        logger.info("indexing dest checksums...")
+        if self._dest_index is not None:
+            self._checksum_index = CatalogChecksumIndex(self._dest_index)
+        else:
+            folders = list(dest_folders.values())
+            folders.append(RootFolderInfo())
+            self._checksum_index = ChecksumIndex(self._dest, folders)
+        self._src_folder_keys = dict(
+            (normalize_name(folder.name), folder) for folder in src_folders)
+
+    def _rename_folder(self, src_folder, src_files):
+        """
+        Finds a dest folder no longer in src holding at least half of the files of a src folder missing from dest, and
+        renames it to the src folder's name
+
+        Returns:
+            The renamed dest folder, or None if the src folder wasn't renamed
+        """
+        counts = {}
         for src_file in src_files:
-            path = os.path.join(folder.name, src_file.name)
-            self._copy_count += 1
-            self._copy_file(folder, src_file, path)
+            found = self._checksum_index.find(self._src.get_checksum(src_file))
+            if found is not None and not found[0].is_root and \
+                    normalize_name(found[0].name) not in self._src_folder_keys:
+                key = normalize_name(found[0].name)
+                folder, count = counts.get(key, (found[0], 0))
+                counts[key] = (folder, count + 1)
+        if not counts:
+            return None
+        key, (dest_folder, count) = max(counts.items(), key=lambda item: item[1][1])
+        if count * 2 < len(src_files):
+            return None
+        # The folder's files are now in src_folder, and it can't be renamed again
+        self._src_folder_keys[key] = src_folder
+        self._rename_count += 1
+        print("{} -> {}".format(dest_folder.name + os.sep, src_folder.name + os.sep))
+        if self._plan:
+            self._plan.rename(dest_folder, src_folder.name)
+        if self._is_dry_run():
+            return dest_folder
+        renamed_folder = self._dest.rename_folder(dest_folder, src_folder.name)
+        # Files found by checksum are still indexed under the folder's old name
+        self._renamed_folders[key] = renamed_folder
+        # A catalog still has the files under the folder's old name
+        return dest_folder if self._dest_index is not None else renamed_folder
 
-    def _merge_folders(self, src_folder, dest_folder):
-        src_files = self._src.list_files(src_folder)
-        dest_files = [file.name.lower()
-                      for file in self._dest.list_files(dest_folder)]
+    def _copy_folder(self, folder, src_files=None):
+        if src_files is None:
+            src_files = self._src.list_files(folder)
         for src_file in src_files:
+            path = os.path.join(folder.name, src_file.name)
+            self._copy_missing_file(folder, src_file, path)
+
+    def _merge_folders(self, src_folder, dest_folder, src_files=None):
+        update = self._config.update and self._dest.can_update
+        for src_file, dest_file in self._match_files(src_folder, dest_folder, src_files):
             path = os.path.join(src_folder.name, src_file.name)
-            lower_filename = src_file.name.lower()
-            file_exists = lower_filename in dest_files
-            # Fix for flickr converting .jpeg to .jpg.
-            if lower_filename.endswith(".jpeg"):
-                file_exists = file_exists or "{}.jpg".format(
-                    lower_filename[:-5]) in dest_files
-            if not file_exists:
-                self._copy_count += 1
-                self._copy_file(src_folder, src_file, path)
+            if dest_file is None:
+                self._copy_missing_file(src_folder, src_file, path)
+            elif update and self._is_changed(src_file, dest_file):
+                self._update_count += 1
+                self._copy_file(src_folder, src_file, path, dest_file)
             else:
                 self._skip_count += 1
                 logger.debug("{}...skipped, file exists".format(path))
-        pass
 
-    def _copy_file(self, folder, file, path):
+    def _copy_missing_file(self, folder, src_file, path):
+        if self._journal and self._journal.is_copied(folder.name, src_file.name):
+            # Listings may not show files copied just before an interrupted sync
+            self._skip_count += 1
+            logger.debug("{}...skipped, copied by previous run".format(path))
+        elif not self._move_file(folder, src_file, path):
+            self._copy_count += 1
+            self._copy_file(folder, src_file, path)
+
+    def _match_files(self, src_folder, dest_folder, src_files=None):
+        """
+        Lists the files in src_folder and their match in dest_folder by normalize_name
+
+        Args:
+            src_files: The files in src_folder if they've already been listed
+
+        Returns:
+            An iterator of (src_file, dest_file) tuples, dest_file is None if the file doesn't exist in dest
+        """
+        if src_files is None:
+            src_files = self._src.list_files(src_folder)
+        if self._dest_index is not None:
+            return ((src_file, self._find_indexed_file(dest_folder, src_file))
+                    for src_file in src_files)
+        if self._config.sorted_merge:
+            return self._match_sorted_files(
+                src_files, self._dest.list_files(dest_folder))
+        dest_files = NameIndex(
+            self._dest.list_files(dest_folder), name=lambda file: file.name)
+        return ((src_file, dest_files.get(src_file.name)) for src_file in src_files)
+
+    def _find_indexed_file(self, dest_folder, src_file):
+        index = self._dest_index.find_file(dest_folder.name, src_file.name)
+        return self._dest_index.get_file(index) if index is not None else None
+
+    def _match_sorted_files(self, src_files, dest_files):
+        # Both folders are sorted on disk and joined in a single pass, so neither is held in memory
+        key = operator.itemgetter(0)
+        dest_items = external_sort(
+            ((normalize_name(file.name), file) for file in dest_files),
+            key=key,
+            buffer_size=self._config.list_sort_buffer)
+        dest_name, dest_file = next(dest_items, (None, None))
+        for name, src_file in external_sort(
+                ((normalize_name(file.name), file) for file in src_files),
+                key=key,
+                buffer_size=self._config.list_sort_buffer):
+            while dest_name is not None and dest_name < name:
+                dest_name, dest_file = next(dest_items, (None, None))
+            yield src_file, dest_file if dest_name == name else None
+
+    def _move_file(self, folder, src_file, path):
+        """
+        Moves a file missing from a dest folder from wherever it is in dest, found by checksum, if it is no longer in
+        that folder in src
+
+        Returns:
+            True if the file was moved
+        """
+        if self._checksum_index is None:
+            return False
+        checksum = self._src.get_checksum(src_file)
+        found = self._checksum_index.find(checksum)
+        if found is None:
+            return False
+        dest_folder, dest_file = found
+        if self._src_has_file(dest_folder, dest_file):
+            # The file has been copied in src rather than moved
+            return False
+        dest_folder = self._renamed_folders.get(normalize_name(dest_folder.name), dest_folder)
+        self._checksum_index.discard(checksum)
+        self._move_count += 1
+        print("{} -> {}".format(os.path.join(dest_folder.name, dest_file.name), path))
+        if self._plan:
+            self._plan.move(dest_file, dest_folder, folder.name, src_file.name)
+        if not self._is_dry_run():
+            self._dest.move_file(
+                dest_file, dest_folder, folder.name, src_file.name)
+        logger.debug("{}...moved".format(path))
+        return True
+
+    def _src_has_file(self, folder, file_info):
+        key = normalize_name(folder.name)
+        if not folder.is_root and key not in self._src_folder_keys:
+            return False
+        names = self._src_file_names.get(key)
+        if names is None:
+            src_folder = RootFolderInfo() if folder.is_root else self._src_folder_keys[key]
+            names = NameIndex(
+                (file.name for file in self._src.list_files(src_folder)))
+            self._src_file_names[key] = names
+        return file_info.name in names
+
+    def _is_changed(self, src_file, dest_file):
+        """
+        Compares a file that exists in src and dest the same way as rsync's quick check, by size and modification time
+        from the listings, only comparing checksums when those can't tell whether the file has changed. Files are only
+        considered changed if there is evidence they differ
+        """
+        if _differs(src_file.size, dest_file.size):
+            return True
+        if (src_file.size is not None and dest_file.size is not None and
+                src_file.mtime is not None and dest_file.mtime is not None and
+                int(src_file.mtime) == int(dest_file.mtime)):
+            return False
+        src_checksum = self._src.get_checksum(src_file)
+        if src_checksum is None:
+            return False
+        dest_checksum = self._dest.get_checksum(dest_file)
+        if src_checksum == dest_checksum and src_file.mtime is not None and not self._is_dry_run():
+            # As rsync does, so the quick check skips the file next time instead of comparing checksums again
+            self._dest.set_mtime(dest_file, src_file.mtime)
+        return _differs(src_checksum, dest_checksum)
+
+    def _copy_file(self, folder, file, path, dest_file=None):
+        """
+        Args:
+            dest_file: The file to replace in dest when updating a changed file
+        """
+        if self._queue is not None:
+            self._queue.add(folder, file, path, dest_file)
+        else:
+            self._start_copy(folder, file, path, dest_file)
+
+    def _start_copy(self, folder, file, path, dest_file):
         print(path)
-        if not self._config.dry_run:
+        if self._plan:
+            self._plan.copy(folder.name, file, dest_file)
+        if self._is_dry_run():
+            logger.debug("{}...copied".format(path))
+            return
+        if self._journal:
+            self._journal.planned(folder.name, file.name)
+            with self._failures_lock:
+                self._folder_copies[folder.name] = self._folder_copies.get(folder.name, 0) + 1
+        lane = self._large_lane if self._large_lane and self._is_large(file) else self._lane
+        if lane:
+            lane.submit(self._transfer, folder, file, path, dest_file)
+        else:
+            self._transfer(folder, file, path, dest_file)
+
+    def _is_large(self, file):
+        if file.size is None:
+            # Flickr doesn't list sizes, but videos are usually the large files
+            return is_video(file.name)
+        return file.size >= self._config.large_file_size * 1024 * 1024
+
+    def _transfer(self, folder, file, path, dest_file=None):
+        try:
+            self._copy(folder, file, path, dest_file)
+        except Exception as e:
+            if _is_fatal(e):
+                raise
+            self._record_failure(folder, file, path, dest_file, e)
+        if self._journal:
+            self._copy_finished(folder)
+
+    def _copy(self, folder, file, path, dest_file):
+        start = time.time()
+        if dest_file:
+            self._src.copy_file(
+                file, folder and folder.name, self._dest, dest_file=dest_file)
+            logger.debug("{}...updated".format(path))
+        else:
             self._src.copy_file(file, folder and folder.name, self._dest)
-        logger.debug("{}...copied".format(path))
+            logger.debug("{}...copied".format(path))
+        with self._failures_lock:
+            self._bytes_copied += file.size or 0
+            self._copy_start = min(start, self._copy_start or start)
+            self._copy_end = time.time()
+        if self._journal:
+            self._journal.copied(folder.name, file.name)
+
+    def _record_failure(self, folder, file, path, dest_file, error):
+        """
+        Records a file that failed to copy, so one bad file doesn't stop the rest of the sync. Failed files are retried
+        once all others are copied, see _retry_failures
+
+        Raises:
+            TooManyFailuresError: If more files have failed than --max-failures allows
+        """
+        logger.warning("{}...failed, {!r}".format(path, error))
+        with self._failures_lock:
+            self._failures.append((folder, file, path, dest_file, error))
+            failure_count = len(self._failures)
+        if self._config.max_failures and failure_count > self._config.max_failures:
+            raise TooManyFailuresError(
+                "{} file(s) failed to copy, more than --max-failures {}".format(
+                    failure_count, self._config.max_failures))
 
-    def _print_summary(self, elapsed, files_copied, files_skipped):
+    def _retry_failures(self):
+        """
+        Retries each failed copy once, after everything else has been copied. Files that fail again are left in
+        _failures
+        """
+        failures, self._failures = self._failures, []
+        if failures:
+            logger.info("retrying {} failed file(s)...".format(len(failures)))
+        for folder, file, path, dest_file, _ in failures:
+            try:
+                self._copy(folder, file, path, dest_file)
+            except Exception as e:
+                if _is_fatal(e):
+                    raise
+                logger.warning("{}...failed, {!r}".format(path, e))
+                self._failures.append((folder, file, path, dest_file, e))
+
+    def _print_failures(self):
+        if not self._failures:
+            return
+        counts = {}
+        for failure in self._failures:
+            name = type(failure[4]).__name__
+            counts[name] = counts.get(name, 0) + 1
+        logger.warning("failed to copy {} file(s): {}".format(
+            len(self._failures),
+            ', '.join('{} {}'.format(count, name) for name, count in sorted(counts.items()))))
+        for _, _, path, _, error in self._failures:
+            logger.warning("  {}: {!r}".format(path, error))
+
+    def _wait_pending(self):
+        for lane in (self._lane, self._large_lane):
+            if lane:
+                lane.wait()
+
+    def _print_summary(self, elapsed, files_copied, files_updated, files_skipped, files_moved=0,
+                       folders_renamed=0):
+        updated_msg = ", updated {} changed file(s)".format(
+            files_updated) if files_updated > 0 else ''
+        if files_moved > 0 or folders_renamed > 0:
+            updated_msg += ", moved {} file(s) and renamed {} folder(s)".format(
+                files_moved, folders_renamed)
         skipped_msg = ", skipped {} files(s) that already exist".format(
             files_skipped) if files_skipped > 0 else ''
         logger.info(
-            "\ntransferred {} file(s){} in {} sec".format(
-                files_copied, skipped_msg, round(
+            "\ntransferred {} file(s){}{} in {} sec".format(
+                files_copied, updated_msg, skipped_msg, round(
                     elapsed, 2)))
+
+
+def _is_fatal(error):
+    return isinstance(error, CONNECTION_ERRORS) or is_token_rejected(error)
+
+
+def _differs(src_value, dest_value):
+    # Only values known on both sides can show a file has changed
+    return src_value is not None and dest_value is not None and src_value != dest_value
@@ -12,6 +12,7 @@
 from __future__ import print_function
 import time
 import logging
+import threading
 from functools import wraps
 
 logger = logging.getLogger(__name__)
@@ -27,6 +28,7 @@ class HistoryItem(object):
     def __init__(self, func):
         self.func = func
         self.last_call = None
+        self.lock = threading.Lock()
 
 
 history = []
@@ -42,13 +44,15 @@ def throttle(delay_sec=0):
         @wraps(func)
         def wrapper(*args, **kwargs):
             delay_sec_ = _maybe_call(delay_sec)
-            if delay_sec_ > 0 and state.last_call is not None:
-                delay = delay_sec_ - (time.time() - state.last_call)
-                if delay > 0:
-                    logger.debug(
-                        'throttling function call, sleeping for {} seconds'.format(delay))
-                    time.sleep(delay)
-            state.last_call = time.time()
+            # Concurrent callers queue on the lock so each waits its turn
+            with state.lock:
+                if delay_sec_ > 0 and state.last_call is not None:
+                    delay = delay_sec_ - (time.time() - state.last_call)
+                    if delay > 0:
+                        logger.debug(
+                            'throttling function call, sleeping for {} seconds'.format(delay))
+                        time.sleep(delay)
+                state.last_call = time.time()
             return func(*args, **kwargs)
         return wrapper
     return decorator
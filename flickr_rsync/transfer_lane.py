@@ -0,0 +1,70 @@
+from __future__ import print_function
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+
+class TransferLane(object):
+    """
+    A pool of workers copying files. Sync copies large files in a lane of their own, so a few long uploads can't hold
+    up thousands of small photos, and each lane's share of the bandwidth follows its number of workers
+    """
+
+    def __init__(self, name, workers, max_queued=None):
+        """
+        Args:
+            name: The name of the lane, for logging
+            workers: The number of files to copy concurrently
+            max_queued: The number of copies to queue before submit blocks so errors surface early, or None to never
+                block, for lanes of files few enough to queue all of them
+        """
+        self.name = name
+        self.workers = workers
+        self._max_queued = max_queued
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = set()
+        self.count = 0
+
+    def submit(self, func, *args):
+        """
+        Queues func to be called with args by one of the lane's workers
+
+        Raises:
+            Any error raised by a copy that has completed
+        """
+        if self._max_queued is None:
+            self._reap()
+        else:
+            self.wait(self._max_queued)
+        self._pending.add(self._executor.submit(func, *args))
+        self.count += 1
+
+    def wait(self, max_pending=0):
+        """
+        Waits until no more than max_pending copies are queued or running
+
+        Raises:
+            Any error raised by a completed copy
+        """
+        while len(self._pending) > max_pending:
+            done, self._pending = wait(
+                self._pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
+
+    def shutdown(self):
+        """
+        Cancels any copies that haven't started, e.g. when the sync is aborted, and waits for the rest to finish
+        """
+        for future in self._pending:
+            future.cancel()
+        self._pending = set()
+        self._executor.shutdown(wait=True)
+        logger.debug("{} lane queued {} file(s) for {} worker(s)".format(self.name, self.count, self.workers))
+
+    def _reap(self):
+        done = set(future for future in self._pending if future.done())
+        self._pending -= done
+        for future in done:
+            future.result()
@@ -0,0 +1,106 @@
+from __future__ import print_function
+import os
+import logging
+import operator
+import tempfile
+from external_sort import external_sort
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+logger = logging.getLogger(__name__)
+
+NEWEST = 'newest'
+SMALLEST = 'smallest'
+PHOTOS = 'photos'
+ORDERS = (NEWEST, SMALLEST, PHOTOS)
+# The video formats accepted by the default --include
+VIDEO_EXTENSIONS = frozenset(['wmv', 'avi', 'mov', 'mpg', 'mp4', '3gp', 'ogg', 'ogv', 'm2ts'])
+
+
+class TransferQueue(object):
+    """
+    Holds back the copies of a sync until every folder has been compared, then releases them in priority order:
+    newest folders first by their most recently modified file, smallest files first to copy the most photos within
+    Flickr's rate limits, or photos before videos. Queued copies are written to a temporary file and sorted with
+    external_sort, so memory use is bounded by buffer_size however many files are queued
+    """
+
+    def __init__(self, order, buffer_size):
+        """
+        Args:
+            order: One of ORDERS
+            buffer_size: The number of copies to sort in memory, see external_sort
+        """
+        if order not in ORDERS:
+            raise ValueError('Unrecognised transfer order: {}'.format(order))
+        self._order = order
+        self._buffer_size = buffer_size
+        self._file = tempfile.TemporaryFile()
+        self._pickler = pickle.Pickler(self._file, pickle.HIGHEST_PROTOCOL)
+        # The copies of the current folder, held until folder_done when ordering by folder
+        self._folder_items = []
+        self.count = 0
+
+    def add(self, folder, file_info, path, dest_file=None):
+        """
+        Queues a copy, the arguments are returned as a tuple when iterating
+        """
+        item = (folder, file_info, path, dest_file)
+        self.count += 1
+        if self._order == NEWEST:
+            self._folder_items.append(item)
+        elif self._order == SMALLEST:
+            self._write((file_info.size is None, file_info.size), item)
+        else:
+            self._write(is_video(file_info.name), item)
+
+    def folder_done(self):
+        """
+        Marks the end of a folder's copies, so its priority can be set from all of its files
+        """
+        if not self._folder_items:
+            return
+        newest = max(item[1].mtime for item in self._folder_items)
+        key = (newest is None, -(newest or 0))
+        for item in self._folder_items:
+            self._write(key, item)
+        self._folder_items = []
+
+    def __iter__(self):
+        """
+        Returns:
+            A generator of (folder, file_info, path, dest_file) tuples in priority order, files of the same priority
+            are returned in the order they were added
+        """
+        self.folder_done()
+        self._file.seek(0)
+        for _, item in external_sort(
+                _read_items(self._file), key=operator.itemgetter(0), buffer_size=self._buffer_size):
+            yield item
+
+    def close(self):
+        self._file.close()
+
+    def _write(self, key, item):
+        self._pickler.dump((key, item))
+        # Don't let the pickler memo hold a reference to every item written
+        self._pickler.clear_memo()
+
+
+def is_video(name):
+    """
+    Returns:
+        True if the file name has the extension of a video
+    """
+    return os.path.splitext(name)[1][1:].lower() in VIDEO_EXTENSIONS
+
+
+def _read_items(f):
+    unpickler = pickle.Unpickler(f)
+    while True:
+        try:
+            yield unpickler.load()
+        except EOFError:
+            return
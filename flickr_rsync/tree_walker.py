@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function
-import operator
+import itertools
 import time
 import logging
-from rx import Observable, AnonymousObservable
-from rx.internal import extensionmethod
 from walker import Walker
 from root_folder_info import RootFolderInfo
+from sinks import TextSink
+from enumerate_peek import enumerate_peek
+from prefetch import prefetch
+from external_sort import external_sort
 
 UNICODE_LEAF = u"├─── ".encode('utf-8')
 UNICODE_LAST_LEAF = u"└─── ".encode('utf-8')
@@ -15,104 +17,81 @@ UNICODE_LAST_BRANCH = "    "
 logger = logging.getLogger(__name__)
 
 
-@extensionmethod(Observable)
-def is_last(source):
-    def subscribe(observer):
-        value = [None]
-        seen_value = [False]
-
-        def on_next(x):
-            if seen_value[0]:
-                observer.on_next((value[0], False))
-            value[0] = x
-            seen_value[0] = True
-
-        def on_completed():
-            if seen_value[0]:
-                observer.on_next((value[0], True))
-            observer.on_completed()
-
-        return source.subscribe(on_next, observer.on_error, on_completed)
-    return AnonymousObservable(subscribe)
-
-
 class TreeWalker(Walker):
 
     def __init__(self, config, storage):
         self._config = config
         self._storage = storage
+        self._out = TextSink()
 
     def walk(self):
         start = time.time()
+        file_count = 0
+        shown_folder_count = 0
+        all_folder_count = 0
 
-        # Create source stream with folder message items
-        folderlist = self._storage.list_folders()
+        folders = self._storage.list_folders()
         if self._config.list_sort:
-            folderlist = sorted(folderlist, key=lambda x: x.name)
-        folders = Observable.from_(folderlist) \
-            .map(lambda f: {'folder': f})
+            folders = external_sort(
+                folders,
+                key=lambda x: x.name,
+                buffer_size=self._config.list_sort_buffer)
         if self._config.root_files:
-            folders = folders.start_with({'folder': RootFolderInfo()})
-
-        # Expand folder messages into file messages
-        folders = folders.publish().auto_connect(2)
-        files = folders.is_last() .map(
-            lambda x_is_last: dict(
-                x_is_last[0],
-                is_last_folder=x_is_last[1]))
-        if not self._config.list_folders:
-            files = files.concat_map(lambda x: self._walk_folder(x))
-        # Group by folder but still provide a file stream within each group
-        groups = files.group_by(lambda x: x['folder'])
-        groups.subscribe(self._walk_group)
-
-        # Gather counts and print summary
-        all_folder_count = folders.count(self._not_root)
-        shown_folder_count = groups \
-            .flat_map(lambda g: g.first()) \
-            .count(self._not_root)
-        files.count() .zip(
+            folders = itertools.chain([RootFolderInfo()], folders)
+        if self._config.list_folders:
+            folder_files = ((folder, []) for folder in folders)
+        elif self._config.prefetch > 0:
+            # List the next folders' files concurrently, holding at most the prefetch window in memory
+            folder_files = prefetch(
+                folders,
+                lambda folder: list(self._walk_folder(folder)),
+                self._config.prefetch)
+        else:
+            folder_files = ((folder, self._walk_folder(folder))
+                            for folder in folders)
+
+        try:
+            for (folder, files), has_next_folder in enumerate_peek(folder_files):
+                is_last_folder = not has_next_folder
+                if not folder.is_root:
+                    all_folder_count += 1
+                if self._config.list_folders:
+                    if not folder.is_root:
+                        self._print_folder(folder, is_last_folder)
+                        shown_folder_count += 1
+                    continue
+
+                # Folders are only shown once their first file is found, so empty folders are hidden
+                for i, (file, has_next_file) in enumerate(enumerate_peek(files)):
+                    if i == 0 and not folder.is_root:
+                        self._print_folder(folder, is_last_folder)
+                        shown_folder_count += 1
+                    file_count += 1
+                    self._print_file(
+                        file,
+                        is_last_file=not has_next_file,
+                        is_last_folder=is_last_folder,
+                        is_root_folder=folder.is_root)
+        finally:
+            self._out.close()
+
+        self._print_summary(
+            time.time() - start,
+            file_count,
             shown_folder_count,
-            all_folder_count,
-            lambda n_files,
-            n_shown,
-            n_all: (
-                n_files,
-                n_shown,
-                n_all -
-                n_shown)) .subscribe(
-            lambda n_files_n_shown_n_hidden: self._print_summary(
-                time.time() -
-                start,
-                n_files_n_shown_n_hidden[0],
-                n_files_n_shown_n_hidden[1],
-                n_files_n_shown_n_hidden[2]))
-
-    def _not_root(self, x):
-        return not x['folder'].is_root
-
-    def _walk_group(self, source):
-        seen_value = [False]
+            all_folder_count - shown_folder_count)
 
-        def on_next(x):
-            if not seen_value[0] and self._not_root(x):
-                self._print_folder(**x)
-            if 'file' in x:
-                self._print_file(**dict(x, is_root_folder=x['folder'].is_root))
-            seen_value[0] = True
-
-        source.subscribe(on_next)
-
-    def _walk_folder(self, msg):
-        fileList = self._storage.list_files(msg['folder'])
+    def _walk_folder(self, folder):
+        fileList = self._storage.list_files(folder)
         if self._config.list_sort:
-            fileList = sorted(fileList, key=lambda x: x.name)
-
-        return Observable.from_(fileList).is_last() .map(
-            lambda f_is_last: dict(msg, file=f_is_last[0], is_last_file=f_is_last[1]))
+            fileList = external_sort(
+                fileList,
+                key=lambda x: x.name,
+                buffer_size=self._config.list_sort_buffer)
+        return fileList
 
     def _print_folder(self, folder, is_last_folder, **kwargs):
-        print(
+        self._out.write_line(
             "{}{}".format(
                 UNICODE_LAST_LEAF if is_last_folder else UNICODE_LEAF,
                 folder.name))
@@ -134,7 +113,7 @@ class TreeWalker(Walker):
         if is_last_file and (not is_root_folder or is_last_folder):
             file_prefix = UNICODE_LAST_LEAF
 
-        print(
+        self._out.write_line(
             "{}{}{}{}".format(
                 folder_prefix,
                 file_prefix,
@@ -142,7 +121,7 @@ class TreeWalker(Walker):
                 " [{:.6}]".format(
                     file.checksum) if file.checksum else ''))
         if is_last_file and not is_last_folder:
-            print(UNICODE_BRANCH)
+            self._out.write_line(UNICODE_BRANCH)
 
     def _print_summary(
             self,
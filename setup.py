@@ -36,6 +36,8 @@ def test_suite():
 additional_requires = []
 if os.name == 'nt':
     additional_requires.append('win_unicode_console~=0.5')
+if sys.version_info < (3, 5):
+    additional_requires.append('scandir~=1.10')
 
 setup(
     name='flickr-rsync',
@@ -55,7 +57,8 @@ setup(
         'argparse~=1.4.0',
         'rx~=1.5.9',
         'futures~=3.1.1',
-        'backoff~=1.3.1'
+        'backoff~=1.3.1',
+        'requests>=2.4'
     ] + additional_requires,
     dependency_links=[
         'https://github.com/alexis-mignon/python-flickr-api/tarball/6f3163b#egg=flickr_api-0.5beta'
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import threading
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from flickr_rsync.api_scheduler import ApiScheduler, UPLOAD, LIST
+
+
+class RecordingScheduler(ApiScheduler):
+
+    def __init__(self):
+        self.dispatched = []
+        super(RecordingScheduler, self).__init__()
+
+    def _dispatched(self, api_class):
+        self.dispatched.append(api_class)
+
+
+class ApiSchedulerTest(unittest.TestCase):
+
+    def test_should_return_result_and_count_calls(self):
+        scheduler = ApiScheduler()
+
+        result = scheduler.call(UPLOAD, lambda a, b: a + b, 1, b=2)
+        scheduler.call(LIST, lambda: None)
+        scheduler.call(LIST, lambda: None)
+
+        self.assertEqual(result, 3)
+        self.assertEqual([(api_class, calls) for api_class, calls, _, _ in scheduler.stats()],
+                         [(UPLOAD, 1), (LIST, 2)])
+
+    def test_should_share_calls_by_weight_given_waiting_classes(self):
+        scheduler = RecordingScheduler()
+        threads = []
+        # Hold the scheduler so every call queues
+        scheduler._dispatching = True
+        for i, api_class in enumerate([LIST, LIST, LIST, UPLOAD, UPLOAD, UPLOAD]):
+            thread = threading.Thread(target=scheduler.call, args=(api_class, lambda: None))
+            thread.start()
+            threads.append(thread)
+            while len(scheduler._queue) <= i:
+                time.sleep(0.001)
+
+        with scheduler._condition:
+            scheduler._dispatching = False
+            scheduler._condition.notify_all()
+        for thread in threads:
+            thread.join()
+
+        # Recorded while each call holds the scheduler, as the calls themselves can run in any order
+        self.assertEqual(scheduler.dispatched, [LIST, UPLOAD, UPLOAD, UPLOAD, LIST, LIST])
+
+    def test_should_keep_scheduling_given_call_fails(self):
+        scheduler = ApiScheduler()
+
+        def fail():
+            raise ValueError()
+
+        self.assertRaises(ValueError, scheduler.call, UPLOAD, fail)
+        self.assertEqual(scheduler.call(UPLOAD, lambda: 1), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import MagicMock
+import helpers
+from flickr_rsync.catalog import Catalog, write_catalog
+from flickr_rsync.file_info import FileInfo
+from flickr_rsync.folder_info import FolderInfo
+from flickr_rsync.root_folder_info import RootFolderInfo
+
+CHECKSUM_ONE = '70ebf9be4d8301e94c65582977332754'
+CHECKSUM_TWO = '3d3046b37ba338793a762ab7bd83e85c'
+
+
+class CatalogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'test.catalog')
+        self.storage = MagicMock()
+        self.folder_one = FolderInfo(id=u'72157600000000001', name='B Folder')
+        self.folder_two = FolderInfo(id=u'72157600000000002', name='a folder')
+        self.file_one = FileInfo(id=u'30000000001', name='IMG_0001.JPEG', checksum=CHECKSUM_ONE, size=10)
+        self.file_two = FileInfo(id=u'30000000002', name='IMG_0002.jpg', checksum=CHECKSUM_TWO)
+        self.file_three = FileInfo(id=u'30000000003', name='IMG_0003.jpg', checksum=CHECKSUM_ONE)
+        self.file_four = FileInfo(id=None, name='notes.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _create_catalog(self, folders, **kwargs):
+        helpers.setup_storage(self.storage, folders)
+        write_catalog(self.path, self.storage, **kwargs)
+        catalog = Catalog(self.path)
+        self.addCleanup(catalog.close)
+        return catalog
+
+    def _create_default_catalog(self, **kwargs):
+        return self._create_catalog([
+            {'folder': RootFolderInfo(), 'files': [self.file_four]},
+            {'folder': self.folder_one, 'files': [self.file_two, self.file_one]},
+            {'folder': self.folder_two, 'files': [self.file_three]}
+        ], root_files=True, **kwargs)
+
+    def test_should_find_files_ignoring_case_and_jpeg_extension(self):
+        catalog = self._create_default_catalog()
+
+        self.assertEqual(catalog.folder_count, 3)
+        self.assertEqual(catalog.file_count, 4)
+        index = catalog.find_file('b folder', 'img_0001.jpg')
+        self.assertIsNotNone(index)
+        self.assertEqual(catalog.get_file(index).name, 'IMG_0001.JPEG')
+        self.assertIsNotNone(catalog.find_file('A Folder', 'IMG_0003.jpeg'))
+        self.assertIsNotNone(catalog.find_file('', 'notes.txt'))
+
+    def test_should_not_find_missing_files_and_folders(self):
+        catalog = self._create_default_catalog()
+
+        self.assertIsNone(catalog.find_folder('C Folder'))
+        self.assertIsNone(catalog.find_file('C Folder', 'IMG_0001.jpg'))
+        self.assertIsNone(catalog.find_file('B Folder', 'IMG_0003.jpg'))
+        self.assertIsNone(catalog.find_file('B Folder', 'IMG_0000.jpg'))
+        self.assertIsNone(catalog.find_file('B Folder', 'IMG_9999.jpg'))
+
+    def test_should_read_file_columns(self):
+        catalog = self._create_default_catalog()
+
+        file_info = catalog.get_file(catalog.find_file('B Folder', 'IMG_0001.jpg'))
+        root_file = catalog.get_file(catalog.find_file('', 'notes.txt'))
+
+        self.assertEqual((file_info.id, file_info.checksum, file_info.size),
+                         (30000000001, CHECKSUM_ONE, 10))
+        self.assertEqual((root_file.id, root_file.checksum, root_file.size), (None, None, None))
+
+    def test_should_read_folders(self):
+        catalog = self._create_default_catalog()
+
+        folder = catalog.get_folder(catalog.find_folder('A FOLDER'))
+        root_folder = catalog.get_folder(catalog.find_folder(''))
+
+        self.assertEqual((folder.id, folder.name), (72157600000000002, 'a folder'))
+        self.assertTrue(root_folder.is_root)
+
+    def test_should_find_all_files_given_checksum(self):
+        catalog = self._create_default_catalog()
+
+        names = sorted(catalog.get_file(i).name for i in catalog.find_checksum(CHECKSUM_ONE))
+        folders = sorted(catalog.get_folder(catalog.get_file_folder(i)).name
+                         for i in catalog.find_checksum(CHECKSUM_ONE))
+
+        self.assertEqual(names, ['IMG_0001.JPEG', 'IMG_0003.jpg'])
+        self.assertEqual(folders, ['B Folder', 'a folder'])
+        self.assertEqual(list(catalog.find_checksum('ffffffffffffffffffffffffffffffff')), [])
+        self.assertEqual(list(catalog.find_checksum('not a checksum')), [])
+
+    def test_should_find_every_file_given_sort_spills_to_disk(self):
+        files = [FileInfo(name='IMG_{:04}.jpg'.format((i * 7919) % 500), checksum='{:032x}'.format(i % 50))
+                 for i in range(500)]
+        catalog = self._create_catalog([
+            {'folder': self.folder_one, 'files': files[:250]},
+            {'folder': self.folder_two, 'files': files[250:]}
+        ], buffer_size=16)
+
+        for i, file_info in enumerate(files):
+            folder = self.folder_one if i < 250 else self.folder_two
+            self.assertIsNotNone(catalog.find_file(folder.name, file_info.name))
+        self.assertEqual(len(list(catalog.find_checksum('{:032x}'.format(7)))), 10)
+
+    def test_should_merge_folders_differing_only_by_case(self):
+        catalog = self._create_catalog([
+            {'folder': self.folder_two, 'files': [self.file_one]},
+            {'folder': FolderInfo(id=3, name='A Folder'), 'files': [self.file_two]}
+        ])
+
+        self.assertEqual(catalog.folder_count, 1)
+        self.assertIsNotNone(catalog.find_file('a folder', 'IMG_0002.jpg'))
+
+    def test_should_raise_given_not_a_catalog(self):
+        with open(self.path, 'w') as f:
+            f.write('Folder,Filename,Checksum\n')
+
+        self.assertRaises(IOError, Catalog, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
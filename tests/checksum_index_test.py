@@ -0,0 +1,62 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import MagicMock
+import helpers
+from flickr_rsync.checksum_index import ChecksumIndex, CatalogChecksumIndex
+from flickr_rsync.catalog import Catalog, write_catalog
+from flickr_rsync.file_info import FileInfo
+from flickr_rsync.folder_info import FolderInfo
+
+
+class ChecksumIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder_one = FolderInfo(id=1, name='A')
+        self.folder_two = FolderInfo(id=2, name='B')
+        self.file_one = FileInfo(id=1, name='a.jpg', checksum='0' * 32)
+        self.file_two = FileInfo(id=2, name='b.jpg', checksum='1' * 32)
+        self.storage = MagicMock()
+        self.storage.get_checksum.side_effect = lambda file_info: file_info.checksum
+        helpers.setup_storage(self.storage, [
+            {'folder': self.folder_one, 'files': [self.file_one, FileInfo(id=3, name='c.jpg')]},
+            {'folder': self.folder_two, 'files': [self.file_two, FileInfo(id=4, name='d.jpg', checksum='0' * 32)]}
+        ])
+
+    def test_should_find_first_file_given_checksum(self):
+        index = ChecksumIndex(self.storage, [self.folder_one, self.folder_two])
+
+        self.assertEqual(index.find('0' * 32), (self.folder_one, self.file_one))
+        self.assertEqual(index.find('1' * 32), (self.folder_two, self.file_two))
+        self.assertIsNone(index.find('2' * 32))
+        self.assertIsNone(index.find(None))
+
+    def test_should_not_find_file_given_discarded(self):
+        index = ChecksumIndex(self.storage, [self.folder_one, self.folder_two])
+
+        index.discard('1' * 32)
+
+        self.assertIsNone(index.find('1' * 32))
+
+    def test_should_find_file_in_catalog_given_checksum(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        path = os.path.join(root, 'dest.catalog')
+        write_catalog(path, self.storage)
+        catalog = Catalog(path)
+        self.addCleanup(catalog.close)
+        index = CatalogChecksumIndex(catalog)
+
+        folder, file_info = index.find('1' * 32)
+        index.discard('0' * 32)
+
+        self.assertEqual((folder.name, file_info.name, file_info.id), ('B', 'b.jpg', 2))
+        self.assertIsNone(index.find('0' * 32))
+        self.assertIsNone(index.find('2' * 32))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
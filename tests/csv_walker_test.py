@@ -11,21 +11,24 @@ from flickr_rsync.root_folder_info import RootFolderInfo
 
 
 class CsvWalkerTest(unittest.TestCase):
+    module = 'flickr_rsync.csv_walker'
+    walker_class = CsvWalker
 
     def setUp(self):
-        self.print_patch = patch('flickr_rsync.csv_walker.print', create=True)
-        self.mock_print = self.print_patch.start()
-        self.logger_patch = patch('flickr_rsync.csv_walker.logger', create=True)
+        self.sink_patch = patch(self.module + '.CsvSink')
+        self.mock_sink = self.sink_patch.start().return_value
+        self.mock_print = self.mock_sink.write_row
+        self.logger_patch = patch(self.module + '.logger', create=True)
         self.mock_logger = self.logger_patch.start()
-        self.time_patch = patch(
-            'flickr_rsync.csv_walker.time.time',
-            create=True)
+        self.time_patch = patch(self.module + '.time.time', create=True)
         self.time_patch.start().return_value = 0
 
         self.config = MagicMock()
         self.config.root_files = False
         self.config.list_folders = False
         self.config.list_sort = False
+        self.config.list_sort_buffer = 100000
+        self.config.prefetch = 0
         self.storage = MagicMock()
         self.folder_one = FolderInfo(id=1, name='A Folder')
         self.folder_two = FolderInfo(id=2, name='B Folder')
@@ -37,22 +40,22 @@ class CsvWalkerTest(unittest.TestCase):
         self.file_three = FileInfo(id=3, name='C File', checksum='abc123')
 
     def tearDown(self):
-        self.print_patch.stop()
+        self.sink_patch.stop()
         self.logger_patch.stop()
         self.time_patch.stop()
 
     def test_should_print_header_only_given_no_folders(self):
-        walker = CsvWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
 
         walker.walk()
 
         self.mock_print.assert_has_calls_exactly([
-            call("Folder, Filename, Checksum")
+            call(['Folder', 'Filename', 'Checksum'])
         ])
         self.mock_logger.info.assert_called_once_with("\ndone in 0.0 sec")
 
     def test_should_print_header_only_given_empty_folders(self):
-        walker = CsvWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.root_folder, 'files': []},
             {'folder': self.folder_one, 'files': []}
@@ -61,13 +64,13 @@ class CsvWalkerTest(unittest.TestCase):
         walker.walk()
 
         self.mock_print.assert_has_calls_exactly([
-            call("Folder, Filename, Checksum")
+            call(['Folder', 'Filename', 'Checksum'])
         ])
         self.mock_logger.info.assert_called_once_with("\ndone in 0.0 sec")
 
     def test_should_print_root_files_given_root_files_enabled(self):
         self.config.root_files = True
-        walker = CsvWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.root_folder, 'files': [self.file_one, self.file_two]}
         ])
@@ -75,15 +78,15 @@ class CsvWalkerTest(unittest.TestCase):
         walker.walk()
 
         self.mock_print.assert_has_calls_exactly([
-            call("Folder, Filename, Checksum"),
-            call(", A File, None"),
-            call(", B File, None")
+            call(['Folder', 'Filename', 'Checksum']),
+            call(['', 'A File', None]),
+            call(['', 'B File', None])
         ])
         self.mock_logger.info.assert_called_once_with("\ndone in 0.0 sec")
 
     def test_should_not_print_root_files_given_root_files_disabled(self):
         self.config.root_files = False
-        walker = CsvWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.root_folder, 'files': [self.file_one, self.file_two]}
         ])
@@ -91,12 +94,12 @@ class CsvWalkerTest(unittest.TestCase):
         walker.walk()
 
         self.mock_print.assert_has_calls_exactly([
-            call("Folder, Filename, Checksum")
+            call(['Folder', 'Filename', 'Checksum'])
         ])
         self.mock_logger.info.assert_called_once_with("\ndone in 0.0 sec")
 
     def test_should_print_folder_files(self):
-        walker = CsvWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.folder_one, 'files': [self.file_one, self.file_two]}
         ])
@@ -104,14 +107,14 @@ class CsvWalkerTest(unittest.TestCase):
         walker.walk()
 
         self.mock_print.assert_has_calls_exactly([
-            call("Folder, Filename, Checksum"),
-            call("A Folder, A File, None"),
-            call("A Folder, B File, None")
+            call(['Folder', 'Filename', 'Checksum']),
+            call(['A Folder', 'A File', None]),
+            call(['A Folder', 'B File', None])
         ])
         self.mock_logger.info.assert_called_once_with("\ndone in 0.0 sec")
 
     def test_should_print_all_folders(self):
-        walker = CsvWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.folder_one, 'files': [self.file_one]},
             {'folder': self.folder_two, 'files': [self.file_two]}
@@ -120,14 +123,33 @@ class CsvWalkerTest(unittest.TestCase):
         walker.walk()
 
         self.mock_print.assert_has_calls_exactly([
-            call("Folder, Filename, Checksum"),
-            call("A Folder, A File, None"),
-            call("B Folder, B File, None")
+            call(['Folder', 'Filename', 'Checksum']),
+            call(['A Folder', 'A File', None]),
+            call(['B Folder', 'B File', None])
         ])
         self.mock_logger.info.assert_called_once_with("\ndone in 0.0 sec")
 
+    def test_should_print_folders_in_order_given_prefetch_enabled(self):
+        self.config.prefetch = 2
+        walker = self.walker_class(self.config, self.storage)
+        helpers.setup_storage(self.storage, [
+            {'folder': self.folder_one, 'files': [self.file_one]},
+            {'folder': self.folder_two, 'files': []},
+            {'folder': self.folder_three, 'files': [self.file_two]},
+            {'folder': self.folder_four, 'files': [self.file_one]}
+        ])
+
+        walker.walk()
+
+        self.assertEqual(self.mock_print.call_args_list, [
+            call(['Folder', 'Filename', 'Checksum']),
+            call(['A Folder', 'A File', None]),
+            call(['C Folder', 'B File', None]),
+            call(['D Folder', 'A File', None])
+        ])
+
     def test_should_print_checksum_given_file_has_checksum(self):
-        walker = CsvWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.folder_one, 'files': [self.file_three]}
         ])
@@ -135,14 +157,14 @@ class CsvWalkerTest(unittest.TestCase):
         walker.walk()
 
         self.mock_print.assert_has_calls_exactly([
-            call("Folder, Filename, Checksum"),
-            call("A Folder, C File, abc123")
+            call(['Folder', 'Filename', 'Checksum']),
+            call(['A Folder', 'C File', 'abc123'])
         ])
         self.mock_logger.info.assert_called_once_with("\ndone in 0.0 sec")
 
     def test_should_sort_folders_and_files_given_sort_enabled(self):
         self.config.list_sort = True
-        walker = CsvWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.folder_two, 'files': [self.file_three, self.file_two]},
             {'folder': self.folder_one, 'files': [self.file_one]}
@@ -151,16 +173,16 @@ class CsvWalkerTest(unittest.TestCase):
         walker.walk()
 
         self.mock_print.assert_has_calls_exactly([
-            call("Folder, Filename, Checksum"),
-            call("A Folder, A File, None"),
-            call("B Folder, B File, None"),
-            call("B Folder, C File, abc123")
+            call(['Folder', 'Filename', 'Checksum']),
+            call(['A Folder', 'A File', None]),
+            call(['B Folder', 'B File', None]),
+            call(['B Folder', 'C File', 'abc123'])
         ])
         self.mock_logger.info.assert_called_once_with("\ndone in 0.0 sec")
 
     def test_should_not_sort_folders_and_files_given_sort_disabled(self):
         self.config.list_sort = False
-        walker = CsvWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.folder_two, 'files': [self.file_three, self.file_two]},
             {'folder': self.folder_one, 'files': [self.file_one]}
@@ -169,16 +191,16 @@ class CsvWalkerTest(unittest.TestCase):
         walker.walk()
 
         self.mock_print.assert_has_calls_exactly([
-            call("Folder, Filename, Checksum"),
-            call("B Folder, C File, abc123"),
-            call("B Folder, B File, None"),
-            call("A Folder, A File, None")
+            call(['Folder', 'Filename', 'Checksum']),
+            call(['B Folder', 'C File', 'abc123']),
+            call(['B Folder', 'B File', None]),
+            call(['A Folder', 'A File', None])
         ])
         self.mock_logger.info.assert_called_once_with("\ndone in 0.0 sec")
 
     def test_should_print_only_folders_given_list_folders_enabled(self):
         self.config.list_folders = True
-        walker = CsvWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.folder_two, 'files': [self.file_three, self.file_two]},
             {'folder': self.folder_one, 'files': [self.file_one]}
@@ -187,9 +209,9 @@ class CsvWalkerTest(unittest.TestCase):
         walker.walk()
 
         self.mock_print.assert_has_calls_exactly([
-            call("Folder"),
-            call("B Folder"),
-            call("A Folder")
+            call(['Folder']),
+            call(['B Folder']),
+            call(['A Folder'])
         ])
         self.mock_logger.info.assert_called_once_with("\ndone in 0.0 sec")
 
@@ -197,7 +219,7 @@ class CsvWalkerTest(unittest.TestCase):
             self):
         self.config.list_sort = True
         self.config.list_folders = True
-        walker = CsvWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.folder_two, 'files': [self.file_three, self.file_two]},
             {'folder': self.folder_one, 'files': [self.file_one]}
@@ -206,9 +228,9 @@ class CsvWalkerTest(unittest.TestCase):
         walker.walk()
 
         self.mock_print.assert_has_calls_exactly([
-            call("Folder"),
-            call("A Folder"),
-            call("B Folder")
+            call(['Folder']),
+            call(['A Folder']),
+            call(['B Folder'])
         ])
         self.mock_logger.info.assert_called_once_with("\ndone in 0.0 sec")
 
@@ -0,0 +1,137 @@
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import MagicMock, patch, call
+import helpers
+from flickr_rsync.diff import Diff
+from flickr_rsync.config import Config
+from flickr_rsync.file_info import FileInfo
+from flickr_rsync.folder_info import FolderInfo
+from flickr_rsync.root_folder_info import RootFolderInfo
+
+
+class DiffTest(unittest.TestCase):
+
+    def setUp(self):
+        self.csv_patch = patch('flickr_rsync.diff.CsvSink')
+        self.mock_csv = self.csv_patch.start().return_value
+        self.jsonl_patch = patch('flickr_rsync.diff.JsonLinesSink')
+        self.mock_jsonl = self.jsonl_patch.start().return_value
+        self.logger_patch = patch('flickr_rsync.diff.logger', create=True)
+        self.mock_logger = self.logger_patch.start()
+        self.time_patch = patch('flickr_rsync.diff.time.time', create=True)
+        self.time_patch.start().return_value = 0
+
+        self.config = MagicMock()
+        self.config.list_format = Config.LIST_FORMAT_CSV
+        self.config.root_files = False
+        self.config.list_sort_buffer = 100000
+        self.config.prefetch = 0
+        self.src = MagicMock()
+        self.dest = MagicMock()
+        self.folder_one = FolderInfo(id=1, name='A Folder')
+        self.folder_two = FolderInfo(id=2, name='B Folder')
+        self.folder_one_dest = FolderInfo(id=3, name='a folder')
+
+    def tearDown(self):
+        self.csv_patch.stop()
+        self.jsonl_patch.stop()
+        self.logger_patch.stop()
+        self.time_patch.stop()
+
+    def test_should_print_header_only_given_same_files(self):
+        helpers.setup_storage(self.src, [
+            {'folder': self.folder_one, 'files': [FileInfo(name='A File.jpg', checksum='abc')]}
+        ])
+        helpers.setup_storage(self.dest, [
+            {'folder': self.folder_one_dest, 'files': [FileInfo(name='a file.JPG', checksum='abc')]}
+        ])
+        diff = Diff(self.config, self.src, self.dest)
+
+        diff.run()
+
+        self.assertEqual(self.mock_csv.write_row.call_args_list, [
+            call(['Status', 'Folder', 'Filename', 'Src Checksum', 'Dest Checksum'])
+        ])
+        self.mock_csv.close.assert_called_once_with()
+        self.mock_logger.info.assert_called_once_with(
+            "\n0 file(s) only in src, 0 only in dest, 0 changed in 0.0 sec")
+
+    def test_should_print_differences_in_name_order(self):
+        helpers.setup_storage(self.src, [
+            {'folder': self.folder_two, 'files': [
+                FileInfo(name='D File.jpg', checksum='ddd'),
+                FileInfo(name='C File.jpeg')]},
+            {'folder': self.folder_one, 'files': [
+                FileInfo(name='B File.jpg', checksum='bbb'),
+                FileInfo(name='A File.jpg', checksum='aaa')]}
+        ])
+        helpers.setup_storage(self.dest, [
+            {'folder': self.folder_one_dest, 'files': [
+                FileInfo(name='A File.jpg', checksum='aaa'),
+                FileInfo(name='B File.jpg', checksum='xxx'),
+                FileInfo(name='E File.jpg', checksum='eee')]},
+            {'folder': self.folder_two, 'files': [
+                FileInfo(name='C File.jpg', checksum='ccc')]}
+        ])
+        diff = Diff(self.config, self.src, self.dest)
+
+        diff.run()
+
+        self.assertEqual(self.mock_csv.write_row.call_args_list[1:], [
+            call(['changed', 'A Folder', 'B File.jpg', 'bbb', 'xxx']),
+            call(['dest-only', 'a folder', 'E File.jpg', None, 'eee']),
+            call(['src-only', 'B Folder', 'D File.jpg', 'ddd', None])
+        ])
+        self.mock_logger.info.assert_called_once_with(
+            "\n1 file(s) only in src, 1 only in dest, 1 changed in 0.0 sec")
+
+    def test_should_compare_sizes_given_no_checksums(self):
+        helpers.setup_storage(self.src, [
+            {'folder': self.folder_one, 'files': [FileInfo(name='A File.jpg', size=10)]}
+        ])
+        helpers.setup_storage(self.dest, [
+            {'folder': self.folder_one, 'files': [FileInfo(name='A File.jpg', size=11, checksum='aaa')]}
+        ])
+        diff = Diff(self.config, self.src, self.dest)
+
+        diff.run()
+
+        self.assertEqual(self.mock_csv.write_row.call_args_list[1:], [
+            call(['changed', 'A Folder', 'A File.jpg', None, 'aaa'])
+        ])
+
+    def test_should_include_root_files_given_root_files(self):
+        self.config.root_files = True
+        helpers.setup_storage(self.src, [
+            {'folder': RootFolderInfo(), 'files': [FileInfo(name='A File.jpg')]}
+        ])
+        helpers.setup_storage(self.dest, [])
+        diff = Diff(self.config, self.src, self.dest)
+
+        diff.run()
+
+        self.assertEqual(self.mock_csv.write_row.call_args_list[1:], [
+            call(['src-only', '', 'A File.jpg', None, None])
+        ])
+
+    def test_should_write_json_lines_given_jsonl_format(self):
+        self.config.list_format = Config.LIST_FORMAT_JSONL
+        helpers.setup_storage(self.src, [])
+        helpers.setup_storage(self.dest, [
+            {'folder': self.folder_one, 'files': [FileInfo(name='A File.jpg', checksum='aaa')]}
+        ])
+        diff = Diff(self.config, self.src, self.dest)
+
+        diff.run()
+
+        self.assertEqual(self.mock_jsonl.write_record.call_args_list, [
+            call([('status', 'dest-only'), ('folder', 'A Folder'), ('name', 'A File.jpg'),
+                  ('src_checksum', None), ('dest_checksum', 'aaa')])
+        ])
+        self.mock_csv.write_row.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,51 @@
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import patch
+import helpers
+from flickr_rsync.external_sort import external_sort
+from flickr_rsync.file_info import FileInfo
+
+
+class ExternalSortTest(unittest.TestCase):
+
+    def test_should_return_empty_iterator_given_empty_iterator(self):
+        self.assertEqual(list(external_sort(iter(()), key=lambda x: x)), [])
+
+    def test_should_sort_in_memory_given_items_fit_buffer(self):
+        with patch('flickr_rsync.external_sort._spill') as mock_spill:
+            result = list(external_sort([3, 1, 2], key=lambda x: x,
+                                        buffer_size=10))
+
+        self.assertEqual(result, [1, 2, 3])
+        mock_spill.assert_not_called()
+
+    def test_should_sort_all_items_given_items_exceed_buffer(self):
+        items = [(i * 7919) % 1000 for i in range(1000)]
+
+        result = list(external_sort(iter(items), key=lambda x: x,
+                                    buffer_size=64))
+
+        self.assertEqual(result, sorted(items))
+
+    def test_should_keep_original_order_of_equal_keys(self):
+        items = [FileInfo(id=i, name='B' if i % 2 else 'A') for i in range(50)]
+
+        result = list(external_sort(items, key=lambda x: x.name,
+                                    buffer_size=8))
+
+        self.assertEqual([(f.name, f.id) for f in result],
+                         sorted(((f.name, f.id) for f in items)))
+
+    def test_should_sort_by_key(self):
+        items = [FileInfo(id=i, name=name) for i, name in enumerate('dbca')]
+
+        result = list(external_sort(items, key=lambda x: x.name,
+                                    buffer_size=2))
+
+        self.assertEqual([f.name for f in result], ['a', 'b', 'c', 'd'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,100 @@
+import os
+import sys
+import errno
+import shutil
+import tempfile
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import patch
+import helpers
+from flickr_rsync import fast_copy as fast_copy_module
+from flickr_rsync.fast_copy import fast_copy
+
+
+class FastCopyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.src = os.path.join(self.temp_dir, 'src.jpg')
+        self.dest = os.path.join(self.temp_dir, 'dest.jpg')
+        self.content = os.urandom(3 * 1024 * 1024 + 17)
+        with open(self.src, 'wb') as f:
+            f.write(self.content)
+        os.utime(self.src, (1500000000, 1500000000))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _read_dest(self):
+        with open(self.dest, 'rb') as f:
+            return f.read()
+
+    def test_should_copy_file_contents(self):
+        fast_copy(self.src, self.dest)
+
+        self.assertEqual(self._read_dest(), self.content)
+
+    def test_should_preserve_modified_time(self):
+        fast_copy(self.src, self.dest)
+
+        self.assertEqual(os.stat(self.dest).st_mtime, 1500000000)
+
+    def test_should_overwrite_existing_file(self):
+        with open(self.dest, 'wb') as f:
+            f.write('x' * (5 * 1024 * 1024))
+
+        fast_copy(self.src, self.dest)
+
+        self.assertEqual(self._read_dest(), self.content)
+
+    def test_should_copy_empty_file(self):
+        open(self.src, 'wb').close()
+
+        fast_copy(self.src, self.dest)
+
+        self.assertEqual(self._read_dest(), '')
+
+    @patch('flickr_rsync.fast_copy._reflink', return_value=False)
+    @patch('flickr_rsync.fast_copy._copy_file_range', return_value=False)
+    @patch('flickr_rsync.fast_copy._sendfile', return_value=False)
+    def test_should_fall_back_to_buffered_copy_given_kernel_copy_unsupported(
+            self, *mocks):
+        fast_copy(self.src, self.dest)
+
+        self.assertEqual(self._read_dest(), self.content)
+
+    @patch('flickr_rsync.fast_copy._reflink', return_value=False)
+    @patch('flickr_rsync.fast_copy._copy_file_range', return_value=False)
+    @patch('flickr_rsync.fast_copy._libc')
+    @patch('flickr_rsync.fast_copy.ctypes.get_errno', return_value=errno.ENOSYS)
+    def test_should_fall_back_given_sendfile_raises_unsupported(
+            self, mock_get_errno, mock_libc, *mocks):
+        mock_libc.sendfile64.return_value = -1
+
+        fast_copy(self.src, self.dest)
+
+        self.assertEqual(self._read_dest(), self.content)
+        self.assertTrue(mock_libc.sendfile64.called)
+
+    @unittest.skipUnless(getattr(fast_copy_module._libc, 'copy_file_range', None), 'requires copy_file_range')
+    @patch('flickr_rsync.fast_copy._reflink', return_value=False)
+    @patch('flickr_rsync.fast_copy._sendfile')
+    def test_should_copy_with_copy_file_range(self, mock_sendfile, *mocks):
+        fast_copy(self.src, self.dest)
+
+        self.assertEqual(self._read_dest(), self.content)
+        mock_sendfile.assert_not_called()
+
+    @unittest.skipUnless(getattr(fast_copy_module._libc, 'sendfile64', None), 'requires sendfile')
+    @patch('flickr_rsync.fast_copy._reflink', return_value=False)
+    @patch('flickr_rsync.fast_copy._copy_file_range', return_value=False)
+    @patch('flickr_rsync.fast_copy.shutil.copyfileobj')
+    def test_should_copy_with_sendfile(self, mock_copyfileobj, *mocks):
+        fast_copy(self.src, self.dest)
+
+        self.assertEqual(self._read_dest(), self.content)
+        mock_copyfileobj.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,69 @@
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import MagicMock
+import helpers
+from flickr_rsync.file_filter import FileFilter
+from flickr_rsync.config import DEFAULTS
+
+
+class FileFilterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.config = MagicMock()
+        self.config.include = ''
+        self.config.exclude = ''
+        self.config.include_dir = ''
+        self.config.exclude_dir = ''
+
+    def test_should_include_everything_given_no_patterns(self):
+        file_filter = FileFilter(self.config)
+
+        self.assertTrue(file_filter.include_file('IMG_0001.txt'))
+        self.assertTrue(file_filter.include_folder('Holiday'))
+
+    def test_should_match_default_include_extensions_ignoring_case(self):
+        self.config.include = DEFAULTS['include']
+        file_filter = FileFilter(self.config)
+
+        self.assertTrue(file_filter.include_file('IMG_0001.JPG'))
+        self.assertTrue(file_filter.include_file('clip.m2ts'))
+        self.assertFalse(file_filter.include_file('notes.txt'))
+        self.assertFalse(file_filter.include_file('IMG_0001.jpg.txt'))
+        self.assertFalse(file_filter.include_file('jpg'))
+
+    def test_should_match_single_extension_pattern(self):
+        self.config.include = r'\.mov$'
+        file_filter = FileFilter(self.config)
+
+        self.assertTrue(file_filter.include_file('clip.MOV'))
+        self.assertFalse(file_filter.include_file('clip.mp4'))
+
+    def test_should_match_regex_given_not_an_extension_pattern(self):
+        self.config.include = '^IMG_'
+        file_filter = FileFilter(self.config)
+
+        self.assertTrue(file_filter.include_file('img_0001.jpg'))
+        self.assertFalse(file_filter.include_file('DSC_0001.jpg'))
+
+    def test_should_prefer_exclude_over_include(self):
+        self.config.include = r'\.(jpg|png)$'
+        self.config.exclude = r'\.png$'
+        file_filter = FileFilter(self.config)
+
+        self.assertTrue(file_filter.include_file('a.jpg'))
+        self.assertFalse(file_filter.include_file('a.png'))
+
+    def test_should_filter_folders_with_dir_patterns(self):
+        self.config.include_dir = '^2017'
+        self.config.exclude_dir = 'private'
+        file_filter = FileFilter(self.config)
+
+        self.assertTrue(file_filter.include_folder('2017 Easter'))
+        self.assertFalse(file_filter.include_folder('2017 Private'))
+        self.assertFalse(file_filter.include_folder('2016 Easter'))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
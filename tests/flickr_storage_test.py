@@ -0,0 +1,497 @@
+import os
+import sys
+import shutil
+import unittest
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import MagicMock, patch, call
+import helpers
+from flickr_api.flickrerrors import FlickrAPIError
+from flickr_rsync.flickr_storage import FlickrStorage
+from flickr_rsync.resiliently import Resiliently
+from flickr_rsync.file_info import FileInfo
+from flickr_rsync.folder_info import FolderInfo
+from flickr_rsync.root_folder_info import RootFolderInfo
+
+
+class FlickrStorageTestBase(unittest.TestCase):
+
+    def setUp(self):
+        self.flickr_api_patch = patch('flickr_rsync.flickr_storage.flickr_api')
+        self.mock_flickr_api = self.flickr_api_patch.start()
+        self.mock_flickr_api.objects.Walker.side_effect = \
+            lambda method, **kwargs: method(**kwargs)
+        self.call_api_patch = patch('flickr_rsync.flickr_storage.call_api')
+        self.mock_call_api = self.call_api_patch.start()
+
+        self.config = MagicMock()
+        self.config.media = 'all'
+        self.config.min_date = ''
+        self.config.max_date = ''
+        self.config.filter_tags = ''
+        self.resiliently = MagicMock()
+        self.resiliently.call.side_effect = \
+            lambda func, *args, **kwargs: func(*args, **kwargs)
+        self.resiliently.call_as.side_effect = \
+            lambda api_class, func, *args, **kwargs: func(*args, **kwargs)
+        self.file_filter = MagicMock()
+        self.file_filter.include_file.return_value = True
+        self.file_filter.include_folder.return_value = True
+
+        self.photo_one = self._create_photo('1', u'IMG_0001')
+        self.photo_two = self._create_photo('2', u'IMG_0002')
+        self.photoset = self._create_photoset('10', u'A Folder', photos=2, videos=0)
+
+        self.storage = FlickrStorage(
+            self.config, self.resiliently, self.file_filter)
+        self.storage._is_authenticated = True
+        self.storage._user = MagicMock()
+        self.storage._user.getPhotosets.return_value = [self.photoset]
+
+    def tearDown(self):
+        self.flickr_api_patch.stop()
+        self.call_api_patch.stop()
+
+    def _create_photo(self, id, title):
+        photo = MagicMock()
+        photo.id = id
+        photo.title = title
+        photo.tags = ''
+        photo.originalformat = 'jpg'
+        photo.media = 'photo'
+        return photo
+
+    def _create_photoset(self, id, title, **counts):
+        photoset = MagicMock()
+        photoset.id = id
+        photoset.title = title
+        photoset.get.side_effect = counts.get
+        photoset.getPhotos.return_value = [self.photo_one, self.photo_two]
+        return photoset
+
+    def _list_folder_files(self):
+        folder = next(self.storage.list_folders())
+        return [f.name for f in self.storage.list_files(folder)]
+
+
+class FlickrStorageFilterTest(FlickrStorageTestBase):
+
+    def test_should_list_photoset_without_filter_args_given_no_filters(self):
+        names = self._list_folder_files()
+
+        self.assertEqual(names, ['IMG_0001.jpg', 'IMG_0002.jpg'])
+        self.photoset.getPhotos.assert_called_once_with(
+            extras='original_format,tags,media')
+        self.mock_call_api.assert_not_called()
+
+    def test_should_call_resiliently_for_each_page_given_photoset_listed(self):
+        self._list_folder_files()
+        walk_page = self.mock_flickr_api.objects.Walker.call_args[0][0]
+        self.resiliently.call.reset_mock()
+
+        walk_page(extras='original_format,tags,media', page=2)
+
+        self.resiliently.call.assert_called_once_with(
+            self.photoset.getPhotos, extras='original_format,tags,media', page=2)
+
+    def test_should_pass_media_filter_to_flickr_given_media_set(self):
+        self.config.media = 'photos'
+
+        self._list_folder_files()
+
+        self.photoset.getPhotos.assert_called_once_with(
+            extras='original_format,tags,media', media='photos')
+
+    def test_should_skip_listing_photoset_given_it_has_no_matching_media(self):
+        self.config.media = 'videos'
+
+        names = self._list_folder_files()
+
+        self.assertEqual(names, [])
+        self.photoset.getPhotos.assert_not_called()
+
+    def test_should_pass_dates_to_flickr_when_listing_root_files(self):
+        self.config.min_date = '2017-01-01'
+        self.config.max_date = '2017-12-31'
+        self.storage._user.getNotInSetPhotos.return_value = [self.photo_one]
+
+        names = [f.name for f in self.storage.list_files(RootFolderInfo())]
+
+        self.assertEqual(names, ['IMG_0001.jpg'])
+        self.storage._user.getNotInSetPhotos.assert_called_once_with(
+            extras='original_format,tags,media',
+            min_taken_date='2017-01-01',
+            max_taken_date='2017-12-31 23:59:59')
+        self.mock_call_api.assert_not_called()
+
+    def test_should_filter_photoset_by_search_results_given_date_filter(self):
+        self.config.min_date = '2017-01-01'
+        self.mock_call_api.return_value = {
+            'photos': {'pages': 1, 'photo': [{'id': '2'}]}}
+
+        names = self._list_folder_files()
+
+        self.assertEqual(names, ['IMG_0002.jpg'])
+        self.assertEqual(self.mock_call_api.call_count, 1)
+        self.assertEqual(
+            self.mock_call_api.call_args[1]['method'], 'flickr.photos.search')
+        self.assertEqual(
+            self.mock_call_api.call_args[1]['min_taken_date'], '2017-01-01')
+
+    def test_should_not_be_filtered_given_no_filters(self):
+        self.assertFalse(self.storage.is_filtered())
+
+    def test_should_be_filtered_given_date_filter(self):
+        self.config.max_date = '2017-12-31'
+
+        self.assertTrue(self.storage.is_filtered())
+
+    def test_should_look_up_photosets_of_search_results_given_fewer_than_photoset_pages(self):
+        self.config.filter_tags = 'holiday'
+        self.photoset = self._create_photoset('10', u'A Folder', photos=1200, videos=0)
+        self.storage._user.getPhotosets.return_value = [self.photoset]
+        contexts = {'1': {'set': [{'id': '10'}]}, '2': {}}
+        self.mock_call_api.side_effect = lambda method, **kwargs: {
+            'flickr.photos.search': lambda: {'photos': {'pages': 1, 'photo': [
+                {'id': '1', 'title': u'IMG_0001', 'tags': 'holiday', 'originalformat': 'jpg', 'media': 'photo'},
+                {'id': '2', 'title': u'IMG_0002', 'tags': 'holiday', 'originalformat': 'mov', 'media': 'video'}]}},
+            'flickr.photos.getAllContexts': lambda: contexts[kwargs['photo_id']]
+        }[method]()
+
+        names = self._list_folder_files()
+        root_names = [f.name for f in self.storage.list_files(RootFolderInfo())]
+
+        self.assertEqual(names, ['IMG_0001.jpg'])
+        self.assertEqual(root_names, ['IMG_0002.mov'])
+        self.photoset.getPhotos.assert_not_called()
+        self.storage._user.getNotInSetPhotos.assert_not_called()
+        self.assertEqual(self.mock_call_api.call_count, 3)
+
+    def test_should_page_search_once_given_multiple_photosets(self):
+        self.config.filter_tags = 'holiday, camera:make=canon'
+        other_photoset = self._create_photoset('11', u'B Folder')
+        self.storage._user.getPhotosets.return_value = [
+            self.photoset, other_photoset]
+        self.mock_call_api.side_effect = [
+            {'photos': {'pages': 2, 'photo': [{'id': '1'}]}},
+            {'photos': {'pages': 2, 'photo': [{'id': '2'}]}}
+        ]
+
+        for folder in self.storage.list_folders():
+            list(self.storage.list_files(folder))
+
+        self.assertEqual(self.mock_call_api.call_count, 2)
+        self.assertEqual(
+            self.mock_call_api.call_args[1]['tags'], 'holiday')
+        self.assertEqual(
+            self.mock_call_api.call_args[1]['machine_tags'], 'camera:make=canon')
+
+
+class FlickrStorageDownloadTest(FlickrStorageTestBase):
+
+    def test_should_download_original_video_given_listed_video(self):
+        self.photo_two.media = 'video'
+        folder = next(self.storage.list_folders())
+        files = list(self.storage.list_files(folder))
+
+        with patch('flickr_rsync.flickr_storage.mkdirp'):
+            self.storage.download(files[1], '/tmp/IMG_0002.mov')
+
+        self.mock_flickr_api.Photo.assert_called_once_with(id='2', media='video')
+        self.mock_flickr_api.Photo.return_value.save.assert_called_once_with(
+            '/tmp/IMG_0002.mov', size_label='Video Original')
+
+    def test_should_download_through_http_pool_given_pool(self):
+        http_pool = MagicMock()
+        storage = FlickrStorage(self.config, self.resiliently, self.file_filter, http_pool=http_pool)
+        storage._is_authenticated = True
+        storage._is_video['1'] = False
+        self.mock_flickr_api.Photo.return_value.getPhotoFile.return_value = 'https://farm1.staticflickr.com/1_o.jpg'
+
+        with patch('flickr_rsync.flickr_storage.mkdirp'):
+            storage.download(FileInfo(id='1', name='IMG_0001.jpg'), '/tmp/IMG_0001.jpg')
+
+        http_pool.install.assert_called_once_with()
+        self.mock_flickr_api.Photo.return_value.getPhotoFile.assert_called_once_with(size_label='Original')
+        http_pool.download.assert_called_once_with('https://farm1.staticflickr.com/1_o.jpg', '/tmp/IMG_0001.jpg')
+        self.mock_flickr_api.Photo.return_value.save.assert_not_called()
+
+    def test_should_include_http_stats_given_verbose(self):
+        http_pool = MagicMock()
+        http_pool.stats.return_value = ['2 HTTP request(s)']
+        self.resiliently.stats.return_value = ['2 list API call(s)']
+        self.config.verbose = True
+        storage = FlickrStorage(self.config, self.resiliently, self.file_filter, http_pool=http_pool)
+
+        self.assertEqual(storage.stats(), ['2 list API call(s)', '2 HTTP request(s)'])
+
+    def test_should_not_keep_photos_given_file_filtered_out(self):
+        self.file_filter.include_file.return_value = False
+        folder = next(self.storage.list_folders())
+
+        names = [f.name for f in self.storage.list_files(folder)]
+
+        self.assertEqual(names, [])
+        self.assertEqual(self.storage._is_video, {})
+
+    def test_should_look_up_media_given_download_of_unlisted_video(self):
+        self.mock_flickr_api.Photo.return_value.getInfo.return_value = {'media': 'video'}
+
+        with patch('flickr_rsync.flickr_storage.mkdirp'):
+            self.storage.download(FileInfo(id='2', name='IMG_0002.mov'), '/tmp/IMG_0002.mov')
+
+        self.mock_flickr_api.Photo.assert_called_with(id='2', media='video')
+        self.mock_flickr_api.Photo.return_value.save.assert_called_once_with(
+            '/tmp/IMG_0002.mov', size_label='Video Original')
+
+
+class FlickrStorageReplaceTest(FlickrStorageTestBase):
+
+    def setUp(self):
+        super(FlickrStorageReplaceTest, self).setUp()
+        self.mock_photo = self.mock_flickr_api.Photo.return_value
+        self.checksum_tag = MagicMock(text='checksum:md5=abc')
+        self.other_tag = MagicMock(text='flickrrsync:extn=jpg')
+        self.mock_photo.getTags.return_value = [self.other_tag, self.checksum_tag]
+
+    def test_should_replace_photo_and_checksum_tag_given_changed_checksum(self):
+        self.photo_one.tags = 'checksum:md5=abc'
+        file_info = next(self.storage.list_files(next(self.storage.list_folders())))
+
+        self.storage.replace('/tmp/IMG_0001.jpg', file_info, 'def')
+
+        self.mock_flickr_api.replace.assert_called_once_with(
+            photo_file='/tmp/IMG_0001.jpg', photo_id='1', async=0)
+        self.checksum_tag.remove.assert_called_once_with()
+        self.other_tag.remove.assert_not_called()
+        self.mock_photo.addTags.assert_called_once_with('checksum:md5=def')
+        self.mock_flickr_api.upload.assert_not_called()
+
+    def test_should_not_change_tags_given_same_checksum(self):
+        self.photo_one.tags = 'checksum:md5=abc'
+        file_info = next(self.storage.list_files(next(self.storage.list_folders())))
+
+        self.storage.replace('/tmp/IMG_0001.jpg', file_info, 'abc')
+
+        self.mock_flickr_api.replace.assert_called_once_with(
+            photo_file='/tmp/IMG_0001.jpg', photo_id='1', async=0)
+        self.mock_photo.getTags.assert_not_called()
+        self.mock_photo.addTags.assert_not_called()
+
+
+class FlickrStorageUploadTest(FlickrStorageTestBase):
+
+    def setUp(self):
+        super(FlickrStorageUploadTest, self).setUp()
+        self.mock_photo = self.mock_flickr_api.upload.return_value
+
+    def test_should_add_to_existing_photoset_given_folders_from_catalog(self):
+        # Folders weren't listed, as happens when dest is checked with --dest-catalog
+        self.storage.upload('/tmp/IMG_0001.jpg', 'A Folder', 'IMG_0001.jpg', None)
+
+        self.photoset.addPhoto.assert_called_once_with(photo=self.mock_photo)
+        self.mock_flickr_api.Photoset.create.assert_not_called()
+
+    def test_should_list_photosets_once_given_several_uploads(self):
+        self.storage.upload('/tmp/IMG_0001.jpg', 'A Folder', 'IMG_0001.jpg', None)
+        self.storage.upload('/tmp/IMG_0002.jpg', 'A Folder', 'IMG_0002.jpg', None)
+
+        self.storage._user.getPhotosets.assert_called_once_with()
+        self.assertEqual(self.photoset.addPhoto.call_count, 2)
+
+    def test_should_create_photoset_given_new_folder(self):
+        self.storage.upload('/tmp/IMG_0001.jpg', 'New Folder', 'IMG_0001.jpg', None)
+
+        self.mock_flickr_api.Photoset.create.assert_called_once_with(
+            title='New Folder', primary_photo=self.mock_photo)
+
+
+class FlickrStorageJournalTest(FlickrStorageTestBase):
+
+    def setUp(self):
+        super(FlickrStorageJournalTest, self).setUp()
+        self.journal = MagicMock()
+        self.storage._journal = self.journal
+        self.mock_photo = self.mock_flickr_api.upload.return_value
+        self.mock_photo.id = '1'
+
+    def test_should_journal_upload_then_photoset_add(self):
+        self.storage.upload('/tmp/IMG_0001.jpg', 'A Folder', 'IMG_0001.jpg', None)
+
+        self.assertEqual(self.journal.method_calls, [
+            call.uploaded('A Folder', 'IMG_0001.jpg', '1'),
+            call.added('1')
+        ])
+        self.photoset.addPhoto.assert_called_once_with(photo=self.mock_photo)
+
+    def test_should_add_pending_uploads_to_photosets_given_resume(self):
+        self.journal.pending_uploads.return_value = [('2', 'A Folder')]
+
+        self.storage.resume()
+
+        self.mock_flickr_api.Photo.assert_called_once_with(id='2')
+        self.photoset.addPhoto.assert_called_once_with(photo=self.mock_flickr_api.Photo.return_value)
+        self.journal.added.assert_called_once_with('2')
+
+    def test_should_journal_added_given_resume_and_photo_already_in_set(self):
+        self.journal.pending_uploads.return_value = [('2', 'A Folder'), ('3', 'A Folder')]
+        self.photoset.addPhoto.side_effect = [FlickrAPIError(3, 'Photo already in set'), None]
+
+        self.storage.resume()
+
+        self.assertEqual(self.journal.added.call_args_list, [call('2'), call('3')])
+
+    def test_should_raise_given_resume_and_add_fails(self):
+        self.journal.pending_uploads.return_value = [('2', 'A Folder')]
+        self.photoset.addPhoto.side_effect = FlickrAPIError(2, 'Photoset not found')
+
+        self.assertRaises(FlickrAPIError, self.storage.resume)
+        self.journal.added.assert_not_called()
+
+
+class FlickrStorageMoveTest(FlickrStorageTestBase):
+
+    def setUp(self):
+        super(FlickrStorageMoveTest, self).setUp()
+        self.mock_photo = self.mock_flickr_api.Photo.return_value
+        self.other_photoset = self._create_photoset('11', u'B Folder')
+        self.storage._user.getPhotosets.return_value = [self.photoset, self.other_photoset]
+        self.folder = FolderInfo(id='10', name='A Folder')
+        self.file_info = FileInfo(id='1', name='IMG_0001.jpg')
+
+    def test_should_edit_photoset_title_given_rename_folder(self):
+        folder = self.storage.rename_folder(self.folder, 'C Folder')
+
+        self.photoset.editMeta.assert_called_once_with(title='C Folder')
+        self.assertEqual(folder.name, 'C Folder')
+        self.mock_flickr_api.Photoset.assert_called_once_with(id='10', title=u'C Folder')
+
+    def test_should_add_to_new_photoset_and_remove_from_old_given_move_file(self):
+        self.storage.move_file(self.file_info, self.folder, 'B Folder', 'img_0001.JPG')
+
+        self.other_photoset.addPhoto.assert_called_once_with(photo=self.mock_photo)
+        self.photoset.removePhoto.assert_called_once_with(photo=self.mock_photo)
+        self.mock_photo.setMeta.assert_not_called()
+        self.mock_flickr_api.upload.assert_not_called()
+
+    def test_should_create_photoset_and_set_title_given_move_to_new_folder_and_name(self):
+        self.storage.move_file(self.file_info, self.folder, 'New Folder', 'IMG_0002.jpg')
+
+        self.mock_photo.setMeta.assert_called_once_with(title='IMG_0002')
+        self.mock_flickr_api.Photoset.create.assert_called_once_with(
+            title='New Folder', primary_photo=self.mock_photo)
+        self.photoset.removePhoto.assert_called_once_with(photo=self.mock_photo)
+
+    def test_should_only_add_to_photoset_given_photo_not_in_a_photoset(self):
+        self.storage.move_file(self.file_info, RootFolderInfo(), 'A Folder', 'IMG_0001.jpg')
+
+        self.photoset.addPhoto.assert_called_once_with(photo=self.mock_photo)
+        self.photoset.removePhoto.assert_not_called()
+
+
+class FlickrStorageAuthenticateTest(FlickrStorageTestBase):
+
+    def setUp(self):
+        super(FlickrStorageAuthenticateTest, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.token_path = os.path.join(self.root, '.flickr-rsync.token')
+        self.user_path = os.path.join(self.root, '.flickr-rsync.user')
+        self.config.locate_datafile.return_value = self.token_path
+        self.mock_flickr_api.auth.AuthHandler.load.return_value.access_token.key = 'token'
+        self.login_user = MagicMock()
+        self.login_user.id = '123@N01'
+        self.login_user.username = u'user'
+        self.login_user.getPhotosets.return_value = [self.photoset]
+        self.mock_flickr_api.test.login.return_value = self.login_user
+        self.mock_flickr_api.Person.return_value.getPhotosets.return_value = [self.photoset]
+        self.storage = FlickrStorage(self.config, self.resiliently, self.file_filter)
+
+    def tearDown(self):
+        super(FlickrStorageAuthenticateTest, self).tearDown()
+        shutil.rmtree(self.root)
+
+    def test_should_login_and_save_user_given_no_saved_user(self):
+        list(self.storage.list_folders())
+
+        self.mock_flickr_api.test.login.assert_called_once_with()
+        self.assertTrue(os.path.isfile(self.user_path))
+
+    def test_should_not_login_given_saved_user(self):
+        list(FlickrStorage(self.config, self.resiliently, self.file_filter).list_folders())
+        self.mock_flickr_api.test.login.reset_mock()
+
+        folders = list(self.storage.list_folders())
+
+        self.mock_flickr_api.test.login.assert_not_called()
+        self.mock_flickr_api.Person.assert_called_once_with(id='123@N01', username=u'user')
+        self.assertEqual([folder.name for folder in folders], ['A Folder'])
+
+    def test_should_login_given_user_saved_with_another_token(self):
+        list(FlickrStorage(self.config, self.resiliently, self.file_filter).list_folders())
+        self.mock_flickr_api.test.login.reset_mock()
+        self.mock_flickr_api.auth.AuthHandler.load.return_value.access_token.key = 'new token'
+
+        list(self.storage.list_folders())
+
+        self.mock_flickr_api.test.login.assert_called_once_with()
+        self.mock_flickr_api.Person.assert_not_called()
+
+    def _create_resilient_storage(self):
+        config = MagicMock()
+        config.throttling = 0
+        config.retry = 0
+        config.verbose = False
+        # backoff logs the name of the function called
+        self.mock_flickr_api.Person.return_value.getPhotosets.__name__ = 'getPhotosets'
+        self.login_user.getPhotosets.__name__ = 'getPhotosets'
+        self.mock_flickr_api.upload.__name__ = 'upload'
+        return FlickrStorage(self.config, Resiliently(config), self.file_filter)
+
+    def test_should_install_token_rejected_handler(self):
+        self.assertEqual(self.resiliently.on_token_rejected, self.storage._token_rejected)
+
+    def test_should_login_and_retry_given_saved_user_and_token_rejected(self):
+        list(FlickrStorage(self.config, self.resiliently, self.file_filter).list_folders())
+        self.mock_flickr_api.test.login.reset_mock()
+        self.mock_flickr_api.Person.return_value.getPhotosets.side_effect = [
+            FlickrAPIError(98, 'Invalid auth token'), [self.photoset]]
+
+        folders = list(self._create_resilient_storage().list_folders())
+
+        self.mock_flickr_api.test.login.assert_called_once_with()
+        self.assertEqual([folder.name for folder in folders], ['A Folder'])
+
+    def test_should_login_and_retry_given_saved_user_and_first_call_is_upload(self):
+        list(FlickrStorage(self.config, self.resiliently, self.file_filter).list_folders())
+        self.mock_flickr_api.test.login.reset_mock()
+        self.mock_flickr_api.upload.side_effect = [FlickrAPIError(98, 'Invalid auth token'), MagicMock()]
+
+        self._create_resilient_storage().upload('/tmp/IMG_0001.jpg', '', 'IMG_0001.jpg', None)
+
+        self.mock_flickr_api.test.login.assert_called_once_with()
+        self.assertEqual(self.mock_flickr_api.upload.call_count, 2)
+
+    def test_should_login_once_given_saved_user_and_several_calls_rejected(self):
+        list(FlickrStorage(self.config, self.resiliently, self.file_filter).list_folders())
+        self.mock_flickr_api.test.login.reset_mock()
+        list(self.storage.list_folders())
+
+        self.assertTrue(self.storage._token_rejected())
+        self.assertTrue(self.storage._token_rejected())
+        self.mock_flickr_api.test.login.assert_called_once_with()
+
+    def test_should_not_retry_given_logged_in_and_token_rejected(self):
+        list(self.storage.list_folders())
+
+        self.assertFalse(self.storage._token_rejected())
+        self.mock_flickr_api.test.login.assert_called_once_with()
+
+    def test_should_raise_given_logged_in_and_token_rejected(self):
+        self.login_user.getPhotosets.side_effect = FlickrAPIError(98, 'Invalid auth token')
+
+        self.assertRaises(FlickrAPIError, list, self._create_resilient_storage().list_folders())
+        self.mock_flickr_api.test.login.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
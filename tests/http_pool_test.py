@@ -0,0 +1,96 @@
+import os
+import sys
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+import BaseHTTPServer
+import SocketServer
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import MagicMock, patch
+from flickr_rsync.http_pool import HttpPool, pool_size
+
+BODY = b'x' * 100000
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        status = 404 if self.path == '/missing' else 200
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    # Kept alive connections don't stop the server shutting down
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # The pool closing its kept alive connections resets them, don't print a traceback for each
+        if not isinstance(sys.exc_info()[1], socket.error):
+            BaseHTTPServer.HTTPServer.handle_error(self, request, client_address)
+
+
+class HttpPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{}/'.format(self.server.server_port)
+        self.root = tempfile.mkdtemp()
+        self.pool = HttpPool(2)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.root)
+
+    def test_should_reuse_connection_given_consecutive_requests(self):
+        for _ in range(3):
+            self.assertEqual(self.pool.post(self.url, {'method': 'flickr.test.echo'}).content, BODY)
+
+        self.assertEqual((self.pool.requests, self.pool.connections), (3, 1))
+        self.assertEqual(len(self.pool.stats()), 1)
+
+    def test_should_stream_download_to_file(self):
+        path = os.path.join(self.root, 'photo.jpg')
+
+        self.pool.download(self.url, path)
+
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), BODY)
+
+    def test_should_raise_given_download_fails(self):
+        import requests
+        self.assertRaises(requests.HTTPError, self.pool.download, self.url + 'missing',
+                          os.path.join(self.root, 'photo.jpg'))
+
+    def test_should_send_flickr_api_requests_through_pool_given_install(self):
+        with patch('flickr_rsync.http_pool.flickr_api') as mock_flickr_api:
+            self.pool.install()
+
+            self.assertIs(mock_flickr_api.method_call.requests, self.pool)
+            self.assertIs(mock_flickr_api.upload.requests, self.pool)
+
+    def test_should_size_pool_by_workers(self):
+        config = MagicMock(transfers=4, large_file_size=100, large_transfers=2, prefetch=0)
+
+        self.assertEqual(pool_size(config), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import patch
+from flickr_rsync.journal import Journal
+
+
+class JournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'sync.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _interrupted_journal(self):
+        journal = Journal(self.path, '/photos', 'flickr')
+        journal.planned('A', 'a.jpg')
+        journal.copied('A', 'a.jpg')
+        journal.folder_done('A')
+        journal.planned('B', 'b.jpg')
+        journal.uploaded('B', 'b.jpg', '1')
+        journal.planned('B', 'c.jpg')
+        journal.uploaded('B', 'c.jpg', '2')
+        journal.added('2')
+        journal.close()
+
+    def test_should_start_new_journal_given_no_file(self):
+        journal = Journal(self.path, '/photos', 'flickr')
+
+        self.assertFalse(journal.resumed)
+        self.assertFalse(journal.is_folder_done('A'))
+        self.assertEqual(journal.pending_uploads(), [])
+        journal.close()
+
+    def test_should_resume_progress_given_interrupted_journal(self):
+        self._interrupted_journal()
+
+        journal = Journal(self.path, '/photos', 'flickr')
+
+        self.assertTrue(journal.resumed)
+        self.assertTrue(journal.is_folder_done('a'))
+        self.assertFalse(journal.is_folder_done('B'))
+        self.assertTrue(journal.is_copied('A', 'A.JPEG'))
+        self.assertFalse(journal.is_copied('B', 'b.jpg'))
+        self.assertEqual(journal.pending_uploads(), [('1', 'B')])
+        journal.close()
+
+    def test_should_ignore_partial_last_entry_given_killed_while_writing(self):
+        self._interrupted_journal()
+        with open(self.path, 'ab') as f:
+            f.write(b'{"op": "folder-do')
+
+        journal = Journal(self.path, '/photos', 'flickr')
+        journal.folder_done('B')
+        journal.close()
+        journal = Journal(self.path, '/photos', 'flickr')
+
+        self.assertTrue(journal.is_folder_done('B'))
+        journal.close()
+
+    def test_should_start_again_given_journal_of_different_sync(self):
+        self._interrupted_journal()
+
+        with patch('flickr_rsync.journal.logger') as mock_logger:
+            journal = Journal(self.path, '/other', 'flickr')
+
+        mock_logger.warning.assert_called_once_with(
+            "ignoring journal {} of a different sync".format(self.path))
+        self.assertFalse(journal.resumed)
+        self.assertFalse(journal.is_folder_done('A'))
+        journal.close()
+
+    def test_should_remove_journal_given_complete(self):
+        journal = Journal(self.path, '/photos', 'flickr')
+
+        journal.complete()
+
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
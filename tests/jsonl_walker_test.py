@@ -0,0 +1,68 @@
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import MagicMock, patch, call
+import helpers
+from flickr_rsync.jsonl_walker import JsonLinesWalker
+from flickr_rsync.file_info import FileInfo
+from flickr_rsync.folder_info import FolderInfo
+from flickr_rsync.root_folder_info import RootFolderInfo
+
+
+class JsonLinesWalkerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sink_patch = patch('flickr_rsync.jsonl_walker.JsonLinesSink')
+        self.mock_sink = self.sink_patch.start().return_value
+        self.logger_patch = patch('flickr_rsync.csv_walker.logger', create=True)
+        self.logger_patch.start()
+
+        self.config = MagicMock()
+        self.config.root_files = True
+        self.config.list_folders = False
+        self.config.list_sort = False
+        self.config.list_sort_buffer = 100000
+        self.config.prefetch = 0
+        self.storage = MagicMock()
+        self.folder_one = FolderInfo(id=1, name='A Folder')
+        self.root_folder = RootFolderInfo()
+        self.file_one = FileInfo(id=1, name='A File', checksum='abc123', size=10)
+        self.file_two = FileInfo(id=2, name='B File')
+
+    def tearDown(self):
+        self.sink_patch.stop()
+        self.logger_patch.stop()
+
+    def test_should_write_file_records_without_header(self):
+        helpers.setup_storage(self.storage, [
+            {'folder': self.root_folder, 'files': [self.file_two]},
+            {'folder': self.folder_one, 'files': [self.file_one]}
+        ])
+        walker = JsonLinesWalker(self.config, self.storage)
+
+        walker.walk()
+
+        self.assertEqual(self.mock_sink.write_record.call_args_list, [
+            call([('folder', ''), ('name', 'B File'), ('id', 2), ('checksum', None), ('size', None)]),
+            call([('folder', 'A Folder'), ('name', 'A File'), ('id', 1), ('checksum', 'abc123'), ('size', 10)])
+        ])
+        self.mock_sink.close.assert_called_once_with()
+
+    def test_should_write_folder_records_given_list_folders(self):
+        self.config.root_files = False
+        self.config.list_folders = True
+        helpers.setup_storage(self.storage, [
+            {'folder': self.folder_one, 'files': []}
+        ])
+        walker = JsonLinesWalker(self.config, self.storage)
+
+        walker.walk()
+
+        self.assertEqual(self.mock_sink.write_record.call_args_list, [
+            call([('folder', 'A Folder'), ('id', 1)])
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
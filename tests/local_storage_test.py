@@ -0,0 +1,268 @@
+import os
+import sys
+import shutil
+import pickle
+import tempfile
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import MagicMock
+import helpers
+from flickr_rsync.local_storage import LocalStorage, atomic_write
+from flickr_rsync.file_filter import FileFilter
+from flickr_rsync.file_info import FileInfo
+from flickr_rsync.storage import RemoteStorage
+
+
+class LocalStorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.config = MagicMock()
+        self.config.include = ''
+        self.config.exclude = ''
+        self.config.include_dir = ''
+        self.config.exclude_dir = ''
+        self.config.checksum = False
+        self.config.recursive = False
+        self.config.folder_separator = '/'
+        self.config.list_threads = 2
+
+    def _create_storage(self, root=None):
+        return LocalStorage(self.config, root or self.root,
+                            FileFilter(self.config))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _create_file(self, *parts):
+        path = os.path.join(self.root, *parts)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write('content')
+        return path
+
+    def test_should_list_top_level_folders_only_given_recursive_disabled(self):
+        self._create_file('B', 'b.jpg')
+        self._create_file('A', 'Nested', 'a.jpg')
+
+        folders = self._create_storage().list_folders()
+
+        self.assertEqual(sorted(f.name for f in folders), ['A', 'B'])
+
+    def test_should_list_file_size_and_modified_time(self):
+        path = self._create_file('A', 'a.jpg')
+        os.utime(path, (1500000000, 1500000000))
+        storage = self._create_storage()
+
+        files = storage.list_files(storage.list_folders()[0])
+
+        self.assertEqual([(f.name, f.size, f.mtime) for f in files], [('a.jpg', 7, 1500000000)])
+        self.assertEqual(files[0].full_path, path)
+
+    @unittest.skipIf(os.name == 'nt', 'listings include the size and modified time on Windows')
+    def test_should_read_size_and_modified_time_when_first_used(self):
+        path = self._create_file('A', 'a.jpg')
+        storage = self._create_storage()
+        files = storage.list_files(storage.list_folders()[0])
+        with open(path, 'a') as f:
+            f.write('more')
+        os.utime(path, (1500000000, 1500000000))
+
+        self.assertEqual((files[0].size, files[0].mtime), (11, 1500000000))
+
+    def test_should_keep_size_and_modified_time_given_pickled(self):
+        path = self._create_file('A', 'a.jpg')
+        os.utime(path, (1500000000, 1500000000))
+        storage = self._create_storage()
+        file_info = storage.list_files(storage.list_folders()[0])[0]
+
+        file_info = pickle.loads(pickle.dumps(file_info, pickle.HIGHEST_PROTOCOL))
+
+        self.assertEqual((file_info.name, file_info.size, file_info.mtime), ('a.jpg', 7, 1500000000))
+
+    def test_should_list_only_files_given_nested_folders(self):
+        self._create_file('A', 'a.jpg')
+        self._create_file('A', 'Nested', 'b.jpg')
+        storage = self._create_storage()
+
+        files = storage.list_files(storage.list_folders()[0])
+
+        self.assertEqual([f.name for f in files], ['a.jpg'])
+
+    def test_should_list_only_folders_given_files_in_root(self):
+        self._create_file('a.jpg')
+        self._create_file('A', 'b.jpg')
+
+        folders = self._create_storage().list_folders()
+
+        self.assertEqual([f.name for f in folders], ['A'])
+
+    def test_should_not_list_excluded_files(self):
+        self.config.exclude = r'\.txt$'
+        self._create_file('A', 'a.jpg')
+        self._create_file('A', 'notes.txt')
+        storage = self._create_storage()
+
+        files = storage.list_files(storage.list_folders()[0])
+
+        self.assertEqual([f.name for f in files], ['a.jpg'])
+
+    def test_should_list_nested_folders_in_order_given_recursive_enabled(self):
+        self.config.recursive = True
+        self._create_file('B', 'b.jpg')
+        self._create_file('A', 'Z', 'Deep', 'a.jpg')
+        self._create_file('A', 'Y', 'a.jpg')
+
+        folders = self._create_storage().list_folders()
+
+        self.assertEqual([f.name for f in folders],
+                         ['A', 'A/Y', 'A/Z', 'A/Z/Deep', 'B'])
+
+    def test_should_join_nested_folder_names_with_separator(self):
+        self.config.recursive = True
+        self.config.folder_separator = ' - '
+        self._create_file('A', 'B', 'a.jpg')
+
+        folders = self._create_storage().list_folders()
+
+        self.assertEqual([f.name for f in folders], ['A', 'A - B'])
+
+    def test_should_filter_nested_folders_by_joined_name(self):
+        self.config.recursive = True
+        self.config.exclude_dir = '^Private'
+        self._create_file('Private', 'Nested', 'a.jpg')
+        self._create_file('Public', 'Private', 'b.jpg')
+
+        folders = self._create_storage().list_folders()
+
+        self.assertEqual([f.name for f in folders],
+                         ['Public', 'Public/Private'])
+
+    def test_should_list_files_in_nested_folder(self):
+        self.config.recursive = True
+        self.config.folder_separator = ' - '
+        path = self._create_file('A', 'B', 'a.jpg')
+        self._create_file('A', 'other.jpg')
+
+        storage = self._create_storage()
+        folder = next(f for f in storage.list_folders() if f.name == 'A - B')
+        files = storage.list_files(folder)
+
+        self.assertEqual([(f.name, f.full_path, f.size) for f in files],
+                         [('a.jpg', path, 7)])
+
+    def test_should_copy_file_to_nested_folder_given_recursive_enabled(self):
+        self.config.recursive = True
+        self.config.folder_separator = ' - '
+        self._create_file('A', 'B', 'a.jpg')
+        dest_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dest_root)
+        storage = self._create_storage()
+        dest = self._create_storage(dest_root)
+
+        folder = next(f for f in storage.list_folders() if f.name == 'A - B')
+        for file_info in storage.list_files(folder):
+            storage.copy_file(file_info, folder.name, dest)
+
+        self.assertTrue(os.path.isfile(
+            os.path.join(dest_root, 'A', 'B', 'a.jpg')))
+
+    def test_should_replace_dest_file_given_dest_file(self):
+        self._create_file('A', 'a.jpeg')
+        dest_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dest_root)
+        os.mkdir(os.path.join(dest_root, 'A'))
+        with open(os.path.join(dest_root, 'A', 'A.JPG'), 'w') as f:
+            f.write('old')
+        storage = self._create_storage()
+        dest = self._create_storage(dest_root)
+
+        folder = storage.list_folders()[0]
+        file_info = storage.list_files(folder)[0]
+        storage.copy_file(file_info, folder.name, dest, dest_file=FileInfo(name='A.JPG'))
+
+        self.assertEqual(os.listdir(os.path.join(dest_root, 'A')), ['A.JPG'])
+        with open(os.path.join(dest_root, 'A', 'A.JPG')) as f:
+            self.assertEqual(f.read(), 'content')
+
+    def test_should_replace_remote_file_with_checksum_given_dest_file(self):
+        path = self._create_file('A', 'a.jpg')
+        storage = self._create_storage()
+        dest = MagicMock(spec=RemoteStorage)
+        dest_file = FileInfo(id='1', name='a.jpg', checksum='abc')
+
+        folder = storage.list_folders()[0]
+        storage.copy_file(storage.list_files(folder)[0], folder.name, dest, dest_file=dest_file)
+
+        dest.replace.assert_called_once_with(path, dest_file, storage.md5_checksum(path))
+        dest.upload.assert_not_called()
+
+    def test_should_calculate_checksum_on_demand(self):
+        path = self._create_file('A', 'a.jpg')
+        storage = self._create_storage()
+
+        file_info = storage.list_files(storage.list_folders()[0])[0]
+
+        self.assertIsNone(file_info.checksum)
+        self.assertEqual(storage.get_checksum(file_info), storage.md5_checksum(path))
+
+    def test_should_keep_existing_file_given_write_fails(self):
+        path = self._create_file('a.jpg')
+
+        def write():
+            with atomic_write(path) as temp_path:
+                with open(temp_path, 'w') as f:
+                    f.write('partial')
+                raise IOError('disk full')
+
+        self.assertRaises(IOError, write)
+        self.assertEqual(os.listdir(self.root), ['a.jpg'])
+        with open(path) as f:
+            self.assertEqual(f.read(), 'content')
+
+    def test_should_set_modified_time(self):
+        path = self._create_file('A', 'a.jpg')
+        storage = self._create_storage()
+        file_info = storage.list_files(storage.list_folders()[0])[0]
+
+        storage.set_mtime(file_info, 1500000000)
+
+        self.assertEqual(os.stat(path).st_mtime, 1500000000)
+        self.assertEqual(storage.list_files(storage.list_folders()[0])[0].mtime, 1500000000)
+
+    def test_should_rename_nested_folder_given_recursive_enabled(self):
+        self.config.recursive = True
+        self._create_file('A', 'a.jpg')
+        storage = self._create_storage()
+
+        folder = storage.rename_folder(storage.list_folders()[0], 'B/C')
+
+        self.assertEqual(folder.name, 'B/C')
+        self.assertEqual(os.listdir(self.root), ['B'])
+        self.assertEqual(os.listdir(os.path.join(self.root, 'B', 'C')), ['a.jpg'])
+
+    def test_should_move_and_rename_file_to_new_folder(self):
+        self._create_file('A', 'a.jpg')
+        self._create_file('A', 'b.jpg')
+        storage = self._create_storage()
+        folder = storage.list_folders()[0]
+        file_info = next(f for f in storage.list_files(folder) if f.name == 'a.jpg')
+
+        storage.move_file(file_info, folder, 'B', 'c.jpg')
+
+        self.assertEqual(os.listdir(os.path.join(self.root, 'A')), ['b.jpg'])
+        self.assertEqual(os.listdir(os.path.join(self.root, 'B')), ['c.jpg'])
+
+    def test_should_not_replace_file_given_move_to_existing_file(self):
+        self._create_file('A', 'a.jpg')
+        self._create_file('B', 'a.jpg')
+        storage = self._create_storage()
+        folder = next(f for f in storage.list_folders() if f.name == 'A')
+
+        self.assertRaises(OSError, storage.move_file, storage.list_files(folder)[0], folder, 'B', 'a.jpg')
+        self.assertEqual(os.listdir(os.path.join(self.root, 'A')), ['a.jpg'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,50 @@
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from flickr_rsync.merge_join import merge_join
+
+
+class MergeJoinTest(unittest.TestCase):
+
+    def test_should_return_empty_given_both_empty(self):
+        self.assertEqual(list(merge_join([], [], key=lambda x: x)), [])
+
+    def test_should_return_one_side_given_other_empty(self):
+        self.assertEqual(list(merge_join([1, 2], [], key=lambda x: x)),
+                         [(1, None), (2, None)])
+        self.assertEqual(list(merge_join([], [1, 2], key=lambda x: x)),
+                         [(None, 1), (None, 2)])
+
+    def test_should_pair_matching_keys_in_order(self):
+        result = list(merge_join(
+            iter([('a', 1), ('c', 2), ('d', 3)]),
+            iter([('b', 4), ('c', 5), ('e', 6)]),
+            key=lambda x: x[0]))
+
+        self.assertEqual(result, [
+            (('a', 1), None),
+            (None, ('b', 4)),
+            (('c', 2), ('c', 5)),
+            (('d', 3), None),
+            (None, ('e', 6))])
+
+    def test_should_pair_duplicate_keys_in_order(self):
+        result = list(merge_join(['a', 'a', 'a'], ['a', 'a'], key=lambda x: x))
+
+        self.assertEqual(result, [('a', 'a'), ('a', 'a'), ('a', None)])
+
+    def test_should_call_key_once_per_item(self):
+        calls = []
+
+        def key(x):
+            calls.append(x)
+            return x
+
+        list(merge_join([1, 2, 3], [2, 3, 4], key=key))
+
+        self.assertEqual(sorted(calls), [1, 2, 2, 3, 3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
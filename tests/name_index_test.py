@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from flickr_rsync.name_index import NameIndex, normalize_name
+
+
+class NormalizeNameTest(unittest.TestCase):
+
+    def test_should_ignore_case_and_jpeg_extension(self):
+        self.assertEqual(normalize_name('IMG_0001.JPEG'), normalize_name('img_0001.jpg'))
+        self.assertNotEqual(normalize_name('IMG_0001.jpg'), normalize_name('IMG_0001.png'))
+
+    def test_should_match_unicode_and_utf8_given_different_normal_forms(self):
+        nfc = u'Caf\xe9.jpg'
+        nfd = u'Café.JPG'
+
+        self.assertEqual(normalize_name(nfc), normalize_name(nfd))
+        self.assertEqual(normalize_name(nfc.encode('utf-8')), normalize_name(nfd))
+        self.assertEqual(normalize_name(nfd), u'caf\xe9.jpg'.encode('utf-8'))
+
+    def test_should_lower_bytes_given_invalid_utf8(self):
+        self.assertEqual(normalize_name(b'Caf\xe9.JPEG'), b'caf\xe9.jpg')
+
+
+class NameIndexTest(unittest.TestCase):
+
+    def test_should_contain_normalized_names(self):
+        index = NameIndex(['IMG_0001.jpg', u'Été.png'])
+        index.add('Other.JPEG')
+
+        self.assertIn('img_0001.JPEG', index)
+        self.assertIn(u'\xe9t\xe9.PNG'.encode('utf-8'), index)
+        self.assertIn('other.jpg', index)
+        self.assertNotIn('IMG_0002.jpg', index)
+        self.assertEqual(len(index), 3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,110 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import MagicMock, patch
+from flickr_rsync.plan import PlanWriter, PlanReader, estimate_seconds, load_bandwidth, save_bandwidth, \
+    NEW_FOLDER, COPY, MOVE, RENAME
+from flickr_rsync.file_info import FileInfo
+from flickr_rsync.folder_info import FolderInfo
+from flickr_rsync.root_folder_info import RootFolderInfo
+
+
+class PlanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'sync.plan')
+        self.config = MagicMock()
+        self.config.throttling = 0.5
+        self.config.locate_datafile.return_value = None
+        self.logger_patch = patch('flickr_rsync.plan.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+        shutil.rmtree(self.root)
+
+    def test_should_count_api_calls_given_upload_plan(self):
+        plan = PlanWriter(self.path, '/photos', 'flickr', False, True)
+        plan.new_folder('A')
+        plan.copy('A', FileInfo(name='a.jpg', size=100))
+        plan.copy('A', FileInfo(name='b.jpg', size=200))
+        plan.copy('B', FileInfo(name='c.jpg'), FileInfo(id='3', name='c.jpg'))
+        plan.copy('', FileInfo(name='d.jpg', size=50))
+        plan.close(self.config)
+
+        self.assertEqual((plan.copies, plan.updates, plan.folders_created, plan.photoset_adds), (3, 1, 1, 1))
+        # 3 uploads, 1 photoset created, 1 photo added, 4 calls to replace
+        self.assertEqual(plan.api_calls, 9)
+        self.assertEqual(plan.bytes, 350)
+        self.assertEqual(plan.unknown_sizes, 1)
+
+    def test_should_count_api_calls_given_move_and_rename(self):
+        plan = PlanWriter(self.path, '/photos', 'flickr', False, True)
+        plan.move(FileInfo(id='1', name='a.jpg'), FolderInfo(id='10', name='A'), 'B', 'a.jpg')
+        plan.move(FileInfo(id='2', name='b.jpg'), RootFolderInfo(), '', 'c.jpg')
+        plan.rename(FolderInfo(id='11', name='C'), 'D')
+        plan.close(self.config)
+
+        self.assertEqual((plan.moves, plan.renames), (2, 1))
+        self.assertEqual(plan.api_calls, 4)
+
+    def test_should_not_count_api_calls_given_local_plan(self):
+        plan = PlanWriter(self.path, '/photos', '/backup', False, False)
+        plan.copy('A', FileInfo(name='a.jpg', size=100))
+        plan.close(self.config)
+
+        self.assertEqual(plan.api_calls, 0)
+
+    def test_should_read_operations_given_written_plan(self):
+        plan = PlanWriter(self.path, '/photos', 'flickr', False, True)
+        plan.new_folder('A')
+        plan.copy('A', FileInfo(name='a.jpg', full_path='/photos/A/a.jpg', size=100, mtime=1.5))
+        plan.move(FileInfo(id='1', name='b.jpg'), FolderInfo(id='10', name='B'), 'A', 'b.jpg')
+        plan.rename(FolderInfo(id='11', name='C'), 'D')
+        plan.close(self.config)
+
+        reader = PlanReader(self.path)
+        ops = list(reader)
+
+        self.assertEqual((reader.src, reader.dest), ('/photos', 'flickr'))
+        self.assertEqual([op[0] for op in ops], [NEW_FOLDER, COPY, MOVE, RENAME])
+        self.assertEqual(ops[0][1], 'A')
+        _, folder_name, file_info, dest_file = ops[1]
+        self.assertEqual((folder_name, file_info.name, file_info.full_path, file_info.size, file_info.mtime),
+                         ('A', 'a.jpg', '/photos/A/a.jpg', 100, 1.5))
+        self.assertIsNone(dest_file)
+        _, file_info, folder, dest_folder_name, dest_name = ops[2]
+        self.assertEqual((file_info.id, folder.id, folder.name, dest_folder_name, dest_name),
+                         ('1', '10', 'B', 'A', 'b.jpg'))
+        _, folder, name = ops[3]
+        self.assertEqual((folder.id, folder.name, name), ('11', 'C', 'D'))
+
+    def test_should_raise_given_file_is_not_a_plan(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a plan\n')
+
+        self.assertRaises(IOError, PlanReader, self.path)
+
+    def test_should_estimate_time_by_api_calls_or_bandwidth(self):
+        self.assertEqual(estimate_seconds(7200, 0, 0, None), 7200)
+        self.assertEqual(estimate_seconds(100, 2, 0, None), 200)
+        self.assertEqual(estimate_seconds(10, 0.5, 1000, 10), 100)
+
+    def test_should_save_bandwidth_by_direction(self):
+        path = os.path.join(self.root, 'bandwidth')
+        self.config.locate_datafile.return_value = None
+        self.config.default_datafile.return_value = path
+
+        save_bandwidth(self.config, False, True, 1000.0)
+        self.config.locate_datafile.return_value = path
+        save_bandwidth(self.config, True, False, 2000.0)
+
+        self.assertEqual(load_bandwidth(self.config), {'upload': 1000.0, 'download': 2000.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,7 @@ import urllib2
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
 from mock import MagicMock, patch, call
 import helpers
+from flickr_api.flickrerrors import FlickrAPIError
 from flickr_rsync.resiliently import Resiliently
 
 
@@ -65,6 +66,47 @@ class ResilientlyTest(unittest.TestCase):
                 self.mock_sleep.call_count,
                 self.mock_sleep.call_args_list))
 
+    def test_should_not_retry_given_token_rejected(self):
+        self.config.retry = 3
+        self.callback.side_effect = FlickrAPIError(98, 'Invalid auth token')
+        resiliently = Resiliently(self.config)
+
+        self.assertRaises(FlickrAPIError, resiliently.call, self.callback, 'a')
+
+        self.callback.assert_called_once_with('a')
+
+    def test_should_retry_once_given_token_rejected_and_handler_retries(self):
+        self.config.retry = 3
+        self.callback.side_effect = [FlickrAPIError(98, 'Invalid auth token'), True]
+        resiliently = Resiliently(self.config)
+        resiliently.on_token_rejected = MagicMock(return_value=True)
+
+        self.assertTrue(resiliently.call(self.callback, 'a'))
+
+        resiliently.on_token_rejected.assert_called_once_with()
+        self.assertEqual(self.callback.call_count, 2)
+
+    def test_should_raise_given_token_rejected_again_after_handler_retries(self):
+        self.config.retry = 3
+        self.callback.side_effect = FlickrAPIError(98, 'Invalid auth token')
+        resiliently = Resiliently(self.config)
+        resiliently.on_token_rejected = MagicMock(return_value=True)
+
+        self.assertRaises(FlickrAPIError, resiliently.call, self.callback, 'a')
+
+        resiliently.on_token_rejected.assert_called_once_with()
+        self.assertEqual(self.callback.call_count, 2)
+
+    def test_should_raise_given_token_rejected_and_handler_does_not_retry(self):
+        self.config.retry = 3
+        self.callback.side_effect = FlickrAPIError(98, 'Invalid auth token')
+        resiliently = Resiliently(self.config)
+        resiliently.on_token_rejected = MagicMock(return_value=False)
+
+        self.assertRaises(FlickrAPIError, resiliently.call, self.callback, 'a')
+
+        self.callback.assert_called_once_with('a')
+
     def test_should_fail_once_retry_exceeded(self):
         self.config.retry = 2
         self.callback.side_effect = self.throw_errors(3)
@@ -137,6 +179,22 @@ class ResilientlyTest(unittest.TestCase):
         self.mock_sleep.assert_not_called()
         time_patch.stop()
 
+    def test_should_report_calls_by_class(self):
+        time_patch = patch('flickr_rsync.throttle.time.time', create=True)
+        mock_time = time_patch.start()
+        mock_time.return_value = 0
+        self.config.throttling = 0
+        resiliently = Resiliently(self.config)
+
+        resiliently.call_as('upload', self.callback, 'a')
+        resiliently.call(self.callback, 'b')
+
+        self.assertEqual(resiliently.stats(), [
+            '1 upload API call(s), waited 0.00 sec on average and 0.00 sec at most',
+            '1 list API call(s), waited 0.00 sec on average and 0.00 sec at most'
+        ])
+        time_patch.stop()
+
     def throw_errors(self, num):
         for x in range(num):
             yield urllib2.URLError('Bang!')
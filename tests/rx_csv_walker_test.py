@@ -0,0 +1,15 @@
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+import csv_walker_test
+from flickr_rsync.rx_csv_walker import RxCsvWalker
+
+
+class RxCsvWalkerTest(csv_walker_test.CsvWalkerTest):
+    module = 'flickr_rsync.rx_csv_walker'
+    walker_class = RxCsvWalker
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,15 @@
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+import tree_walker_test
+from flickr_rsync.rx_tree_walker import RxTreeWalker
+
+
+class RxTreeWalkerTest(tree_walker_test.TreeWalkerTest):
+    module = 'flickr_rsync.rx_tree_walker'
+    walker_class = RxTreeWalker
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from flickr_rsync.sinks import TextSink, CsvSink, JsonLinesSink
+
+
+class TextSinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = io.BytesIO()
+
+    def test_should_write_lines_given_unicode(self):
+        sink = TextSink(self.stream)
+
+        sink.write_line(u'caf\xe9')
+        sink.write_line('plain')
+        sink.close()
+
+        self.assertEqual(self.stream.getvalue(), b'caf\xc3\xa9\nplain\n')
+
+
+class CsvSinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = io.BytesIO()
+
+    def test_should_quote_values_given_commas_and_quotes(self):
+        sink = CsvSink(self.stream)
+
+        sink.write_row(['Folder, with comma', 'say "cheese".jpg', 'abc123'])
+        sink.close()
+
+        self.assertEqual(
+            self.stream.getvalue(),
+            b'"Folder, with comma","say ""cheese"".jpg",abc123\n')
+
+    def test_should_write_empty_value_given_none(self):
+        sink = CsvSink(self.stream)
+
+        sink.write_row([u'caf\xe9', 'A File', None])
+        sink.close()
+
+        self.assertEqual(self.stream.getvalue(), b'caf\xc3\xa9,A File,\n')
+
+
+class JsonLinesSinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = io.BytesIO()
+
+    def test_should_write_one_object_per_line_in_order(self):
+        sink = JsonLinesSink(self.stream)
+
+        sink.write_record([('folder', 'A Folder'), ('name', 'A File'), ('size', None)])
+        sink.write_record([('folder', 'B Folder'), ('name', 'B, File'), ('size', 10)])
+        sink.close()
+
+        self.assertEqual(
+            self.stream.getvalue(),
+            b'{"folder": "A Folder", "name": "A File", "size": null}\n'
+            b'{"folder": "B Folder", "name": "B, File", "size": 10}\n')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,107 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from mock import MagicMock
+import helpers
+from flickr_rsync.snapshot_storage import SnapshotStorage, SnapshotRecorder
+from flickr_rsync.file_filter import FileFilter
+from flickr_rsync.file_info import FileInfo
+from flickr_rsync.folder_info import FolderInfo
+from flickr_rsync.root_folder_info import RootFolderInfo
+
+
+class SnapshotStorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'test.snapshot')
+        self.config = MagicMock()
+        self.config.include = ''
+        self.config.exclude = ''
+        self.config.include_dir = ''
+        self.config.exclude_dir = ''
+        self.storage = MagicMock()
+        self.folder_one = FolderInfo(id=u'123', name=u'A Folder')
+        self.folder_two = FolderInfo(id=u'456', name=u'B Folder')
+        self.file_one = FileInfo(id=u'1', name=u'A File.jpg', checksum='abc123', size=10, mtime=1.5)
+        self.file_two = FileInfo(id=u'2', name=u'B File.mov')
+        self.file_three = FileInfo(id=u'3', name=u'C File.jpg')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _record(self, folders):
+        helpers.setup_storage(self.storage, folders)
+        recorder = SnapshotRecorder(self.storage, self.path)
+        for folder in [RootFolderInfo()] + list(recorder.list_folders()):
+            list(recorder.list_files(folder))
+        recorder.save()
+
+    def _create_storage(self):
+        return SnapshotStorage(self.config, self.path, FileFilter(self.config))
+
+    def test_should_list_recorded_folders_and_files(self):
+        self._record([
+            {'folder': RootFolderInfo(), 'files': [self.file_three]},
+            {'folder': self.folder_one, 'files': [self.file_one, self.file_two]},
+            {'folder': self.folder_two, 'files': []}
+        ])
+        storage = self._create_storage()
+
+        folders = list(storage.list_folders())
+        files = list(storage.list_files(folders[0]))
+        root_files = list(storage.list_files(RootFolderInfo()))
+
+        self.assertEqual([(x.id, x.name) for x in folders],
+                         [(u'123', u'A Folder'), (u'456', u'B Folder')])
+        self.assertEqual([(x.id, x.name, x.checksum, x.size, x.mtime) for x in files], [
+            (u'1', u'A File.jpg', 'abc123', 10, 1.5),
+            (u'2', u'B File.mov', None, None, None)])
+        self.assertEqual([x.name for x in root_files], [u'C File.jpg'])
+        self.assertEqual(list(storage.list_files(folders[1])), [])
+
+    def test_should_apply_file_filter_given_include(self):
+        self.config.include = '\.jpg$'
+        self.config.exclude_dir = 'B'
+        self._record([
+            {'folder': self.folder_one, 'files': [self.file_one, self.file_two]},
+            {'folder': self.folder_two, 'files': [self.file_three]}
+        ])
+        storage = self._create_storage()
+
+        folders = list(storage.list_folders())
+
+        self.assertEqual([x.name for x in folders], [u'A Folder'])
+        self.assertEqual([x.name for x in storage.list_files(folders[0])], [u'A File.jpg'])
+
+    def test_should_not_replace_snapshot_until_saved(self):
+        helpers.setup_storage(self.storage, [
+            {'folder': self.folder_one, 'files': [self.file_one]}
+        ])
+        recorder = SnapshotRecorder(self.storage, self.path)
+
+        list(recorder.list_folders())
+
+        self.assertFalse(os.path.exists(self.path))
+        recorder.save()
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_should_raise_given_not_a_snapshot(self):
+        with open(self.path, 'w') as f:
+            f.write('Folder,Filename,Checksum\n')
+        storage = self._create_storage()
+
+        self.assertRaises(IOError, lambda: list(storage.list_folders()))
+
+    def test_should_raise_given_copy(self):
+        self._record([])
+        storage = self._create_storage()
+
+        self.assertRaises(IOError, storage.copy_file, self.file_one, 'A Folder', MagicMock())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,11 +1,18 @@
 import os
 import sys
+import shutil
+import tempfile
+import threading
+import urllib2
 import unittest
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
 from mock import MagicMock, patch, call
 import helpers
+from flickr_api.flickrerrors import FlickrAPIError
 import flickr_rsync.sync
-from flickr_rsync.sync import Sync
+from flickr_rsync.sync import Sync, FilteredDestError
+from flickr_rsync.flickr_storage import FlickrStorage
+from flickr_rsync.catalog import Catalog, write_catalog
 from flickr_rsync.file_info import FileInfo
 from flickr_rsync.folder_info import FolderInfo
 from flickr_rsync.root_folder_info import RootFolderInfo
@@ -19,8 +26,17 @@ class SyncTestBase(unittest.TestCase):
 
         self.config = MagicMock()
         self.config.dry_run = False
+        self.config.transfers = 1
+        self.config.sorted_merge = False
+        self.config.update = False
+        self.config.detect_moves = False
+        self.config.max_failures = 0
+        self.config.order = 'listing'
+        self.config.large_file_size = 0
+        self.config.list_sort_buffer = 100000
         self.src_storage = MagicMock()
         self.dest_storage = MagicMock()
+        self.dest_storage.is_filtered.return_value = False
         self.folder_one = FolderInfo(id=1, name='A')
         self.folder_two = FolderInfo(id=2, name='B')
         self.folder_three = FolderInfo(id=3, name='C')
@@ -53,6 +69,62 @@ class SyncTest(SyncTestBase):
 
         self.mock.assert_not_called()
 
+    def test_should_raise_and_not_copy_given_flickr_dest_filtered_by_media(self):
+        self.config.media = 'photos'
+        self.config.min_date = ''
+        self.config.max_date = ''
+        self.config.filter_tags = ''
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [self.file_one]}
+        ])
+        dest_storage = FlickrStorage(self.config, MagicMock(), MagicMock())
+        sync = Sync(self.config, self.src_storage, dest_storage)
+
+        self.assertRaises(FilteredDestError, sync.run)
+        self.mock.assert_not_called()
+
+    def test_should_copy_all_files_given_concurrent_transfers(self):
+        self.config.transfers = 3
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [self.file_one, self.file_two]},
+            {'folder': self.folder_two, 'files': [self.file_one, self.file_two]}
+        ])
+        helpers.setup_storage(self.dest_storage, [
+            {'folder': self.folder_two, 'files': [self.file_one]}
+        ])
+
+        self.sync.run()
+
+        self.mock.assert_has_calls_exactly([
+            call(self.file_one, self.folder_one.name, self.dest_storage),
+            call(self.file_two, self.folder_one.name, self.dest_storage),
+            call(self.file_two, self.folder_two.name, self.dest_storage)
+        ], any_order=True)
+
+    def test_should_retry_copy_errors_once_given_concurrent_transfers(self):
+        self.config.transfers = 3
+        self.mock.side_effect = IOError('disk full')
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [self.file_one]}
+        ])
+        helpers.setup_storage(self.dest_storage, [])
+
+        self.sync.run()
+
+        self.assertEqual(self.mock.call_count, 2)
+
+    def test_should_raise_too_many_failures_given_max_failures_exceeded(self):
+        self.config.transfers = 3
+        self.config.max_failures = 1
+        self.mock.side_effect = IOError('disk full')
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [self.file_one, self.file_two]}
+        ])
+        helpers.setup_storage(self.dest_storage, [])
+
+        with self.assertRaises(flickr_rsync.sync.TooManyFailuresError):
+            self.sync.run()
+
 # @unittest.skip("")
 
 
@@ -197,5 +269,606 @@ class SyncMergeTest(SyncTestBase):
         ], any_order=True)
 
 
+    def test_should_not_copy_files_given_names_differ_by_case_extension_or_unicode_form(self):
+        helpers.setup_storage(self.src_storage, [{
+            'folder': FolderInfo(id=1, name=u'Cafe\u0301'.encode('utf-8')),
+            'files': [FileInfo(name='IMG_0001.JPEG'), FileInfo(name=u'\xe9t\xe9.jpg'.encode('utf-8'))]
+        }])
+        helpers.setup_storage(self.dest_storage, [{
+            'folder': FolderInfo(id=2, name=u'caf\xe9'),
+            'files': [FileInfo(name='img_0001.jpg'), FileInfo(name=u'E\u0301te\u0301.JPG')]
+        }])
+
+        self.sync.run()
+
+        self.mock.assert_not_called()
+
+
+class SyncUpdateTest(SyncTestBase):
+
+    def setUp(self):
+        super(SyncUpdateTest, self).setUp()
+        self.config.update = True
+        self.dest_storage.can_update = True
+        self.src_storage.get_checksum.side_effect = lambda file: file.checksum
+        self.dest_storage.get_checksum.side_effect = lambda file: file.checksum
+
+    def _sync_file(self, src_file, dest_file):
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [src_file]}
+        ])
+        helpers.setup_storage(self.dest_storage, [
+            {'folder': self.folder_one, 'files': [dest_file]}
+        ])
+        self.sync.run()
+
+    def test_should_replace_file_given_size_differs(self):
+        src_file = FileInfo(name='a.jpeg', size=10, mtime=100.0)
+        dest_file = FileInfo(name='A.JPG', size=11, mtime=100.0)
+
+        self._sync_file(src_file, dest_file)
+
+        self.assertEqual(self.mock.call_args_list, [
+            call(src_file, 'A', self.dest_storage, dest_file=dest_file)
+        ])
+        self.src_storage.get_checksum.assert_not_called()
+
+    def test_should_skip_without_checksum_given_size_and_mtime_match(self):
+        self._sync_file(FileInfo(name='a.jpg', size=10, mtime=100.2),
+                        FileInfo(name='a.jpg', size=10, mtime=100.9))
+
+        self.mock.assert_not_called()
+        self.src_storage.get_checksum.assert_not_called()
+
+    def test_should_replace_file_given_mtime_and_checksum_differ(self):
+        src_file = FileInfo(name='a.jpg', size=10, mtime=200.0, checksum='abc')
+        dest_file = FileInfo(name='a.jpg', size=10, mtime=100.0, checksum='def')
+
+        self._sync_file(src_file, dest_file)
+
+        self.assertEqual(self.mock.call_args_list, [
+            call(src_file, 'A', self.dest_storage, dest_file=dest_file)
+        ])
+
+    def test_should_skip_given_mtime_differs_but_checksum_matches(self):
+        dest_file = FileInfo(name='a.jpg', size=10, mtime=100.0, checksum='abc')
+
+        self._sync_file(FileInfo(name='a.jpg', size=10, mtime=200.0, checksum='abc'), dest_file)
+
+        self.mock.assert_not_called()
+        self.dest_storage.set_mtime.assert_called_once_with(dest_file, 200.0)
+
+    def test_should_not_set_mtime_given_checksum_differs(self):
+        self._sync_file(FileInfo(name='a.jpg', size=10, mtime=200.0, checksum='abc'),
+                        FileInfo(name='a.jpg', size=10, mtime=100.0, checksum='def'))
+
+        self.dest_storage.set_mtime.assert_not_called()
+
+    def test_should_not_set_mtime_given_dry_run(self):
+        self.config.dry_run = True
+
+        self._sync_file(FileInfo(name='a.jpg', size=10, mtime=200.0, checksum='abc'),
+                        FileInfo(name='a.jpg', size=10, mtime=100.0, checksum='abc'))
+
+        self.dest_storage.set_mtime.assert_not_called()
+
+    def test_should_replace_photo_given_checksum_tag_differs(self):
+        # Flickr listings only have the checksum tag
+        src_file = FileInfo(name='a.jpg', size=10, mtime=200.0, checksum='abc')
+        dest_file = FileInfo(id='1', name='a.jpg', checksum='def')
+
+        self._sync_file(src_file, dest_file)
+
+        self.assertEqual(self.mock.call_args_list, [
+            call(src_file, 'A', self.dest_storage, dest_file=dest_file)
+        ])
+
+    def test_should_skip_given_no_size_mtime_or_checksum(self):
+        self._sync_file(FileInfo(name='a.jpg'), FileInfo(name='a.jpg', size=10, checksum='abc'))
+
+        self.mock.assert_not_called()
+
+    def test_should_skip_given_dest_can_not_update(self):
+        self.dest_storage.can_update = False
+
+        self._sync_file(FileInfo(name='a.jpg', size=10), FileInfo(name='a.jpg', size=11))
+
+        self.mock.assert_not_called()
+
+
+class SyncFailureTest(SyncTestBase):
+
+    def setUp(self):
+        super(SyncFailureTest, self).setUp()
+        self.config.root_files = False
+        self.logger_patch = patch('flickr_rsync.sync.logger')
+        self.mock_logger = self.logger_patch.start()
+        self.time_patch = patch('flickr_rsync.sync.time.time')
+        self.time_patch.start().return_value = 0
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [self.file_one, self.file_two]},
+            {'folder': self.folder_two, 'files': [self.file_one]}
+        ])
+        helpers.setup_storage(self.dest_storage, [])
+
+    def tearDown(self):
+        super(SyncFailureTest, self).tearDown()
+        self.logger_patch.stop()
+        self.time_patch.stop()
+
+    def test_should_copy_remaining_files_and_retry_given_file_fails(self):
+        errors = {'B': [IOError()]}
+
+        def copy_file(file, folder_name, dest):
+            if errors.get(file.name):
+                raise errors[file.name].pop()
+        self.mock.side_effect = copy_file
+
+        self.sync.run()
+
+        self.assertEqual(self.mock.call_args_list, [
+            call(self.file_one, 'A', self.dest_storage),
+            call(self.file_two, 'A', self.dest_storage),
+            call(self.file_one, 'B', self.dest_storage),
+            call(self.file_two, 'A', self.dest_storage)
+        ])
+        self.mock_logger.info.assert_any_call("\ntransferred 3 file(s) in 0.0 sec")
+
+    def test_should_summarise_failures_by_class_given_retry_fails(self):
+        errors = {'A': ValueError('corrupt'), 'B': IOError('unsupported')}
+
+        def copy_file(file, folder_name, dest):
+            raise errors[file.name]
+        self.mock.side_effect = copy_file
+
+        self.sync.run()
+
+        self.assertEqual(self.mock.call_count, 6)
+        self.mock_logger.info.assert_any_call("\ntransferred 0 file(s) in 0.0 sec")
+        self.mock_logger.warning.assert_any_call(
+            "failed to copy 3 file(s): 1 IOError, 2 ValueError")
+        self.mock_logger.warning.assert_any_call(
+            "  A/B: IOError('unsupported',)")
+        self.assertEqual(self.sync.failure_count(), 3)
+
+    def test_should_have_no_failures_given_retry_succeeds(self):
+        errors = {'B': [IOError()]}
+
+        def copy_file(file, folder_name, dest):
+            if errors.get(file.name):
+                raise errors[file.name].pop()
+        self.mock.side_effect = copy_file
+
+        self.sync.run()
+
+        self.assertEqual(self.sync.failure_count(), 0)
+
+    def test_should_stop_sync_given_connection_error(self):
+        self.mock.side_effect = urllib2.URLError('connection refused')
+
+        self.assertRaises(urllib2.URLError, self.sync.run)
+        self.assertEqual(self.mock.call_count, 1)
+
+    def test_should_stop_sync_given_token_rejected(self):
+        self.mock.side_effect = FlickrAPIError(98, 'Invalid auth token')
+
+        self.assertRaises(FlickrAPIError, self.sync.run)
+        self.assertEqual(self.mock.call_count, 1)
+
+
+class SyncMoveTest(SyncTestBase):
+
+    def setUp(self):
+        super(SyncMoveTest, self).setUp()
+        self.config.detect_moves = True
+        self.config.root_files = False
+        self.dest_storage.can_move = True
+        self.src_storage.get_checksum.side_effect = lambda file: file.checksum
+        self.dest_storage.get_checksum.side_effect = lambda file: file.checksum
+        # The renamed folder keeps its files
+        self.dest_storage.rename_folder.side_effect = lambda folder, name: folder
+        self.file_a = FileInfo(name='a.jpg', checksum='aaa')
+        self.file_b = FileInfo(name='b.jpg', checksum='bbb')
+        self.file_c = FileInfo(name='c.jpg', checksum='ccc')
+
+    def test_should_rename_folder_given_folder_renamed_in_src(self):
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_two, 'files': [self.file_a, self.file_b, self.file_c]}
+        ])
+        helpers.setup_storage(self.dest_storage, [
+            {'folder': self.folder_one, 'files': [FileInfo(name='a.jpg', checksum='aaa'),
+                                                  FileInfo(name='b.jpg', checksum='bbb')]}
+        ])
+
+        self.sync.run()
+
+        self.dest_storage.rename_folder.assert_called_once_with(self.folder_one, 'B')
+        self.assertEqual(self.mock.call_args_list, [
+            call(self.file_c, 'B', self.dest_storage)
+        ])
+        self.dest_storage.move_file.assert_not_called()
+
+    def test_should_not_rename_folder_given_folder_still_in_src(self):
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [self.file_a]},
+            {'folder': self.folder_two, 'files': [FileInfo(name='a.jpg', checksum='aaa')]}
+        ])
+        helpers.setup_storage(self.dest_storage, [
+            {'folder': self.folder_one, 'files': [FileInfo(name='a.jpg', checksum='aaa')]}
+        ])
+
+        self.sync.run()
+
+        self.dest_storage.rename_folder.assert_not_called()
+        self.dest_storage.move_file.assert_not_called()
+        self.assertEqual(len(self.mock.call_args_list), 1)
+
+    def test_should_move_file_given_file_moved_between_folders_in_src(self):
+        dest_file = FileInfo(name='IMG_1.jpg', checksum='aaa')
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [self.file_b]},
+            {'folder': self.folder_two, 'files': [self.file_a]}
+        ])
+        helpers.setup_storage(self.dest_storage, [
+            {'folder': self.folder_one, 'files': [dest_file, FileInfo(name='b.jpg', checksum='bbb')]},
+            {'folder': self.folder_two, 'files': []}
+        ])
+
+        self.sync.run()
+
+        self.dest_storage.move_file.assert_called_once_with(dest_file, self.folder_one, 'B', 'a.jpg')
+        self.mock.assert_not_called()
+
+    def test_should_not_move_anything_given_dry_run(self):
+        self.config.dry_run = True
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_two, 'files': [self.file_a]},
+            {'folder': self.folder_three, 'files': [self.file_b, self.file_c, FileInfo(name='d.jpg')]}
+        ])
+        helpers.setup_storage(self.dest_storage, [
+            {'folder': self.folder_one, 'files': [FileInfo(name='a.jpg', checksum='aaa')]},
+            {'folder': self.folder_four, 'files': [FileInfo(name='x.jpg', checksum='bbb')]}
+        ])
+
+        self.sync.run()
+
+        self.dest_storage.rename_folder.assert_not_called()
+        self.dest_storage.move_file.assert_not_called()
+        self.mock.assert_not_called()
+        self.assertEqual((self.sync._rename_count, self.sync._move_count), (1, 1))
+
+    def test_should_not_detect_moves_given_dest_can_not_move(self):
+        self.dest_storage.can_move = False
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_two, 'files': [self.file_a]}
+        ])
+        helpers.setup_storage(self.dest_storage, [
+            {'folder': self.folder_one, 'files': [FileInfo(name='a.jpg', checksum='aaa')]}
+        ])
+
+        self.sync.run()
+
+        self.dest_storage.get_checksum.assert_not_called()
+        self.assertEqual(self.mock.call_args_list, [
+            call(self.file_a, 'B', self.dest_storage)
+        ])
+
+
+class SyncJournalTest(SyncTestBase):
+
+    def setUp(self):
+        super(SyncJournalTest, self).setUp()
+        self.config.root_files = False
+        self.journal = MagicMock()
+        self.journal.resumed = True
+        self.journal.is_folder_done.side_effect = lambda name: name == 'A'
+        self.journal.is_copied.side_effect = lambda folder, name: name == 'B'
+        self.sync = Sync(self.config, self.src_storage, self.dest_storage, journal=self.journal)
+
+    def test_should_resume_from_journal_given_interrupted_sync(self):
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [self.file_one]},
+            {'folder': self.folder_two, 'files': [self.file_one, self.file_two]}
+        ])
+        helpers.setup_storage(self.dest_storage, [])
+
+        self.sync.run()
+
+        self.dest_storage.resume.assert_called_once_with()
+        self.src_storage.list_files.assert_called_once_with(self.folder_two)
+        self.mock.assert_called_once_with(self.file_one, 'B', self.dest_storage)
+        self.assertEqual(self.journal.method_calls[-5:], [
+            call.planned('B', 'A'),
+            call.copied('B', 'A'),
+            call.is_copied('B', 'B'),
+            call.folder_done('B'),
+            call.complete()
+        ])
+
+    def test_should_not_resume_dest_given_new_journal(self):
+        self.journal.resumed = False
+        helpers.setup_storage(self.src_storage, [])
+        helpers.setup_storage(self.dest_storage, [])
+
+        self.sync.run()
+
+        self.dest_storage.resume.assert_not_called()
+        self.journal.complete.assert_called_once_with()
+
+    def test_should_keep_journal_given_copy_fails(self):
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_two, 'files': [self.file_one]}
+        ])
+        helpers.setup_storage(self.dest_storage, [])
+        self.mock.side_effect = IOError()
+
+        self.sync.run()
+
+        self.journal.planned.assert_called_once_with('B', 'A')
+        self.journal.copied.assert_not_called()
+        self.journal.folder_done.assert_not_called()
+        self.journal.complete.assert_not_called()
+        self.journal.close.assert_called_once_with()
+
+    def test_should_copy_next_folder_while_copies_of_done_folder_finish_given_concurrent_transfers(self):
+        self.config.transfers = 2
+        self.journal.is_folder_done.side_effect = lambda name: False
+        self.journal.is_copied.side_effect = lambda folder, name: False
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [self.file_one]},
+            {'folder': self.folder_two, 'files': [self.file_two]}
+        ])
+        helpers.setup_storage(self.dest_storage, [])
+        folder_two_done = threading.Event()
+        # Folder A's copy only finishes once folder B is done, which it can't be if A's copies are waited for
+        self.mock.side_effect = lambda file, folder_name, dest: folder_two_done.wait(5) if folder_name == 'A' else None
+        self.journal.folder_done.side_effect = lambda name: folder_two_done.set() if name == 'B' else None
+
+        self.sync.run()
+
+        self.assertEqual(self.journal.folder_done.call_args_list, [call('B'), call('A')])
+
+
+class SyncPlanTest(SyncTestBase):
+
+    def setUp(self):
+        super(SyncPlanTest, self).setUp()
+        self.config.root_files = False
+        self.plan = MagicMock()
+        self.sync = Sync(self.config, self.src_storage, self.dest_storage, plan=self.plan)
+
+    def test_should_write_plan_instead_of_copying_given_plan(self):
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [self.file_one]},
+            {'folder': self.folder_two, 'files': [self.file_one, self.file_two]}
+        ])
+        helpers.setup_storage(self.dest_storage, [
+            {'folder': self.folder_two, 'files': [self.file_one]}
+        ])
+
+        self.sync.run()
+
+        self.mock.assert_not_called()
+        self.assertEqual(self.plan.method_calls, [
+            call.new_folder('A'),
+            call.copy('A', self.file_one, None),
+            call.copy('B', self.file_two, None),
+            call.close(self.config)
+        ])
+
+    def test_should_run_operations_given_plan(self):
+        renamed_folder = FolderInfo(id=3, name='C')
+        self.dest_storage.rename_folder.return_value = renamed_folder
+        plan = MagicMock()
+        plan.__iter__.return_value = [
+            ('new-folder', 'A'),
+            ('copy', 'A', self.file_one, None),
+            ('copy', '', self.file_two, self.file_one),
+            ('rename', self.folder_two, 'C'),
+            ('move', self.file_two, self.folder_two, 'A', 'B')
+        ]
+        sync = Sync(self.config, self.src_storage, self.dest_storage)
+
+        sync.run_plan(plan)
+
+        self.src_storage.list_folders.assert_not_called()
+        self.dest_storage.list_folders.assert_not_called()
+        self.assertEqual(self.mock.call_args_list, [
+            call(self.file_one, 'A', self.dest_storage),
+            call(self.file_two, '', self.dest_storage, dest_file=self.file_one)
+        ])
+        self.dest_storage.rename_folder.assert_called_once_with(self.folder_two, 'C')
+        self.dest_storage.move_file.assert_called_once_with(self.file_two, renamed_folder, 'A', 'B')
+
+    def test_should_skip_journaled_operations_given_resumed_plan(self):
+        journal = MagicMock()
+        journal.is_copied.side_effect = lambda folder, name: name == 'A'
+        journal.is_folder_done.return_value = True
+        plan = MagicMock()
+        plan.__iter__.return_value = [
+            ('copy', 'A', self.file_one, None),
+            ('copy', 'A', self.file_two, None),
+            ('rename', self.folder_two, 'C')
+        ]
+        sync = Sync(self.config, self.src_storage, self.dest_storage, journal=journal)
+
+        sync.run_plan(plan)
+
+        self.mock.assert_called_once_with(self.file_two, 'A', self.dest_storage)
+        self.dest_storage.rename_folder.assert_not_called()
+
+    def test_should_measure_bandwidth_given_copies(self):
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [FileInfo(id=1, name='A', size=1000)]}
+        ])
+        helpers.setup_storage(self.dest_storage, [])
+        sync = Sync(self.config, self.src_storage, self.dest_storage)
+
+        with patch('flickr_rsync.sync.time.time', side_effect=[0, 10, 12, 20]):
+            sync.run()
+
+        self.assertEqual(sync.bandwidth(), 500)
+
+
+class SyncOrderTest(SyncTestBase):
+
+    def setUp(self):
+        super(SyncOrderTest, self).setUp()
+        self.config.root_files = False
+        self.config.order = 'smallest'
+        self.journal = MagicMock()
+        self.journal.resumed = False
+        self.journal.is_folder_done.return_value = False
+        self.journal.is_copied.return_value = False
+        self.sync = Sync(self.config, self.src_storage, self.dest_storage, journal=self.journal)
+
+    def test_should_copy_in_order_given_order(self):
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [FileInfo(name='a.jpg', size=300)]},
+            {'folder': self.folder_two, 'files': [FileInfo(name='b.jpg', size=100), FileInfo(name='c.jpg', size=200)]}
+        ])
+        helpers.setup_storage(self.dest_storage, [])
+
+        self.sync.run()
+
+        self.assertEqual([(args[1], args[0].name) for args, _ in self.mock.call_args_list], [
+            ('B', 'b.jpg'), ('B', 'c.jpg'), ('A', 'a.jpg')])
+        self.assertEqual(self.journal.folder_done.call_args_list, [call('A'), call('B')])
+
+    def test_should_not_mark_folder_done_given_queued_copy_fails(self):
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [FileInfo(name='a.jpg', size=300)]},
+            {'folder': self.folder_two, 'files': [FileInfo(name='b.jpg', size=100)]}
+        ])
+        helpers.setup_storage(self.dest_storage, [])
+
+        def copy_file(file, folder_name, dest):
+            if file.name == 'b.jpg':
+                raise IOError()
+        self.mock.side_effect = copy_file
+
+        self.sync.run()
+
+        self.assertEqual(self.journal.folder_done.call_args_list, [call('A')])
+
+
+class SyncLaneTest(SyncTestBase):
+
+    def setUp(self):
+        super(SyncLaneTest, self).setUp()
+        self.config.root_files = False
+        self.config.large_file_size = 100
+        self.config.large_transfers = 1
+
+    def test_should_copy_small_files_alongside_large_file_given_large_file_size(self):
+        small_copied = threading.Event()
+        copied = []
+
+        def copy_file(file, folder_name, dest):
+            if file.name == 'a.mov':
+                # Only finishes if the small files aren't waiting behind it
+                small_copied.wait(5)
+            elif file.name == 'c.jpg':
+                small_copied.set()
+            copied.append(file.name)
+        self.mock.side_effect = copy_file
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [
+                FileInfo(name='a.mov', size=200 * 1024 * 1024),
+                FileInfo(name='b.jpg', size=1024),
+                FileInfo(name='c.jpg', size=1024)]}
+        ])
+        helpers.setup_storage(self.dest_storage, [])
+
+        self.sync.run()
+
+        self.assertEqual(copied, ['b.jpg', 'c.jpg', 'a.mov'])
+
+    def test_should_copy_videos_in_large_lane_given_unknown_size(self):
+        self.assertTrue(self.sync._is_large(FileInfo(name='a.MOV')))
+        self.assertFalse(self.sync._is_large(FileInfo(name='a.jpg')))
+        self.assertFalse(self.sync._is_large(FileInfo(name='a.mov', size=1024)))
+
+
+class SyncSortedMergeTest(SyncTestBase):
+
+    def setUp(self):
+        super(SyncSortedMergeTest, self).setUp()
+        self.config.sorted_merge = True
+        self.config.list_sort_buffer = 2
+
+    def test_should_copy_missing_files_in_sorted_order_given_sorted_merge(self):
+        src_files = [FileInfo(name=name) for name in ['E', 'b.jpeg', 'A', 'd', 'C', 'B.JPG']]
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': src_files}
+        ])
+        helpers.setup_storage(self.dest_storage, [
+            {'folder': self.folder_one, 'files': [
+                FileInfo(name=name) for name in ['f', 'c', 'b.jpg', 'a', 'c']]}
+        ])
+
+        self.sync.run()
+
+        # Files spilled to disk while sorting are copies, so compare names
+        self.assertEqual(self._copied(), [('d', 'A'), ('E', 'A')])
+
+    def test_should_copy_all_files_given_empty_dest_folder(self):
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.folder_one, 'files': [self.file_two, self.file_one]}
+        ])
+        helpers.setup_storage(self.dest_storage, [
+            {'folder': self.folder_one, 'files': []}
+        ])
+
+        self.sync.run()
+
+        self.assertEqual(self._copied(), [('A', 'A'), ('B', 'A')])
+
+    def _copied(self):
+        return [(args[0].name, args[1]) for args, _ in self.mock.call_args_list]
+
+
+class SyncCatalogTest(SyncTestBase):
+
+    def setUp(self):
+        super(SyncCatalogTest, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.catalog_path = os.path.join(self.root, 'dest.catalog')
+
+    def tearDown(self):
+        super(SyncCatalogTest, self).tearDown()
+        shutil.rmtree(self.root)
+
+    def _create_sync(self, dest_folders):
+        catalog_storage = MagicMock()
+        helpers.setup_storage(catalog_storage, dest_folders)
+        write_catalog(self.catalog_path, catalog_storage, root_files=True)
+        self.catalog = Catalog(self.catalog_path)
+        self.addCleanup(self.catalog.close)
+        return Sync(self.config, self.src_storage, self.dest_storage, self.catalog)
+
+    def test_should_copy_missing_files_without_listing_dest_given_catalog(self):
+        self.config.root_files = True
+        helpers.setup_storage(self.src_storage, [
+            {'folder': self.root_folder, 'files': [self.file_one, self.file_two]},
+            {'folder': self.folder_one, 'files': [self.file_one, self.file_two]},
+            {'folder': self.folder_two, 'files': [self.file_one]}
+        ])
+        sync = self._create_sync([
+            {'folder': self.root_folder, 'files': [FileInfo(name='b')]},
+            {'folder': FolderInfo(id=5, name='a'), 'files': [FileInfo(name='a')]}
+        ])
+
+        sync.run()
+
+        self.assertEqual(self.mock.call_args_list, [
+            call(self.file_two, self.folder_one.name, self.dest_storage),
+            call(self.file_one, self.folder_two.name, self.dest_storage),
+            call(self.file_one, '', self.dest_storage)
+        ])
+        self.dest_storage.list_folders.assert_not_called()
+        self.dest_storage.list_files.assert_not_called()
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -0,0 +1,59 @@
+import os
+import sys
+import threading
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from flickr_rsync.transfer_lane import TransferLane
+
+
+class TransferLaneTest(unittest.TestCase):
+
+    def test_should_run_all_copies_given_wait(self):
+        copied = []
+        lane = TransferLane('small', 2, 2)
+
+        for i in range(10):
+            lane.submit(copied.append, i)
+        lane.wait()
+        lane.shutdown()
+
+        self.assertEqual(sorted(copied), list(range(10)))
+        self.assertEqual(lane.count, 10)
+
+    def test_should_raise_error_given_copy_fails(self):
+        def copy():
+            raise ValueError()
+        lane = TransferLane('small', 1, 2)
+
+        lane.submit(copy)
+
+        self.assertRaises(ValueError, lane.wait)
+        lane.shutdown()
+
+    def test_should_not_block_given_unbounded_lane(self):
+        release = threading.Event()
+        lane = TransferLane('large', 1)
+
+        for _ in range(5):
+            lane.submit(release.wait, 5)
+        release.set()
+        lane.wait()
+        lane.shutdown()
+
+        self.assertEqual(lane.count, 5)
+
+    def test_should_cancel_queued_copies_given_shutdown(self):
+        release = threading.Event()
+        copied = []
+        lane = TransferLane('large', 1)
+        lane.submit(release.wait, 5)
+        lane.submit(copied.append, 1)
+
+        threading.Timer(0.1, release.set).start()
+        lane.shutdown()
+
+        self.assertEqual(copied, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+from flickr_rsync.transfer_order import TransferQueue
+from flickr_rsync.file_info import FileInfo
+from flickr_rsync.folder_info import FolderInfo
+
+
+class TransferQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder_one = FolderInfo(id=1, name='A')
+        self.folder_two = FolderInfo(id=2, name='B')
+
+    def _names(self, queue):
+        return [(folder.name, file_info.name) for folder, file_info, _, _ in queue]
+
+    def test_should_copy_newest_folders_first_given_newest_order(self):
+        queue = TransferQueue('newest', 100)
+        queue.add(self.folder_one, FileInfo(name='a.jpg', mtime=10), 'a.jpg')
+        queue.add(self.folder_one, FileInfo(name='b.jpg', mtime=30), 'b.jpg')
+        queue.folder_done()
+        queue.add(self.folder_two, FileInfo(name='c.jpg', mtime=20), 'c.jpg')
+        queue.add(self.folder_two, FileInfo(name='d.jpg'), 'd.jpg')
+        queue.folder_done()
+        queue.add(self.folder_two, FileInfo(name='e.jpg', mtime=40), 'e.jpg')
+
+        self.assertEqual(self._names(queue), [
+            ('B', 'e.jpg'), ('A', 'a.jpg'), ('A', 'b.jpg'), ('B', 'c.jpg'), ('B', 'd.jpg')])
+        queue.close()
+
+    def test_should_copy_smallest_files_first_given_smallest_order(self):
+        queue = TransferQueue('smallest', 2)
+        queue.add(self.folder_one, FileInfo(name='a.jpg', size=300), 'a.jpg')
+        queue.add(self.folder_one, FileInfo(name='b.jpg'), 'b.jpg')
+        queue.add(self.folder_two, FileInfo(name='c.jpg', size=100), 'c.jpg')
+        queue.add(self.folder_two, FileInfo(name='d.jpg', size=200), 'd.jpg')
+
+        self.assertEqual(self._names(queue), [
+            ('B', 'c.jpg'), ('B', 'd.jpg'), ('A', 'a.jpg'), ('A', 'b.jpg')])
+        self.assertEqual(queue.count, 4)
+        queue.close()
+
+    def test_should_copy_photos_before_videos_given_photos_order(self):
+        queue = TransferQueue('photos', 100)
+        queue.add(self.folder_one, FileInfo(name='a.MOV'), 'a.MOV')
+        queue.add(self.folder_one, FileInfo(name='b.jpg'), 'b.jpg')
+        queue.add(self.folder_two, FileInfo(name='c.mp4'), 'B/c.mp4', FileInfo(id='3', name='c.mp4'))
+        queue.add(self.folder_two, FileInfo(name='d.png'), 'd.png')
+
+        items = list(queue)
+
+        self.assertEqual([(folder.name, file_info.name) for folder, file_info, _, _ in items], [
+            ('A', 'b.jpg'), ('B', 'd.png'), ('A', 'a.MOV'), ('B', 'c.mp4')])
+        self.assertEqual((items[3][2], items[3][3].id), ('B/c.mp4', '3'))
+        queue.close()
+
+    def test_should_raise_given_unrecognised_order(self):
+        self.assertRaises(ValueError, TransferQueue, 'largest', 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
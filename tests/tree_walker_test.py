@@ -12,22 +12,24 @@ from flickr_rsync.root_folder_info import RootFolderInfo
 
 
 class TreeWalkerTest(unittest.TestCase):
+    module = 'flickr_rsync.tree_walker'
+    walker_class = TreeWalker
 
     def setUp(self):
-        self.print_patch = patch('flickr_rsync.tree_walker.print', create=True)
-        self.mock_print = self.print_patch.start()
-        self.logger_patch = patch(
-            'flickr_rsync.tree_walker.logger', create=True)
+        self.sink_patch = patch(self.module + '.TextSink')
+        self.mock_sink = self.sink_patch.start().return_value
+        self.mock_print = self.mock_sink.write_line
+        self.logger_patch = patch(self.module + '.logger', create=True)
         self.mock_logger = self.logger_patch.start()
-        self.time_patch = patch(
-            'flickr_rsync.tree_walker.time.time',
-            create=True)
+        self.time_patch = patch(self.module + '.time.time', create=True)
         self.time_patch.start().return_value = 0
 
         self.config = MagicMock()
         self.config.root_files = False
         self.config.list_folders = False
         self.config.list_sort = False
+        self.config.list_sort_buffer = 100000
+        self.config.prefetch = 0
         self.storage = MagicMock()
         self.folder_one = FolderInfo(id=1, name='A Folder')
         self.folder_two = FolderInfo(id=2, name='B Folder')
@@ -39,12 +41,12 @@ class TreeWalkerTest(unittest.TestCase):
         self.file_three = FileInfo(id=3, name='C File', checksum='abc123')
 
     def tearDown(self):
-        self.print_patch.stop()
+        self.sink_patch.stop()
         self.logger_patch.stop()
         self.time_patch.stop()
 
     def test_should_print_wrapper_only_given_no_folders(self):
-        walker = TreeWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
 
         walker.walk()
 
@@ -53,7 +55,7 @@ class TreeWalkerTest(unittest.TestCase):
             "0 directories, 0 files read in 0.0 sec")
 
     def test_should_print_wrapper_only_given_empty_folders(self):
-        walker = TreeWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.root_folder, 'files': []},
             {'folder': self.folder_one, 'files': []}
@@ -67,7 +69,7 @@ class TreeWalkerTest(unittest.TestCase):
 
     def test_should_print_root_files_given_root_files_enabled(self):
         self.config.root_files = True
-        walker = TreeWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.root_folder, 'files': [self.file_one, self.file_two]}
         ])
@@ -85,7 +87,7 @@ class TreeWalkerTest(unittest.TestCase):
     def test_should_not_print_connector_when_printing_root_files_given_folders_are_hidden(
             self):
         self.config.root_files = True
-        walker = TreeWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.root_folder, 'files': [self.file_one, self.file_two]},
             {'folder': self.folder_one, 'files': []}
@@ -102,7 +104,7 @@ class TreeWalkerTest(unittest.TestCase):
 
     def test_should_not_print_root_files_given_root_files_disabled(self):
         self.config.root_files = False
-        walker = TreeWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.root_folder, 'files': [self.file_one, self.file_two]}
         ])
@@ -117,7 +119,7 @@ class TreeWalkerTest(unittest.TestCase):
             self):
         self.config.root_files = True
         self.config.list_sort = False
-        walker = TreeWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.root_folder, 'files': [self.file_three]},
             {'folder': self.folder_one, 'files': [self.file_one]}
@@ -135,7 +137,7 @@ class TreeWalkerTest(unittest.TestCase):
             "1 directories, 2 files read in 0.0 sec")
 
     def test_should_print_folder_files(self):
-        walker = TreeWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.folder_one, 'files': [self.file_one, self.file_two]}
         ])
@@ -151,7 +153,7 @@ class TreeWalkerTest(unittest.TestCase):
             "1 directories, 2 files read in 0.0 sec")
 
     def test_should_print_all_folders(self):
-        walker = TreeWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.folder_one, 'files': [self.file_one]},
             {'folder': self.folder_two, 'files': [self.file_two]}
@@ -169,8 +171,34 @@ class TreeWalkerTest(unittest.TestCase):
         self.mock_logger.info.assert_called_once_with(
             "2 directories, 2 files read in 0.0 sec")
 
+    def test_should_print_folders_in_order_given_prefetch_enabled(self):
+        self.config.prefetch = 2
+        walker = self.walker_class(self.config, self.storage)
+        helpers.setup_storage(self.storage, [
+            {'folder': self.folder_one, 'files': [self.file_one]},
+            {'folder': self.folder_two, 'files': []},
+            {'folder': self.folder_three, 'files': [self.file_two, self.file_three]},
+            {'folder': self.folder_four, 'files': [self.file_one]}
+        ])
+
+        walker.walk()
+
+        self.assertEqual(self.mock_print.call_args_list, [
+            call(u"├─── A Folder".encode('utf-8')),
+            call(u"│   └─── A File".encode('utf-8')),
+            call(u"│   ".encode('utf-8')),
+            call(u"├─── C Folder".encode('utf-8')),
+            call(u"│   ├─── B File".encode('utf-8')),
+            call(u"│   └─── C File [abc123]".encode('utf-8')),
+            call(u"│   ".encode('utf-8')),
+            call(u"└─── D Folder".encode('utf-8')),
+            call(u"    └─── A File".encode('utf-8'))
+        ])
+        self.mock_logger.info.assert_called_once_with(
+            "3 directories, 4 files (excluding 1 empty directories) read in 0.0 sec")
+
     def test_should_print_checksum_given_file_has_checksum(self):
-        walker = TreeWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.folder_one, 'files': [self.file_three]}
         ])
@@ -186,7 +214,7 @@ class TreeWalkerTest(unittest.TestCase):
 
     def test_should_sort_folders_and_files_given_sort_enabled(self):
         self.config.list_sort = True
-        walker = TreeWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.folder_two, 'files': [self.file_three, self.file_two]},
             {'folder': self.folder_one, 'files': [self.file_one]}
@@ -207,7 +235,7 @@ class TreeWalkerTest(unittest.TestCase):
 
     def test_should_not_sort_folders_and_files_given_sort_disabled(self):
         self.config.list_sort = False
-        walker = TreeWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.folder_two, 'files': [self.file_three, self.file_two]},
             {'folder': self.folder_one, 'files': [self.file_one]}
@@ -228,7 +256,7 @@ class TreeWalkerTest(unittest.TestCase):
 
     def test_should_print_only_folders_given_list_folders_enabled(self):
         self.config.list_folders = True
-        walker = TreeWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.folder_two, 'files': [self.file_three, self.file_two]},
             {'folder': self.folder_one, 'files': [self.file_one]}
@@ -246,7 +274,7 @@ class TreeWalkerTest(unittest.TestCase):
     def test_should_sort_folders_and_files_given_sort_enabled(self):
         self.config.list_sort = True
         self.config.list_folders = True
-        walker = TreeWalker(self.config, self.storage)
+        walker = self.walker_class(self.config, self.storage)
         helpers.setup_storage(self.storage, [
             {'folder': self.folder_two, 'files': [self.file_three, self.file_two]},
             {'folder': self.folder_one, 'files': [self.file_one]}